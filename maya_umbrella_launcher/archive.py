@@ -0,0 +1,297 @@
+import os
+import zlib
+import shutil
+import struct
+import zipfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import maya_umbrella_launcher.constant as const
+from maya_umbrella_launcher.filesystem import create_folder_if_not_exist, replace_folder
+from maya_umbrella_launcher.profiling import traced
+
+
+@traced('archive.extract')
+def extract_zip(zip_path, extract_to=None, workers=const.EXTRACT_WORKERS, extract=None):
+    """
+    解压文件
+    成员分配到线程池并行解压，读到成员末尾时zipfile会校验CRC，
+    先解压到临时目录，全部成功后再替换目标目录
+    Args:
+        zip_path(str): zip文件路径
+        extract_to(str): 解压目录，默认为zip文件同名目录
+        workers(int): 线程数
+        extract(callable): 解压一个成员的函数extract(zip_ref, info, 目录)，默认为extract_member
+    """
+    if extract_to is None:
+        extract_to = zip_path.replace('.zip', '')
+
+    staging_folder = extract_to + '.staging'
+    if os.path.isdir(staging_folder):
+        shutil.rmtree(staging_folder)
+
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        for info in zip_ref.infolist():
+            if info.is_dir():
+                create_folder_if_not_exist(safe_extract_path(staging_folder, info.filename))
+
+    extract = extract or extract_member
+    try:
+        map_zip_members(zip_path, lambda zip_ref, info: extract(zip_ref, info, staging_folder), workers=workers)
+    except Exception:
+        shutil.rmtree(staging_folder, ignore_errors=True)
+        raise
+
+    replace_folder(staging_folder, extract_to)
+    print(f'Files extracted to: {extract_to}')
+
+    return extract_to
+
+
+def map_zip_members(zip_path, func, workers=const.EXTRACT_WORKERS):
+    """
+    在线程池里对zip的每个成员调用func(zip_ref, info)
+    每个线程打开自己的ZipFile句柄，避免共享句柄的锁把读取串行化。
+    目录成员不会传给func。
+    Return:
+        按成员顺序返回func的结果列表
+    """
+    local = threading.local()
+    handles = []
+    handles_lock = threading.Lock()
+
+    def run(info):
+        zip_ref = getattr(local, 'zip_ref', None)
+        if zip_ref is None:
+            zip_ref = local.zip_ref = zipfile.ZipFile(zip_path, 'r')
+            with handles_lock:
+                handles.append(zip_ref)
+        return func(zip_ref, info)
+
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        infos = [info for info in zip_ref.infolist() if not info.is_dir()]
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            return list(executor.map(run, infos))
+    finally:
+        for zip_ref in handles:
+            zip_ref.close()
+
+
+def extract_member(zip_ref, info, extract_to):
+    """
+    解压一个成员，读到末尾时zipfile校验CRC，和zip里记录的不一致时抛出BadZipFile
+    """
+    target_path = safe_extract_path(extract_to, info.filename)
+    create_folder_if_not_exist(os.path.dirname(target_path))
+
+    with zip_ref.open(info) as source, open(target_path, 'wb') as target:
+        shutil.copyfileobj(source, target, const.DOWNLOAD_CHUNK_SIZE)
+
+
+class StreamZipExtractor(object):
+    """
+    流式解压
+    边下载边解压，按local file header逐个解析成员并直接写入目标目录，不需要先把zip写到磁盘，也不保留下载数据的副本。
+    遇到流式无法处理的情况（加密、zip64、不支持的压缩方式等）时抛出StreamExtractUnsupported，
+    由调用方停止流式下载，改为下载完整的zip再解压（支持Range时分段下载）。
+    """
+
+    local_header = struct.Struct('<4sHHHHHIIIHH')
+    local_signature = b'PK\x03\x04'
+    descriptor_signature = b'PK\x07\x08'
+    end_signatures = (b'PK\x01\x02', b'PK\x05\x06')
+
+    def __init__(self, extract_to):
+        self.extract_to = extract_to
+        self.extracted = []
+
+        self._buffer = bytearray()
+        self._member = None
+        self._finished = False
+
+    def feed(self, data):
+        """
+        接收一段下载的数据
+        Raises:
+            StreamExtractUnsupported: 流式无法解压这个zip
+        """
+        if self._finished:
+            return
+
+        self._buffer += data
+        try:
+            self._parse()
+        except StreamExtractUnsupported:
+            self.abort()
+            raise
+
+    def close(self):
+        """
+        数据接收完毕，完成解压
+        Return:
+            解压目录
+        """
+        if not self._finished:
+            self._close_member()
+            raise zipfile.BadZipFile('Truncated zip stream')
+
+        print(f'Files extracted to: {self.extract_to}')
+        return self.extract_to
+
+    def abort(self):
+        """
+        下载失败时释放缓冲和文件句柄
+        """
+        self._close_member()
+        self._buffer = bytearray()
+
+    def _parse(self):
+        while True:
+            if self._member is None and not self._read_header():
+                return
+            if not self._read_member_data():
+                return
+
+    def _read_header(self):
+        """
+        解析一个local file header，数据不够时返回False等待更多数据
+        """
+        signature = bytes(self._buffer[:4])
+        if len(signature) < 4:
+            return False
+        if signature in self.end_signatures:
+            self._finished = True
+            self._buffer = bytearray()
+            return False
+        if signature != self.local_signature:
+            raise StreamExtractUnsupported('invalid local header signature')
+        if len(self._buffer) < self.local_header.size:
+            return False
+
+        (_, _, flags, method, _, _, crc, compress_size,
+         file_size, name_length, extra_length) = self.local_header.unpack_from(self._buffer)
+        header_length = self.local_header.size + name_length + extra_length
+        if len(self._buffer) < header_length:
+            return False
+
+        name = bytes(self._buffer[self.local_header.size:self.local_header.size + name_length])
+        extra = bytes(self._buffer[self.local_header.size + name_length:header_length])
+        del self._buffer[:header_length]
+
+        if flags & 0x1:
+            raise StreamExtractUnsupported('encrypted member')
+        if method not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+            raise StreamExtractUnsupported(f'compression method {method}')
+        if compress_size == 0xFFFFFFFF or file_size == 0xFFFFFFFF or _has_zip64_extra(extra):
+            raise StreamExtractUnsupported('zip64 member')
+        if flags & 0x8 and method == zipfile.ZIP_STORED:
+            raise StreamExtractUnsupported('stored member with data descriptor')
+
+        name = name.decode('utf-8' if flags & 0x800 else 'cp437')
+        self._open_member(name, flags, method, crc, compress_size, file_size)
+        return True
+
+    def _open_member(self, name, flags, method, crc, compress_size, file_size):
+        target_path = safe_extract_path(self.extract_to, name)
+        is_dir = name.endswith('/')
+        if is_dir:
+            create_folder_if_not_exist(target_path)
+        else:
+            create_folder_if_not_exist(os.path.dirname(target_path))
+
+        self._member = {
+            'name': name,
+            'descriptor': bool(flags & 0x8),
+            'crc': crc,
+            'file_size': file_size,
+            'remaining': compress_size,
+            'decompressor': zlib.decompressobj(-15) if method == zipfile.ZIP_DEFLATED else None,
+            'file': None if is_dir else open(target_path, 'wb'),
+            'written_crc': 0,
+            'written_size': 0,
+            'wait_descriptor': False,
+        }
+
+    def _write(self, data):
+        member = self._member
+        if not data:
+            return
+        if member['file'] is None:
+            raise zipfile.BadZipFile(f'Directory member has data: {member["name"]}')
+        member['file'].write(data)
+        member['written_crc'] = zlib.crc32(data, member['written_crc'])
+        member['written_size'] += len(data)
+
+    def _read_member_data(self):
+        """
+        处理当前成员的数据，成员结束时返回True
+        """
+        member = self._member
+
+        if member['descriptor']:
+            if not member['wait_descriptor']:
+                decompressor = member['decompressor']
+                self._write(decompressor.decompress(bytes(self._buffer)))
+                if not decompressor.eof:
+                    self._buffer = bytearray()
+                    return False
+                self._buffer = bytearray(decompressor.unused_data)
+                member['wait_descriptor'] = True
+
+            if len(self._buffer) < 4:
+                return False
+            offset = 4 if bytes(self._buffer[:4]) == self.descriptor_signature else 0
+            if len(self._buffer) < offset + 12:
+                return False
+            member['crc'], _, member['file_size'] = struct.unpack_from('<III', self._buffer, offset)
+            del self._buffer[:offset + 12]
+        else:
+            size = min(len(self._buffer), member['remaining'])
+            data = bytes(self._buffer[:size])
+            del self._buffer[:size]
+            member['remaining'] -= size
+            if member['decompressor']:
+                data = member['decompressor'].decompress(data)
+            self._write(data)
+            if member['remaining']:
+                return False
+            if member['decompressor']:
+                self._write(member['decompressor'].flush())
+
+        self._close_member()
+        if member['written_crc'] != member['crc'] or member['written_size'] != member['file_size']:
+            raise zipfile.BadZipFile(f'Bad CRC-32 for file {member["name"]!r}')
+        self.extracted.append(member['name'])
+        return True
+
+    def _close_member(self):
+        if self._member and self._member['file']:
+            self._member['file'].close()
+        self._member = None
+
+
+class StreamExtractUnsupported(Exception):
+    """
+    流式解压不支持的zip，需要下载完整的文件再解压
+    """
+
+
+def _has_zip64_extra(extra):
+    while len(extra) >= 4:
+        header_id, size = struct.unpack_from('<HH', extra)
+        if header_id == 0x0001:
+            return True
+        extra = extra[4 + size:]
+    return False
+
+
+def safe_extract_path(extract_to, name):
+    """
+    获取成员的解压路径，和zipfile.extractall一样去掉盘符、绝对路径和`..`
+    """
+    parts = [part for part in name.replace('\\', '/').split('/')
+             if part not in ('', '.', '..')]
+    parts = [os.path.splitdrive(part)[1] for part in parts]
+    return os.path.join(extract_to, *parts)
@@ -0,0 +1,111 @@
+import os
+import sys
+import json
+import time
+import subprocess as sp
+from concurrent.futures import ThreadPoolExecutor
+
+from maya_umbrella_launcher.log import logger
+from maya_umbrella_launcher.discovery import maya_discovery
+from maya_umbrella_launcher.supervisor import process_supervisor
+
+
+class BatchLauncher(object):
+    """
+    批量运行maya/mayapy任务
+    任务文件是一个json列表（或者{"max_workers": n, "jobs": [...]}），每个任务的字段:
+        - maya_version: maya版本号，必填
+        - executable: maya, mayapy或mayabatch，默认mayapy
+        - args: 命令行参数列表
+        - timeout: 超时时间，单位为秒
+        - cwd: 工作目录
+        - log: 输出日志文件，默认写到会话日志目录
+        - name: 任务名，默认为序号
+    所有任务共用一份提前构建好的环境变量，进程注册到process_supervisor。
+    """
+
+    def __init__(self, envs, max_workers=None):
+        self.envs = envs
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    @staticmethod
+    def load_jobs(jobs_file):
+        """
+        读取任务文件
+        Return:
+            (任务列表, 任务文件里指定的并发数)
+        """
+        with open(jobs_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            return data.get('jobs', []), data.get('max_workers')
+        return data, None
+
+    @staticmethod
+    def get_executable(maya_version, executable='mayapy'):
+        install = maya_discovery.get(maya_version)
+        if not install:
+            return None
+        suffix = '.exe' if sys.platform == 'win32' else ''
+        return os.path.join(install.location, 'bin', f'{executable}{suffix}')
+
+    def run(self, jobs):
+        """
+        运行所有任务，同时运行的任务数不超过max_workers，其余的排队
+        Return:
+            每个任务的结果字典列表，顺序和jobs一致，
+            status为ok, failed, timeout或error
+        """
+        for index, job in enumerate(jobs):
+            job.setdefault('name', str(index))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(self.run_job, jobs))
+
+    def run_job(self, job):
+        result = {'name': job['name'], 'maya_version': str(job.get('maya_version')),
+                  'status': 'error', 'exit_code': None, 'duration': 0.0, 'error': None}
+
+        executable = self.get_executable(job.get('maya_version'), job.get('executable', 'mayapy'))
+        if not executable:
+            result['error'] = f'Cannot find Maya version: {job.get("maya_version")}'
+            return result
+
+        command = [executable] + [str(arg) for arg in job.get('args', [])]
+
+        start = time.perf_counter()
+        try:
+            session = process_supervisor.launch(command, envs=self.envs, cwd=job.get('cwd'),
+                                                name=f'batch:{job["name"]}', log_file=job.get('log'))
+            try:
+                result['exit_code'] = process_supervisor.wait(session, timeout=job.get('timeout'))
+                result['status'] = 'ok' if result['exit_code'] == 0 else 'failed'
+            except sp.TimeoutExpired:
+                process_supervisor.terminate(session)
+                process_supervisor.wait(session)
+                result['status'] = 'timeout'
+        except OSError as e:
+            result['error'] = str(e)
+        finally:
+            result['duration'] = time.perf_counter() - start
+
+        logger.debug(f'Batch job {result["name"]}: {result["status"]} in {result["duration"]:.2f}s')
+        return result
+
+    @staticmethod
+    def format_summary(results):
+        """
+        生成结果汇总文字
+        """
+        lines = [f'{"name":<20} {"maya":<6} {"status":<8} {"exit":>5} {"seconds":>9}']
+        for result in results:
+            exit_code = '' if result['exit_code'] is None else result['exit_code']
+            lines.append(f'{result["name"]:<20} {result["maya_version"]:<6} {result["status"]:<8} '
+                         f'{exit_code:>5} {result["duration"]:>9.2f}'
+                         + (f'  {result["error"]}' if result['error'] else ''))
+
+        counts = {}
+        for result in results:
+            counts[result['status']] = counts.get(result['status'], 0) + 1
+        lines.append(', '.join(f'{status}: {count}' for status, count in sorted(counts.items())))
+        return '\n'.join(lines)
@@ -0,0 +1,898 @@
+"""
+启动器热点路径的性能测试
+
+    python -m maya_umbrella_launcher.benchmark [名称 ...] [--repeat N] [--json 输出文件]
+                                              [--baseline 基准文件] [--threshold 0.25]
+
+每个测试都在临时目录的沙盒里运行，不读写用户的设置和缓存，maya安装和GitHub都使用本地的假数据，可以离线运行。
+指定--baseline时和之前保存的json比较，中位数变慢超过threshold的用例视为性能回退，返回值为1，可以用在CI里。
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import zipfile
+import platform
+import argparse
+import tempfile
+import contextlib
+import subprocess
+import statistics
+import functools
+
+import maya_umbrella_launcher.constant as const
+
+
+BENCHMARKS = {}
+
+# 命令行冷启动测试的子命令，以及不应该在这些子命令里加载的模块
+CLI_COMMANDS = (['-h'], ['-p'], ['--cache-stats'], ['--versions'])
+HEAVY_MODULES = ('PySide2', 'requests', 'urllib3', 'zipfile')
+
+# 图形界面从子进程开始执行到主窗口第一次绘制的预算，单位为秒，超过时测试失败
+GUI_FIRST_PAINT_BUDGET = 1.5
+GUI_STARTUP_SCRIPT = '''
+import sys
+import json
+import time
+
+start = time.perf_counter()
+from PySide2 import QtWidgets, QtCore
+app = QtWidgets.QApplication(sys.argv)
+from maya_umbrella_launcher.launcher_view import MainUI
+imported = time.perf_counter()
+ui = MainUI()
+created = time.perf_counter()
+
+painted = []
+
+
+class PaintFilter(QtCore.QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QtCore.QEvent.Paint and not painted:
+            painted.append(time.perf_counter())
+        return False
+
+
+paint_filter = PaintFilter()
+ui.installEventFilter(paint_filter)
+ui.show()
+while not painted and time.perf_counter() - created < 30:
+    app.processEvents()
+ui.close()
+if not painted:
+    sys.exit('main window was not painted')
+print(json.dumps({'import': imported - start, 'create': created - imported, 'first_paint': painted[0] - start}))
+'''
+
+
+class BenchmarkSkipped(Exception):
+    """
+    缺少依赖等原因无法运行的性能测试，结果里记录为跳过
+    """
+
+
+def benchmark(name):
+    """
+    注册一个性能测试
+    被装饰的函数接收一个临时目录，依次yield (用例名, 无参数的可调用对象)，无法运行时抛出BenchmarkSkipped
+    """
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+    return decorator
+
+
+def expect(func, *args, **kwargs):
+    """
+    包装返回成功与否的函数，失败时抛出异常，避免把失败的快速返回当成性能结果
+    """
+    def wrapper():
+        result = func(*args, **kwargs)
+        if not result:
+            raise RuntimeError(f'{getattr(func, "__name__", func)} failed')
+        return result
+    return wrapper
+
+
+def make_synthetic_zip(zip_path, file_count, file_size, compression=zipfile.ZIP_DEFLATED):
+    """
+    生成一个包含file_count个file_size大小文件的zip，内容一半随机一半重复，接近脚本文件的压缩率
+    """
+    with zipfile.ZipFile(zip_path, 'w', compression) as zip_ref:
+        for i in range(file_count):
+            data = os.urandom(file_size // 2) + b'#' * (file_size - file_size // 2)
+            zip_ref.writestr(f'maya_umbrella/scripts/pkg_{i % 16}/module_{i}.py', data)
+    return zip_path
+
+
+@benchmark('extract_zip')
+def bench_extract_zip(tmp_folder):
+    from maya_umbrella_launcher.archive import extract_zip
+
+    shapes = ((2000, 512), (200, 16 * 1024), (8, 4 * 1024 * 1024))
+    for file_count, file_size in shapes:
+        zip_path = make_synthetic_zip(os.path.join(tmp_folder, f'{file_count}x{file_size}.zip'),
+                                      file_count, file_size)
+        for workers in sorted({1, const.EXTRACT_WORKERS}):
+            yield (f'{file_count}x{file_size}B workers={workers}',
+                   functools.partial(extract_zip, zip_path, os.path.join(tmp_folder, 'out'), workers=workers))
+
+
+def make_plugin_folder(plugin_folder, version_count):
+    """
+    生成一个包含version_count个版本目录的插件目录
+    """
+    for i in range(version_count):
+        os.makedirs(os.path.join(plugin_folder, f'v0.{i}.0', 'maya_umbrella', 'scripts'))
+    return plugin_folder
+
+
+def make_maya_root(root, versions=('2022', '2023', '2024')):
+    """
+    生成假的maya安装目录，代替注册表和真实的安装
+    """
+    from maya_umbrella_launcher.discovery import MAYA_EXECUTABLE
+
+    for version in versions:
+        bin_folder = os.path.join(root, f'maya{version}', 'bin')
+        os.makedirs(bin_folder, exist_ok=True)
+        open(os.path.join(bin_folder, MAYA_EXECUTABLE), 'w').close()
+    return root
+
+
+@contextlib.contextmanager
+def sandbox(tmp_folder):
+    """
+    在临时目录里隔离用户环境
+    设置、maya安装索引、release缓存、启动配置缓存都换到临时目录，maya查找只扫描假的安装目录，
+    退出时恢复原来的设置
+    Return:
+        临时的用户数据目录
+    """
+    from maya_umbrella_launcher.settings import settings, JsonSettingBackend
+    from maya_umbrella_launcher.discovery import maya_discovery, PathBackend
+    from maya_umbrella_launcher.release_cache import release_cache
+    from maya_umbrella_launcher.launch_profile import launch_profile_cache
+
+    data_folder = os.path.join(tmp_folder, 'home', os.path.basename(const.DATA_FOLDER))
+    cache_folder = os.path.join(data_folder, 'cache')
+
+    settings.flush()
+    release_cache.flush()
+    saved = (settings.backend, maya_discovery.backends, maya_discovery.index_file,
+             release_cache.cache_file, launch_profile_cache.cache_file)
+    settings.backend = JsonSettingBackend(os.path.join(data_folder, 'settings.json'))
+    maya_discovery.backends = [PathBackend(roots=[make_maya_root(os.path.join(tmp_folder, 'autodesk'))])]
+    maya_discovery.index_file = os.path.join(cache_folder, maya_discovery.index_file_name)
+    release_cache.cache_file = os.path.join(cache_folder, release_cache.cache_file_name)
+    launch_profile_cache.cache_file = os.path.join(cache_folder, launch_profile_cache.cache_file_name)
+    _reset_caches()
+    try:
+        yield data_folder
+    finally:
+        settings.flush()
+        release_cache.flush()
+        (settings.backend, maya_discovery.backends, maya_discovery.index_file,
+         release_cache.cache_file, launch_profile_cache.cache_file) = saved
+        _reset_caches()
+
+
+def _reset_caches():
+    from maya_umbrella_launcher.settings import settings
+    from maya_umbrella_launcher.discovery import maya_discovery
+    from maya_umbrella_launcher.launch_profile import launch_profile_cache
+
+    settings.reload()
+    maya_discovery._installs = None
+    launch_profile_cache._profiles = None
+
+
+@benchmark('version_list')
+def bench_version_list(tmp_folder):
+    from maya_umbrella_launcher.core import PluginManager
+    from maya_umbrella_launcher.versions import VersionManifest
+
+    for count in (100, 500):
+        plugin_folder = make_plugin_folder(os.path.join(tmp_folder, f'plugins_{count}'), count)
+        manifest = VersionManifest(plugin_folder)
+
+        def scan(plugin_folder=plugin_folder):
+            # 旧的实现: 每次都列出插件目录
+            return [ver for ver in os.listdir(plugin_folder)
+                    if os.path.isdir(os.path.join(plugin_folder, ver)) and ver.startswith('v')]
+
+        yield f'scan {count} versions', scan
+        yield f'rebuild manifest {count} versions', manifest.rebuild
+        yield f'manifest {count} versions', functools.partial(PluginManager.get_local_version_list, plugin_folder)
+
+
+@benchmark('settings')
+def bench_settings(tmp_folder):
+    from maya_umbrella_launcher.core import UserSetting
+
+    count = 1000
+    UserSetting.set('plugin_folder', tmp_folder)
+    UserSetting.flush()
+
+    def get():
+        for _ in range(count):
+            UserSetting.get('plugin_folder')
+            UserSetting.get('proxy_on', '')
+
+    def set_and_flush():
+        for i in range(100):
+            UserSetting.set('setting_window_size', (450, i))
+        UserSetting.flush()
+
+    yield f'{count * 2} gets', get
+    yield '100 sets and flush', set_and_flush
+
+
+@benchmark('python_path_env')
+def bench_python_path_env(tmp_folder):
+    from maya_umbrella_launcher.core import PluginManager, UserSetting
+
+    UserSetting.set('plugin_folder', make_plugin_folder(os.path.join(tmp_folder, 'plugins'), 200))
+    yield 'get_python_path_env 200 versions', PluginManager.get_python_path_env
+
+
+@benchmark('maya_discovery')
+def bench_maya_discovery(tmp_folder):
+    from maya_umbrella_launcher.discovery import maya_discovery
+
+    def load_index():
+        maya_discovery._installs = None
+        return maya_discovery.get_versions()
+
+    yield 'discover fake installs', maya_discovery.refresh
+    yield 'load install index', load_index
+    yield 'in memory', maya_discovery.get_versions
+
+
+@benchmark('launch_profile')
+def bench_launch_profile(tmp_folder):
+    from maya_umbrella_launcher.core import PluginManager
+    from maya_umbrella_launcher.launch_profile import LaunchProfileCache
+
+    plugin_folder = make_plugin_folder(os.path.join(tmp_folder, 'plugins'), 200)
+    cache = LaunchProfileCache(cache_folder=tmp_folder)
+    script_folder = PluginManager.get_maya_umbrella_script_folder(plugin_folder=plugin_folder)
+    cache.set('2024', plugin_folder, os.path.join(tmp_folder, 'maya', 'bin', 'maya.exe'), script_folder)
+
+    def scan():
+        # 旧的实现: 每次都列出插件目录，按字符串取最大的版本
+        versions = [ver for ver in os.listdir(plugin_folder)
+                    if os.path.isdir(os.path.join(plugin_folder, ver)) and ver.startswith('v')]
+        folder = os.path.join(plugin_folder, max(versions), 'maya_umbrella', 'scripts')
+        envs = os.environ.copy()
+        envs['PYTHONPATH'] = envs.get('PYTHONPATH', '') + os.pathsep + folder
+
+    def cold():
+        folder = PluginManager.get_maya_umbrella_script_folder(plugin_folder=plugin_folder)
+        envs = os.environ.copy()
+        envs['PYTHONPATH'] = envs.get('PYTHONPATH', '') + os.pathsep + folder
+
+    def warm():
+        profile = PluginManager.get_launch_profile('2024', plugin_folder=plugin_folder, cache=cache)
+        cache.build_env(profile)
+
+    yield 'scan 200 versions', scan
+    yield 'version manifest', cold
+    yield 'cached profile', warm
+
+
+@benchmark('translator')
+def bench_translator(tmp_folder):
+    import maya_umbrella_launcher.translator as tr
+    from maya_umbrella_launcher.settings import settings
+
+    count = 1000
+    messages = [getattr(tr, name) for name in ('launch_bt', 'install_desc', 'download_failed', 'proxy_label')]
+    per_language = [{language: str(message) for language in tr.LANGUAGES} for message in messages]
+
+    def settings_lookup():
+        # 旧的实现: 每次访问都从设置里读取当前语言，再查每条消息自己的字典
+        for _ in range(count):
+            for texts in per_language:
+                texts[settings.get('language', 'cn')]
+
+    def compiled_catalog():
+        for _ in range(count):
+            for message in messages:
+                message.text
+
+    yield f'{count * len(messages)} lookups, settings per call', settings_lookup
+    yield f'{count * len(messages)} lookups, compiled catalog', compiled_catalog
+
+    try:
+        from PySide2 import QtCore
+    except ImportError:
+        return
+
+    def qsettings_lookup():
+        # 最早的实现: 每次访问都新建QSettings
+        for _ in range(count):
+            for texts in per_language:
+                texts[QtCore.QSettings(const.SETTING_FLAG).value('language', 'cn')]
+
+    yield f'{count * len(messages)} lookups, QSettings per call', qsettings_lookup
+
+
+def serve_files(files, ranges=True):
+    """
+    在本地启动一个支持Range的HTTP服务器
+    Args:
+        files(dict): {路径: bytes}，服务器启动后还可以添加
+        ranges(bool): 为False时忽略Range请求头，总是返回完整的文件，模拟不支持Range的服务器
+    Return:
+        (服务器, 根url)，用完后调用服务器的shutdown()
+    """
+    import re
+    import threading
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def handle(self):
+            # 客户端关闭连接池里的空闲连接时不输出异常
+            try:
+                super(Handler, self).handle()
+            except ConnectionError:
+                pass
+
+        def do_GET(self):
+            data = files.get(self.path.split('?')[0])
+            if data is None:
+                self.send_response(404)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+            match = re.match(r'bytes=(\d+)-(\d*)', self.headers.get('Range', ''))
+            if match and ranges:
+                start = int(match.group(1))
+                end = min(int(match.group(2) or len(data) - 1), len(data) - 1)
+                self.send_response(206)
+                self.send_header('Content-Range', f'bytes {start}-{end}/{len(data)}')
+            else:
+                start, end = 0, len(data) - 1
+                self.send_response(200)
+            self.send_header('Content-Length', str(end - start + 1))
+            self.send_header('ETag', f'"{len(data):x}"')
+            self.end_headers()
+            self.wfile.write(memoryview(data)[start:end + 1])
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def serve_bytes(data, ranges=True):
+    """
+    Return:
+        (服务器, 文件url)
+    """
+    server, base_url = serve_files({'/maya_umbrella.zip': data}, ranges=ranges)
+    return server, f'{base_url}/maya_umbrella.zip'
+
+
+def serve_fake_github(zip_data, tag_name='v1.0.0', ranges=True):
+    """
+    模拟GitHub API的最新release接口和资源下载
+    Return:
+        (服务器, api地址)，api地址可以作为release_sources使用
+    """
+    files = {}
+    server, base_url = serve_files(files, ranges=ranges)
+    asset_path = f'/download/{tag_name}/{const.REPO_NAME}.zip'
+    release = {'tag_name': tag_name,
+               'assets': [{'name': f'{const.REPO_NAME}.zip', 'browser_download_url': base_url + asset_path}]}
+    files[f'/repos/{const.USER_NAME}/{const.REPO_NAME}/releases/latest'] = json.dumps(release).encode('utf-8')
+    files[asset_path] = zip_data
+    # 作为镜像源使用时的健康检查
+    files['/health'] = b'{"status": "ok"}'
+    return server, base_url
+
+
+@benchmark('download_release')
+def bench_download_release(tmp_folder):
+    from maya_umbrella_launcher.core import PluginManager, UserSetting
+    from maya_umbrella_launcher.github_utils import download_release_files
+
+    zip_path = make_synthetic_zip(os.path.join(tmp_folder, 'release.zip'), 500, 16 * 1024)
+    with open(zip_path, 'rb') as f:
+        server, api_base = serve_fake_github(f.read())
+    file_url = f'{api_base}/download/v1.0.0/{const.REPO_NAME}.zip'
+    save_path = os.path.join(tmp_folder, 'download', f'{const.REPO_NAME}.zip')
+    plugin_folder = os.path.join(tmp_folder, 'plugins')
+    os.makedirs(os.path.dirname(save_path))
+    os.makedirs(plugin_folder)
+    UserSetting.set('plugin_folder', plugin_folder)
+    UserSetting.set('release_sources', [api_base])
+    proxies = {'http': None, 'https': None}
+
+    def download():
+        if os.path.exists(save_path):
+            os.remove(save_path)
+        return download_release_files(file_url, save_path, proxies=proxies)
+
+    try:
+        yield f'download_release_files {os.path.getsize(zip_path) >> 10}KB', expect(download)
+        yield 'download_plugin (download, extract, publish)', \
+            expect(PluginManager.download_plugin, proxies=proxies, overwrite=True, stream_extract=False)
+        yield 'download_plugin stream extract', \
+            expect(PluginManager.download_plugin, proxies=proxies, overwrite=True, stream_extract=True)
+    finally:
+        server.shutdown()
+
+
+def make_release_zips(folder, file_count, file_size, changed_count):
+    """
+    生成两个版本的release zip，第二个版本只有changed_count个文件不同，另外新增一个文件
+    Return:
+        (旧版本zip的内容, 新版本zip的内容)
+    """
+    files = {f'scripts/pkg_{i % 16}/module_{i}.py': os.urandom(file_size // 2) + b'#' * (file_size - file_size // 2)
+             for i in range(file_count)}
+    new_files = dict(files)
+    for name in sorted(files)[:changed_count]:
+        new_files[name] = os.urandom(file_size // 2) + b'#' * (file_size - file_size // 2)
+    new_files['scripts/added.py'] = os.urandom(file_size)
+
+    result = []
+    for index, contents in enumerate((files, new_files)):
+        zip_path = os.path.join(folder, f'release_{index}.zip')
+        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zip_ref:
+            for name, data in contents.items():
+                zip_ref.writestr(name, data)
+        with open(zip_path, 'rb') as f:
+            result.append(f.read())
+    return tuple(result)
+
+
+@benchmark('delta_update')
+def bench_delta_update(tmp_folder):
+    from maya_umbrella_launcher.core import PluginManager, UserSetting
+    from maya_umbrella_launcher.delta import DeltaInstaller
+
+    old_data, new_data = make_release_zips(tmp_folder, 500, 16 * 1024, 10)
+    plugin_folder = os.path.join(tmp_folder, 'plugins')
+    os.makedirs(plugin_folder)
+    UserSetting.set('plugin_folder', plugin_folder)
+    proxies = {'http': None, 'https': None}
+
+    server, api_base = serve_fake_github(old_data, 'v1.0.0')
+    try:
+        UserSetting.set('release_sources', [api_base])
+        expect(PluginManager.download_plugin, proxies=proxies, delta_update=False)()
+    finally:
+        server.shutdown()
+
+    server, api_base = serve_fake_github(new_data, 'v1.1.0')
+    UserSetting.set('release_sources', [api_base])
+    try:
+        # 先单独做一次增量更新，统计下载的字节数
+        installer = DeltaInstaller(f'{api_base}/download/v1.1.0/{const.REPO_NAME}.zip',
+                                   os.path.join(tmp_folder, 'delta'), os.path.join(plugin_folder, 'v1.0.0'),
+                                   proxies=proxies)
+        if not installer.install():
+            raise RuntimeError('delta update was not used')
+        fetched, size = installer.stats['fetched'], installer.stats['size']
+        if fetched * 10 > size:
+            raise RuntimeError(f'delta update downloaded {fetched} of {size} bytes')
+
+        yield f'full download_plugin {size >> 10}KB', \
+            expect(PluginManager.download_plugin, proxies=proxies, overwrite=True, delta_update=False)
+        yield f'delta download_plugin {fetched >> 10}KB', \
+            expect(PluginManager.download_plugin, proxies=proxies, overwrite=True, delta_update=True)
+    finally:
+        server.shutdown()
+
+
+@benchmark('download_chunking')
+def bench_download_chunking(tmp_folder):
+    from maya_umbrella_launcher.downloader import RangedDownloader
+
+    size = 64 * 1024 * 1024
+    server, url = serve_bytes(os.urandom(size))
+    save_path = os.path.join(tmp_folder, 'maya_umbrella.zip')
+
+    def download(chunk_size, adaptive_chunk):
+        RangedDownloader(url, save_path, proxies={'http': None, 'https': None}, chunk_size=chunk_size,
+                         segment_size=8 * 1024 * 1024, adaptive_chunk=adaptive_chunk).download()
+
+    try:
+        yield f'{size >> 20}MB fixed 8KB chunks', functools.partial(download, 8 * 1024, False)
+        yield f'{size >> 20}MB fixed 64KB chunks', functools.partial(download, const.DOWNLOAD_CHUNK_SIZE, False)
+        yield f'{size >> 20}MB adaptive chunks', functools.partial(download, const.DOWNLOAD_CHUNK_SIZE, True)
+    finally:
+        server.shutdown()
+
+
+@benchmark('http_session')
+def bench_http_session(tmp_folder):
+    import requests
+    from maya_umbrella_launcher.http_client import HttpClient
+
+    count = 50
+    server, url = serve_bytes(b'{"tag_name": "v0.0.0"}')
+    client = HttpClient()
+    no_proxies = {'http': None, 'https': None}
+
+    def bare_requests():
+        # 旧的实现: 每次请求都新建连接
+        for _ in range(count):
+            requests.get(url, proxies=no_proxies, timeout=10).content
+
+    def pooled_session():
+        for _ in range(count):
+            client.get(url, proxies=no_proxies).content
+
+    try:
+        yield f'{count} requests, requests.get', bare_requests
+        yield f'{count} requests, pooled session', pooled_session
+    finally:
+        client.close()
+        server.shutdown()
+
+
+@benchmark('gui_tasks')
+def bench_gui_tasks(tmp_folder):
+    # 界面线程每次点击被占用的时间，网络请求用固定延迟模拟，超过16ms就会掉帧
+    try:
+        from maya_umbrella_launcher.tasks import TaskPool
+    except ImportError:
+        return
+
+    pool = TaskPool()
+
+    def fake_request():
+        time.sleep(0.05)
+        return 'v0.0.0'
+
+    yield 'check update on gui thread', fake_request
+    yield 'check update via task pool', functools.partial(pool.run, fake_request)
+    pool.set_cached('latest_version', fake_request())
+    yield 'cached check update', functools.partial(pool.run, fake_request, cache_key='latest_version')
+
+
+@benchmark('logging')
+def bench_logging(tmp_folder):
+    # 调用线程每条日志被占用的时间，另外几个线程同时写日志，模拟下载和解压时的负载
+    # slow disk模拟网络盘上的用户目录，每次写入多等待0.2ms
+    import logging
+    import threading
+    from maya_umbrella_launcher.log import AsyncQueueHandler, create_handlers
+
+    count = 1000
+
+    class SlowFileHandler(logging.FileHandler):
+        def emit(self, record):
+            time.sleep(0.0002)
+            super(SlowFileHandler, self).emit(record)
+
+    def make_logger(name, handler):
+        _logger = logging.getLogger(f'mul_bench.{name}')
+        _logger.propagate = False
+        _logger.setLevel(logging.DEBUG)
+        _logger.handlers = [handler]
+        return _logger
+
+    def async_handler(name, handler_class=None):
+        def factory():
+            if handler_class:
+                return [handler_class(os.path.join(tmp_folder, f'{name}.log'))]
+            return create_handlers(os.path.join(tmp_folder, f'{name}.log'), console=False)
+        return AsyncQueueHandler(factory)
+
+    loggers = [
+        ('sync FileHandler', make_logger('sync', logging.FileHandler(os.path.join(tmp_folder, 'sync.log')))),
+        ('async queue', make_logger('async', async_handler('async'))),
+        ('sync FileHandler, slow disk',
+         make_logger('sync_slow', SlowFileHandler(os.path.join(tmp_folder, 'sync_slow.log')))),
+        ('async queue, slow disk', make_logger('async_slow', async_handler('async_slow', SlowFileHandler))),
+    ]
+
+    for case, _logger in loggers:
+        stop = threading.Event()
+
+        def background(_logger=_logger, stop=stop):
+            while not stop.wait(0.002):
+                _logger.debug('background %s', 'chunk')
+
+        threads = [threading.Thread(target=background, daemon=True) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        try:
+            yield (f'{count} calls, {case}',
+                   lambda _logger=_logger: [_logger.debug('download progress %d', i) for i in range(count)])
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+            for handler in _logger.handlers:
+                handler.close()
+
+
+@benchmark('profiling')
+def bench_profiling(tmp_folder):
+    # 没有开启性能分析时span和traced的额外开销，和开启trace时每个区间的开销
+    from maya_umbrella_launcher.profiling import span, traced, tracer
+
+    count = 100000
+
+    def plain():
+        return None
+
+    decorated = traced('bench')(plain)
+
+    def with_span():
+        with span('bench'):
+            return None
+
+    was_enabled, output = tracer.enabled, tracer.output
+    yield f'{count} calls, plain function', lambda: [plain() for _ in range(count)]
+    tracer.enabled = False
+    try:
+        yield f'{count} calls, traced, disabled', lambda: [decorated() for _ in range(count)]
+        yield f'{count} calls, span, disabled', lambda: [with_span() for _ in range(count)]
+        tracer.enable(os.path.join(tmp_folder, 'trace.json'))
+        yield f'{count} calls, traced, enabled', lambda: [decorated() for _ in range(count)]
+    finally:
+        tracer.enabled, tracer.output = was_enabled, output
+        tracer.clear()
+
+
+def make_cli_home(tmp_folder):
+    """
+    生成命令行子进程使用的用户目录，设置里的插件目录有200个版本
+    Return:
+        环境变量
+    """
+    home = os.path.join(tmp_folder, 'home')
+    data_folder = os.path.join(home, os.path.basename(const.DATA_FOLDER))
+    os.makedirs(data_folder, exist_ok=True)
+    plugin_folder = make_plugin_folder(os.path.join(tmp_folder, 'cli_plugins'), 200)
+    with open(os.path.join(data_folder, 'settings.json'), 'w', encoding='utf-8') as f:
+        json.dump({'plugin_folder': plugin_folder}, f)
+
+    return {'HOME': home,
+            'USERPROFILE': home,
+            'MUL_SETTING_BACKEND': 'json',
+            'MUL_MAYA_INSTALL_ROOTS': make_maya_root(os.path.join(tmp_folder, 'autodesk')),
+            'MUL_RELEASE_SOURCES': 'http://127.0.0.1:9'}
+
+
+def cli_command(args, importtime=False, home_envs=None):
+    """
+    获取用子进程运行launcher_cmd的命令和环境变量
+    Args:
+        home_envs(dict): make_cli_home返回的环境变量，子进程不使用真实的用户目录
+    """
+    command = [sys.executable]
+    if importtime:
+        command += ['-X', 'importtime']
+    command += ['-m', 'maya_umbrella_launcher.launcher_cmd'] + list(args)
+
+    envs = os.environ.copy()
+    envs.update(home_envs or {})
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    envs['PYTHONPATH'] = os.pathsep.join(filter(None, [package_root, envs.get('PYTHONPATH', '')]))
+    return command, envs
+
+
+@benchmark('cli_startup')
+def bench_cli_startup(tmp_folder):
+    home_envs = make_cli_home(tmp_folder)
+    for args in CLI_COMMANDS:
+        command, envs = cli_command(args, home_envs=home_envs)
+        yield (' '.join(args),
+               functools.partial(subprocess.run, command, env=envs,
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+
+
+def measure_gui_startup(home_envs=None):
+    """
+    在offscreen平台的子进程里打开主窗口，不需要显示器
+    Return:
+        {'import': 导入和创建QApplication, 'create': 创建主窗口, 'first_paint': 到第一次绘制}，单位为秒
+    """
+    _, envs = cli_command([], home_envs=home_envs)
+    envs['QT_QPA_PLATFORM'] = 'offscreen'
+    # 图标等资源按相对路径查找，和打包后一样在包目录里运行
+    result = subprocess.run([sys.executable, '-c', GUI_STARTUP_SCRIPT], env=envs,
+                            cwd=os.path.dirname(os.path.abspath(__file__)),
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if result.returncode:
+        raise RuntimeError(f'GUI startup failed: {result.stderr.strip()[-500:]}')
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+@benchmark('gui_startup')
+def bench_gui_startup(tmp_folder):
+    # 冷启动主窗口，超过GUI_FIRST_PAINT_BUDGET时失败，没有安装PySide2和dayu_widgets时跳过
+    import importlib.util
+
+    missing = [name for name in ('PySide2', 'dayu_widgets') if not importlib.util.find_spec(name)]
+    if missing:
+        raise BenchmarkSkipped(f'{", ".join(missing)} not installed')
+    home_envs = make_cli_home(tmp_folder)
+
+    def first_paint():
+        phases = measure_gui_startup(home_envs)
+        if phases['first_paint'] > GUI_FIRST_PAINT_BUDGET:
+            raise RuntimeError(f'First paint took {phases["first_paint"]:.3f} s, '
+                               f'budget {GUI_FIRST_PAINT_BUDGET:.3f} s: {phases}')
+        return phases
+
+    yield 'cold start to first paint, offscreen', first_paint
+
+
+def measure_import_time(args, home_envs=None):
+    """
+    用`python -X importtime`运行launcher_cmd，统计导入耗时
+    Return:
+        {'total_us': 顶层导入的累计耗时, 'heavy_modules': 加载了的重量级模块,
+         'top_modules': 累计耗时最多的10个顶层导入}
+    """
+    command, envs = cli_command(args, importtime=True, home_envs=home_envs)
+    stderr = subprocess.run(command, env=envs, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, text=True).stderr
+
+    top_level = {}
+    loaded = set()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not cumulative.strip().isdigit():
+            continue
+        loaded.add(name.strip().split('.')[0])
+        if not name.startswith('  '):
+            top_level[name.strip()] = int(cumulative)
+        # importtime按导入完成的顺序输出，site及之前的是解释器启动时的导入，不计入
+        if name.strip() == 'site':
+            top_level.clear()
+            loaded.clear()
+
+    top_modules = sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:10]
+    return {'total_us': sum(top_level.values()),
+            'heavy_modules': sorted(loaded.intersection(HEAVY_MODULES)),
+            'top_modules': dict(top_modules)}
+
+
+def run(names=None, repeat=5):
+    """
+    运行性能测试
+    Return:
+        {测试名: {用例名: {'min', 'median', 'max'}}}，单位为秒；
+        跳过的测试为{测试名: {'skipped': {'reason': 原因}}}
+    """
+    results = {}
+    for name in names or sorted(BENCHMARKS):
+        tmp_folder = tempfile.mkdtemp(prefix=f'mul_bench_{name}_')
+        try:
+            results[name] = {}
+            with sandbox(tmp_folder):
+                for case, func in BENCHMARKS[name](tmp_folder):
+                    func()
+                    costs = []
+                    for _ in range(repeat):
+                        start = time.perf_counter()
+                        func()
+                        costs.append(time.perf_counter() - start)
+                    results[name][case] = {'min': min(costs),
+                                           'median': statistics.median(costs),
+                                           'max': max(costs)}
+                    print(f'{name:<20} {case:<40} min {min(costs) * 1000:10.3f} ms  '
+                          f'median {statistics.median(costs) * 1000:10.3f} ms')
+        except BenchmarkSkipped as e:
+            results[name] = {'skipped': {'reason': str(e)}}
+            print(f'{name:<20} SKIPPED: {e}')
+        finally:
+            shutil.rmtree(tmp_folder, ignore_errors=True)
+    return results
+
+
+def run_import_time():
+    """
+    Return:
+        {命令: measure_import_time的结果}
+    """
+    tmp_folder = tempfile.mkdtemp(prefix='mul_bench_importtime_')
+    try:
+        home_envs = make_cli_home(tmp_folder)
+        reports = {}
+        for cli_args in CLI_COMMANDS:
+            report = reports[' '.join(cli_args)] = measure_import_time(cli_args, home_envs=home_envs)
+            print(f'{"importtime":<20} {" ".join(cli_args):<40} total {report["total_us"] / 1000:10.3f} ms  '
+                  f'heavy: {", ".join(report["heavy_modules"]) or "-"}')
+        return reports
+    finally:
+        shutil.rmtree(tmp_folder, ignore_errors=True)
+
+
+def save_results(path, results, repeat):
+    """
+    保存结果，附带运行环境，方便判断两次结果是否可以比较
+    """
+    from maya_umbrella_launcher.__version__ import __version__
+
+    data = {'meta': {'version': __version__,
+                     'python': platform.python_version(),
+                     'platform': platform.platform(),
+                     'cpu_count': os.cpu_count(),
+                     'repeat': repeat,
+                     'time': time.strftime('%Y-%m-%dT%H:%M:%S')},
+            'results': results}
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=4)
+
+
+def load_results(path):
+    with open(path, 'r') as f:
+        data = json.load(f)
+    # 兼容只保存了结果的旧文件
+    return data.get('results', data) if isinstance(data, dict) else {}
+
+
+def compare(results, baseline, threshold=0.25, min_delta=0.0005):
+    """
+    和基准结果比较中位数
+    Args:
+        threshold(float): 变慢超过这个比例视为回退
+        min_delta(float): 变慢的绝对值小于这个秒数时忽略，避免很快的用例被计时抖动误报
+    Return:
+        [(测试名, 用例名, 基准中位数, 当前中位数)]，变慢的用例
+    """
+    regressions = []
+    for name, cases in results.items():
+        for case, result in cases.items():
+            base = baseline.get(name, {}).get(case)
+            if not isinstance(base, dict) or 'median' not in base or 'median' not in result:
+                continue
+            now, before = result['median'], base['median']
+            ratio = now / before if before else 1.0
+            print(f'{name:<20} {case:<40} {before * 1000:10.3f} ms -> {now * 1000:10.3f} ms  {ratio:6.2f}x')
+            if now - before > max(before * threshold, min_delta):
+                regressions.append((name, case, before, now))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Maya Umbrella Launcher benchmark')
+    parser.add_argument('names', nargs='*', help=f'benchmark names: {", ".join(sorted(BENCHMARKS))}')
+    parser.add_argument('--repeat', type=int, default=5, help='repeat count of each case')
+    parser.add_argument('--json', type=str, help='save results to a json file')
+    parser.add_argument('--baseline', type=str, help='compare medians with a saved json file')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='slowdown ratio reported as a regression, default 0.25')
+    parser.add_argument('--importtime', action='store_true', help='report python -X importtime of cli commands')
+    args = parser.parse_args()
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f'unknown benchmark: {", ".join(sorted(unknown))}')
+
+    results = run(args.names, repeat=args.repeat)
+    if args.importtime:
+        results['cli_importtime'] = run_import_time()
+    if args.json:
+        save_results(args.json, results, args.repeat)
+
+    if args.baseline:
+        regressions = compare(results, load_results(args.baseline), threshold=args.threshold)
+        for name, case, before, now in regressions:
+            print(f'REGRESSION {name} / {case}: {before * 1000:.3f} ms -> {now * 1000:.3f} ms')
+        return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
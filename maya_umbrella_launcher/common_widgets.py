@@ -1,5 +1,11 @@
+import os
+import hashlib
+
 import dayu_widgets as dy
-from PySide2 import QtWidgets, QtCore
+from PySide2 import QtWidgets, QtCore, QtGui
+
+import maya_umbrella_launcher.constant as const
+from maya_umbrella_launcher.log import logger
 
 
 class WidgetMixin(object):
@@ -79,3 +85,194 @@ def show_message(text, duration=3.0, typ='info', pos_center=False, parent=None):
     else:
         msg = getattr(dy.MMessage, typ)(text=text, duration=duration, parent=parent)
     msg.show()
+
+
+class IconCache(object):
+    """
+    图标缓存
+    dayu_widgets每次启动都要解析svg再栅格化，这里把栅格化的结果按(文件, 颜色, 尺寸, 设备像素比)保存成png，
+    之后启动直接读取png，进程内同一个图标只创建一次QIcon。高分屏上按物理像素栅格化，图标不会模糊。
+    """
+
+    def __init__(self, cache_folder=const.ICON_CACHE_FOLDER, size=const.ICON_SIZE):
+        self.cache_folder = cache_folder
+        self.size = size
+        self._icons = {}
+
+    def get(self, path, color=None):
+        """
+        Args:
+            path(str): 图标路径，查找方式和dayu_widgets一致
+            color(str): 替换svg里#555555的颜色，默认为当前主题的图标颜色
+        Return:
+            QtGui.QIcon
+        """
+        if path.endswith('.svg'):
+            color = color or dy.dayu_theme.icon_color
+        else:
+            color = None
+        ratio = get_device_pixel_ratio()
+        key = (path, color, ratio)
+        icon = self._icons.get(key)
+        if icon is None:
+            icon = self._icons[key] = QtGui.QIcon(self.get_pixmap(path, color, ratio))
+        return icon
+
+    def get_pixmap(self, path, color=None, ratio=1.0):
+        """
+        Args:
+            ratio(float): 设备像素比，svg按size * ratio的物理像素栅格化
+        """
+        from dayu_widgets.utils import get_static_file
+
+        full_path = get_static_file(path)
+        if not full_path:
+            logger.warning(f'Icon not found: {path}')
+            return QtGui.QPixmap()
+        if not full_path.endswith('.svg'):
+            return QtGui.QPixmap(full_path)
+
+        stat = os.stat(full_path)
+        digest = hashlib.sha1(f'{full_path}|{stat.st_mtime_ns}|{stat.st_size}|{color}|{self.size}|{ratio}'
+                              .encode('utf-8')).hexdigest()[:16]
+        name = os.path.splitext(os.path.basename(full_path))[0]
+        cache_path = os.path.join(self.cache_folder, f'{name}-{digest}.png')
+
+        pixmap = QtGui.QPixmap()
+        if os.path.isfile(cache_path) and pixmap.load(cache_path, 'PNG'):
+            pixmap.setDevicePixelRatio(ratio)
+            return pixmap
+
+        pixmap = self.render(full_path, color, ratio)
+        try:
+            os.makedirs(self.cache_folder, exist_ok=True)
+            tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+            if pixmap.save(tmp_path, 'PNG'):
+                os.replace(tmp_path, cache_path)
+        except OSError as e:
+            logger.debug(f'Failed to cache icon {cache_path}: {e}')
+        return pixmap
+
+    def render(self, svg_path, color=None, ratio=1.0):
+        """
+        把svg栅格化成size x size（逻辑像素）的QPixmap
+        Args:
+            ratio(float): 设备像素比
+        """
+        from PySide2.QtSvg import QSvgRenderer
+
+        with open(svg_path, 'r', encoding='utf-8') as f:
+            data = f.read()
+        if color:
+            data = data.replace('#555555', color)
+
+        renderer = QSvgRenderer(QtCore.QByteArray(data.encode('utf-8')))
+        physical_size = int(round(self.size * ratio))
+        pixmap = QtGui.QPixmap(physical_size, physical_size)
+        pixmap.fill(QtCore.Qt.transparent)
+        painter = QtGui.QPainter(pixmap)
+        renderer.render(painter)
+        painter.end()
+        pixmap.setDevicePixelRatio(ratio)
+        return pixmap
+
+
+def get_device_pixel_ratio():
+    """
+    获取设备像素比，多个屏幕时为最大的一个，没有QApplication时为1.0
+    """
+    app = QtGui.QGuiApplication.instance()
+    return app.devicePixelRatio() if app else 1.0
+
+
+class IconToolButton(dy.MToolButton):
+    """
+    使用icon_cache的图标按钮，鼠标悬停时显示主题色的图标
+    """
+
+    def __init__(self, svg_path, parent=None):
+        super(IconToolButton, self).__init__(parent=parent)
+        self.svg_path = svg_path
+        self.refresh_icon()
+
+    def refresh_icon(self):
+        self.setIcon(icon_cache.get(self.svg_path))
+
+    def enterEvent(self, event):
+        self.setIcon(icon_cache.get(self.svg_path, dy.dayu_theme.primary_color))
+        return super(IconToolButton, self).enterEvent(event)
+
+    def leaveEvent(self, event):
+        self.refresh_icon()
+        return super(IconToolButton, self).leaveEvent(event)
+
+
+class _StyleSheetRecorder(object):
+    """
+    接收MTheme.apply生成的样式表
+    """
+
+    style_sheet = ''
+
+    def setStyleSheet(self, style_sheet):
+        self.style_sheet = style_sheet
+
+
+class ThemeManager(object):
+    """
+    界面主题
+    每个主题的样式表只生成一次，每个窗口只应用一次，子控件一起生效。
+    dayu_widgets的部分控件（比如MComboBox）创建时会把全局的dy.dayu_theme应用到自己身上，
+    所以全局主题也切换成相同的主题，这些控件创建时就是正确的样式，不需要再逐个应用。
+    """
+
+    def __init__(self):
+        self.name = None
+        self._themes = {}
+        self._style_sheets = {}
+
+    def get_theme(self, name):
+        if name not in self._themes:
+            self._themes[name] = dy.MTheme(theme=name)
+        return self._themes[name]
+
+    def get_style_sheet(self, name):
+        if name not in self._style_sheets:
+            recorder = _StyleSheetRecorder()
+            self.get_theme(name).apply(recorder)
+            self._style_sheets[name] = recorder.style_sheet
+        return self._style_sheets[name]
+
+    def set_theme(self, name):
+        """
+        设置当前主题，在创建窗口的控件之前调用
+        """
+        if name == self.name:
+            return
+        theme = self.get_theme(name)
+        dy.dayu_theme.set_theme(name)
+        dy.dayu_theme.set_primary_color(theme.primary_color)
+        self.name = name
+
+    def apply(self, widget):
+        """
+        把当前主题应用到窗口上，在创建完控件之后、显示之前调用
+        """
+        widget.setStyleSheet(self.get_style_sheet(self.name))
+
+    def switch(self, name):
+        """
+        切换主题，只重新设置带有旧主题样式表的窗口和控件，刷新图标按钮的颜色
+        """
+        previous = self.get_style_sheet(self.name) if self.name else None
+        self.set_theme(name)
+        style_sheet = self.get_style_sheet(name)
+        for widget in QtWidgets.QApplication.instance().allWidgets():
+            if previous and widget.styleSheet() == previous:
+                widget.setStyleSheet(style_sheet)
+            if isinstance(widget, IconToolButton):
+                widget.refresh_icon()
+
+
+icon_cache = IconCache()
+theme_manager = ThemeManager()
@@ -1,3 +1,6 @@
+import os
+import sys
+
 from maya_umbrella_launcher.__version__ import __version__
 
 
@@ -6,3 +9,99 @@ SETTING_FLAG = 'MAYA_UMBRELLA_SETTING_FLAG'
 
 USER_NAME = 'loonghao'
 REPO_NAME = 'maya_umbrella'
+GITHUB_API = 'https://api.github.com'
+
+# download
+DOWNLOAD_CONNECTIONS = 4
+DOWNLOAD_SEGMENT_SIZE = 1024 * 1024
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+DOWNLOAD_MIN_CHUNK_SIZE = 16 * 1024
+DOWNLOAD_MAX_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_CHUNK_TARGET_TIME = 0.05
+DOWNLOAD_WRITE_BUFFER_CHUNKS = 4
+PROGRESS_INTERVAL = 0.2
+PROGRESS_WINDOW = 3.0
+
+# http
+HTTP_CONNECT_TIMEOUT = 10
+HTTP_READ_TIMEOUT = 30
+HTTP_RETRIES = 3
+HTTP_BACKOFF_FACTOR = 0.5
+HTTP_BACKOFF_JITTER = 0.5
+HTTP_POOL_SIZE = max(10, DOWNLOAD_CONNECTIONS)
+
+# release mirror
+RELEASE_SOURCES = [source for source in os.environ.get('MUL_RELEASE_SOURCES', '').split(',') if source]
+SOURCE_HEALTH_TTL = 30
+SOURCE_HEALTH_TIMEOUT = 2
+MIRROR_HOST = '127.0.0.1'
+MIRROR_PORT = 8765
+MIRROR_REFRESH_INTERVAL = 10 * 60
+
+EXTRACT_WORKERS = min(8, (os.cpu_count() or 1) * 2)
+
+# data
+DATA_FOLDER = os.path.join(os.path.expanduser('~'), '.maya_umbrella_launcher')
+CACHE_FOLDER = os.path.join(DATA_FOLDER, 'cache')
+SETTING_FILE = os.path.join(DATA_FOLDER, 'settings.json')
+SESSION_FOLDER = os.path.join(DATA_FOLDER, 'sessions')
+SETTING_BACKEND = os.environ.get('MUL_SETTING_BACKEND', 'json')
+SETTING_FLUSH_DELAY = 1.0
+SETTING_CHECK_INTERVAL = 0.5
+RELEASE_CACHE_TTL = 10 * 60
+
+# log
+LOG_FILE = os.path.join(os.path.expanduser('~'), 'maya_umbrella_launcher.log')
+LOG_FORMAT = os.environ.get('MUL_LOG_FORMAT', 'text')
+LOG_CONSOLE_LEVEL = os.environ.get('MUL_LOG_LEVEL', 'DEBUG').upper()
+LOG_MAX_SIZE = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+# profile
+PROFILE = os.environ.get('MUL_PROFILE', '')
+PROFILE_OUTPUT = os.environ.get('MUL_PROFILE_OUTPUT', '')
+PROFILE_FOLDER = os.path.join(DATA_FOLDER, 'profiles')
+PROFILE_TRACE = 'trace'
+PROFILE_CPROFILE = 'cprofile'
+PROFILE_MODES = (PROFILE_TRACE, PROFILE_CPROFILE)
+PROFILE_TOP = 30
+
+# plugin install
+STAGING_FOLDER_NAME = '.staging'
+LOCK_FOLDER_NAME = '.locks'
+INSTALL_LOCK_TIMEOUT = 30 * 60
+INSTALL_LOCK_POLL_INTERVAL = 0.5
+VERSION_MANIFEST_NAME = 'versions.json'
+CHANNEL_STABLE = 'stable'
+CHANNEL_BETA = 'beta'
+CHANNELS = (CHANNEL_STABLE, CHANNEL_BETA)
+RELEASE_LIST_SIZE = 30
+
+# delta update
+FILE_MANIFEST_NAME = 'files.json'
+DELTA_TAIL_SIZE = 64 * 1024 + 22
+DELTA_READ_BLOCK = 64 * 1024
+DELTA_MERGE_GAP = 16 * 1024
+DELTA_MAX_RATIO = 0.5
+
+# maya discovery
+MAYA_INSTALL_ROOTS = [root for root in os.environ.get('MUL_MAYA_INSTALL_ROOTS', '').split(os.pathsep) if root] or \
+    (['/usr/autodesk'] if sys.platform.startswith('linux') else [])
+
+# process supervisor
+SESSION_POLL_INTERVAL = 1.0
+SESSION_LOG_MAX_SIZE = 10 * 1024 * 1024
+SESSION_LOG_BACKUP_COUNT = 3
+SESSION_KEEP_COUNT = 100
+SESSION_MAX_RESTARTS = 3
+
+# launch latency
+READY_MARKER_ENV = 'MUL_READY_MARKER'
+READY_TIMEOUT = 15 * 60
+READY_POLL_INTERVAL = 0.5
+LATENCY_KEEP_SAMPLES = 200
+
+# gui
+TASK_MAX_THREADS = 4
+ICON_CACHE_FOLDER = os.path.join(CACHE_FOLDER, 'icons')
+ICON_SIZE = 128
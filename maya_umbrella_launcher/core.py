@@ -1,29 +1,40 @@
 import os
-
-from PySide2 import QtCore
+import time
 
 import maya_umbrella_launcher.translator as tr
 import maya_umbrella_launcher.constant as const
 from maya_umbrella_launcher.log import logger
-from maya_umbrella_launcher.github_utils import get_latest_release, download_release_files
-from maya_umbrella_launcher.filesystem import (create_folder_if_not_exist, extract_zip,
-                                               validate_folder_exist, MayaSystem)
+from maya_umbrella_launcher.settings import settings
+from maya_umbrella_launcher.profiling import traced
+from maya_umbrella_launcher.launch_profile import launch_profile_cache
+from maya_umbrella_launcher.filesystem import create_folder_if_not_exist, validate_folder_exist, replace_folder, \
+    remove_folder, FileLock, MayaSystem
+
+# 网络、解压相关的模块（requests, zipfile等）在用到的函数里按需导入，
+# 命令行只读写设置或启动maya时不需要加载它们
 
 
 class UserSetting(object):
     """
     用户设置
+    读写的是进程内缓存，修改会在空闲或退出时批量写回，见settings.SettingCache
     """
 
     @staticmethod
     def get(key, default=None):
-        setting = QtCore.QSettings(const.SETTING_FLAG)
-        return setting.value(key, default)
+        return settings.get(key, default)
+
+    @staticmethod
+    def get_bool(key, default=False):
+        return settings.get_bool(key, default)
 
     @staticmethod
     def set(key, value):
-        setting = QtCore.QSettings(const.SETTING_FLAG)
-        setting.setValue(key, value)
+        settings.set(key, value)
+
+    @staticmethod
+    def flush():
+        settings.flush()
 
 
 class PluginManager:
@@ -32,25 +43,40 @@ class PluginManager:
     """
 
     @classmethod
-    def get_maya_umbrella_script_folder(cls):
+    @traced('plugin.resolve_version')
+    def get_maya_umbrella_script_folder(cls, plugin_folder=None, maya_version=None):
         """
         获取maya_umbrella的script目录
+        使用的版本由插件目录的版本清单决定，见versions.VersionManifest.resolve
+        Args:
+            maya_version(str): maya版本号，用于查找固定的插件版本
         """
-        plugin_folder = UserSetting.get('plugin_folder')
+        from maya_umbrella_launcher.versions import VersionManifest
+
+        plugin_folder = plugin_folder or UserSetting.get('plugin_folder')
         if not validate_folder_exist(plugin_folder):
             return logger.warning(tr.no_plugin_folder.text)
 
-        versions = cls.get_local_version_list(plugin_folder)
-        if not versions:
-            return logger.error(tr.unable_found_script.text)
-
-        script_folder = os.path.join(plugin_folder, max(versions), 'maya_umbrella', 'scripts')
-        if not validate_folder_exist(script_folder):
+        manifest = VersionManifest(plugin_folder)
+        script_folder = cls.get_version_script_folder(plugin_folder, manifest.resolve(maya_version))
+        if not script_folder:
+            # 清单和目录不一致（手动删除或复制了版本目录），重新扫描一次
+            manifest.rebuild()
+            script_folder = cls.get_version_script_folder(plugin_folder, manifest.resolve(maya_version))
+        if not script_folder:
             return logger.error(tr.unable_found_script.text)
 
         return script_folder
 
+    @staticmethod
+    def get_version_script_folder(plugin_folder, version):
+        if not version:
+            return None
+        script_folder = os.path.join(plugin_folder, version, const.REPO_NAME, 'scripts')
+        return script_folder if os.path.isdir(script_folder) else None
+
     @classmethod
+    @traced('plugin.python_path_env')
     def get_python_path_env(cls):
         """
         获取Python路径环境变量
@@ -60,27 +86,85 @@ class PluginManager:
             return False
 
         envs_copy = os.environ.copy()
-        envs_copy['PYTHONPATH'] = envs_copy.get('PYTHONPATH', '') + f';{script_folder}'
+        envs_copy['PYTHONPATH'] = os.pathsep.join(filter(None, [envs_copy.get('PYTHONPATH', ''), script_folder]))
         return envs_copy
 
+    @classmethod
+    @traced('plugin.launch_profile')
+    def get_launch_profile(cls, maya_version, plugin_folder=None, cache=launch_profile_cache):
+        """
+        获取指定maya版本的启动配置，优先使用缓存
+        Return:
+            启动配置字典，包含app_path, script_folder, env_append, env_set；
+            找不到maya或脚本目录时，对应的值为None，且不会写入缓存
+        """
+        plugin_folder = plugin_folder or UserSetting.get('plugin_folder')
+        profile = cache.get(maya_version, plugin_folder)
+        if profile:
+            return profile
+
+        app_path = MayaSystem.get_maya_app_path(maya_version)
+        script_folder = cls.get_maya_umbrella_script_folder(plugin_folder=plugin_folder, maya_version=maya_version)
+        if not app_path or not script_folder:
+            return {'app_path': app_path, 'script_folder': script_folder}
+
+        return cache.set(maya_version, plugin_folder, app_path, script_folder)
+
+    @staticmethod
+    @traced('plugin.launch')
+    def launch(profile, name='', restart_on_crash=False, start_time=None):
+        """
+        使用启动配置启动maya，开启launch_latency设置时记录启动耗时
+        Args:
+            start_time(float): 点击启动的时间，默认为当前时间
+        Return:
+            会话字典
+        """
+        start_time = start_time or time.time()
+        envs = launch_profile_cache.build_env(profile)
+        marker = None
+        if UserSetting.get_bool('launch_latency', default=True):
+            from maya_umbrella_launcher.latency import launch_latency
+            marker = launch_latency.prepare(envs)
+
+        session = MayaSystem.launch_maya(maya_path=profile['app_path'],
+                                         envs=envs,
+                                         name=name,
+                                         restart_on_crash=restart_on_crash)
+        if marker:
+            launch_latency.track(session, marker, profile['maya_version'], profile['plugin_version'], start_time)
+        return session
+
     @staticmethod
     def get_local_version_list(plugin_folder):
         """
-        获取插件的所有版本目录名
+        获取插件的所有版本，按语义化版本从旧到新排序
         """
+        from maya_umbrella_launcher.versions import VersionManifest
+
         if not validate_folder_exist(plugin_folder):
             return []
-
-        version_list = [ver for ver in os.listdir(plugin_folder)
-                        if os.path.isdir(os.path.join(plugin_folder, ver))
-                        and ver.startswith('v')]
-        return version_list
+        return VersionManifest(plugin_folder).get_versions()
 
     @staticmethod
-    def download_plugin(proxies=None, overwrite=False):
+    @traced('plugin.download')
+    def download_plugin(proxies=None, overwrite=False, stream_extract=None, delta_update=None, cancel_event=None,
+                        progress=None):
         """
         下载插件，解压，返回解压后的目录
+        先下载解压到`plugin_folder/.staging/<tag>`，完成后整体重命名为版本目录，
+        其他启动器不会看到只写了一半的版本。多台机器共用插件目录时，同一个版本由文件锁保证只有一个启动器下载，
+        其他启动器等待它完成后直接使用结果。
+        Args:
+            proxies(dict): 代理设置
+            overwrite(bool): 版本目录已存在时是否覆盖
+            stream_extract(bool): 是否边下载边解压，不写入zip文件，默认读取用户设置
+            delta_update(bool): 已安装其他版本时是否只下载有变化的文件，默认读取用户设置
+            cancel_event(threading.Event): 设置后停止下载，返回False
+            progress(ProgressMeter): 下载进度统计
         """
+        from maya_umbrella_launcher.versions import VersionManifest, get_channel
+        from maya_umbrella_launcher.github_utils import get_latest_release, get_asset_urls
 
         # 获取插件目录
         plugin_folder = UserSetting.get('plugin_folder')
@@ -89,21 +173,124 @@ class PluginManager:
 
         # 获取最新tag
         latest_tag = get_latest_release(owner=const.USER_NAME,
-                                        repo=const.REPO_NAME)
+                                        repo=const.REPO_NAME,
+                                        ttl=PluginManager.get_release_cache_ttl(),
+                                        proxies=proxies,
+                                        channel=get_channel())
+        if not latest_tag:
+            return logger.error(tr.download_failed.text)
+        tag_name = str(latest_tag['tag_name'])
+        # 镜像返回的资源带有GitHub的原地址，镜像失败时回退
+        file_urls = get_asset_urls(latest_tag['assets'][0])
 
         # 获取插件版本目录
-        plugin_version_folder = os.path.join(plugin_folder, str(latest_tag['tag_name']))
+        plugin_version_folder = os.path.join(plugin_folder, tag_name)
         if os.path.isdir(plugin_version_folder) and not overwrite:
             logger.warning(tr.path_already_exists.text.format(plugin_version_folder))
             return False
-        create_folder_if_not_exist(plugin_version_folder)
-        zip_path = os.path.join(plugin_version_folder, f'{const.REPO_NAME}.zip')
+
+        lock = FileLock(os.path.join(plugin_folder, const.LOCK_FOLDER_NAME, f'{tag_name}.lock'))
+        contended = not lock.acquire(timeout=0)
+        if contended:
+            logger.info(tr.waiting_for_install.text.format(tag_name))
+            if not lock.acquire(timeout=const.INSTALL_LOCK_TIMEOUT, cancel_event=cancel_event):
+                if cancel_event is None or not cancel_event.is_set():
+                    logger.error(tr.install_lock_timeout.text.format(tag_name))
+                return False
+
+        try:
+            # 等待期间其他启动器已经装好了这个版本
+            if os.path.isdir(plugin_version_folder) and (contended or not overwrite):
+                logger.info(tr.path_already_exists.text.format(plugin_version_folder))
+                return os.path.join(plugin_version_folder, const.REPO_NAME)
+
+            staging_folder = os.path.join(plugin_folder, const.STAGING_FOLDER_NAME, tag_name)
+            if not PluginManager.install_release(file_urls=file_urls,
+                                                 staging_folder=staging_folder,
+                                                 plugin_folder=plugin_folder,
+                                                 proxies=proxies,
+                                                 stream_extract=stream_extract,
+                                                 base_folder=PluginManager.get_delta_base_folder(plugin_folder,
+                                                                                                 tag_name),
+                                                 delta_update=delta_update,
+                                                 cancel_event=cancel_event,
+                                                 progress=progress):
+                return False
+
+            # 覆盖时旧版本移到.staging里再删除，正在使用的文件删不掉时也不会被当成一个版本
+            replace_folder(staging_folder, plugin_version_folder,
+                           old_folder=f'{staging_folder}.old.{os.getpid()}')
+            VersionManifest(plugin_folder).add(tag_name)
+            un_zip_folder = os.path.join(plugin_version_folder, const.REPO_NAME)
+            logger.info(f'Plugin {tag_name} installed to: {un_zip_folder}')
+            return un_zip_folder
+        finally:
+            lock.release()
+
+    @staticmethod
+    @traced('plugin.install_release')
+    def install_release(file_urls, staging_folder, plugin_folder, proxies=None, stream_extract=None,
+                        base_folder=None, delta_update=None, cancel_event=None, progress=None):
+        """
+        把release下载解压到staging_folder，调用前需要持有这个版本的安装锁
+        同时在staging_folder里保存版本的文件清单，之后的版本据此做增量更新
+        Args:
+            file_urls(list): 资源地址，按顺序尝试
+            base_folder(str): 增量更新的基础版本目录，为None时完整下载
+        Return:
+            解压后的目录，失败时返回False
+        """
+        from maya_umbrella_launcher.archive import extract_zip
+        from maya_umbrella_launcher.downloader import RangedDownloader
+        from maya_umbrella_launcher.plugin_store import ContentStore
+        from maya_umbrella_launcher.github_utils import download_release_files
+        from maya_umbrella_launcher.delta import save_file_manifest, build_file_manifest, read_zip_manifest
+
+        zip_path = os.path.join(staging_folder, f'{const.REPO_NAME}.zip')
+        # 上次中断的下载可以继续，其他残留的内容都清掉
+        if os.path.isdir(staging_folder) and not RangedDownloader.has_partial(zip_path):
+            remove_folder(staging_folder)
+        create_folder_if_not_exist(staging_folder)
+
+        if stream_extract is None:
+            stream_extract = UserSetting.get_bool('stream_extract')
+        use_store = UserSetting.get_bool('content_store', default=True)
+        if delta_update is None:
+            delta_update = UserSetting.get_bool('delta_update', default=True)
+
+        # 已经安装了其他版本时只下载有变化的文件，上次中断的完整下载继续完整下载
+        if delta_update and base_folder and not RangedDownloader.has_partial(zip_path):
+            un_zip_folder = PluginManager.delta_install(file_urls=file_urls,
+                                                        staging_folder=staging_folder,
+                                                        base_folder=base_folder,
+                                                        store=ContentStore(plugin_folder) if use_store else None,
+                                                        proxies=proxies,
+                                                        cancel_event=cancel_event,
+                                                        progress=progress)
+            if un_zip_folder is not None:
+                return un_zip_folder
+
+        if stream_extract:
+            un_zip_folder = PluginManager.stream_install(file_url=file_urls[0],
+                                                         fallback_urls=file_urls[1:],
+                                                         extract_to=os.path.join(staging_folder, const.REPO_NAME),
+                                                         proxies=proxies,
+                                                         cancel_event=cancel_event,
+                                                         progress=progress)
+            if un_zip_folder:
+                save_file_manifest(staging_folder, build_file_manifest(un_zip_folder))
+                if use_store:
+                    ContentStore(plugin_folder).ingest_folder(un_zip_folder)
+            return un_zip_folder
 
         # 开始下载
         try:
-            download_release_files(file_url=latest_tag['assets'][0]['browser_download_url'],
+            download_release_files(file_url=file_urls[0],
+                                   fallback_urls=file_urls[1:],
                                    file_save_path=zip_path,
-                                   proxies=proxies)
+                                   proxies=proxies,
+                                   cancel_event=cancel_event,
+                                   progress=progress)
         except Exception as e:
             logger.error(tr.download_failed.text + '\n' + str(e))
             return False
@@ -111,17 +298,141 @@ class PluginManager:
         if not os.path.exists(zip_path):
             return logger.error(tr.download_failed.text)
 
-        un_zip_folder = extract_zip(zip_path=zip_path)
+        save_file_manifest(staging_folder, read_zip_manifest(zip_path))
+        # 使用内容寻址存储时，和旧版本相同的文件直接链接，不重复写入
+        if use_store:
+            un_zip_folder = ContentStore(plugin_folder).extract_zip(zip_path=zip_path,
+                                                                    extract_to=zip_path.replace('.zip', ''))
+        else:
+            un_zip_folder = extract_zip(zip_path=zip_path)
         os.remove(zip_path)
 
         return un_zip_folder
 
+    @staticmethod
+    @traced('plugin.delta_install')
+    def delta_install(file_urls, staging_folder, base_folder, store=None, proxies=None, cancel_event=None,
+                      progress=None):
+        """
+        增量安装，只下载和base_folder版本不同的文件，见delta.DeltaInstaller
+        Return:
+            解压后的目录；取消时返回False；服务器不支持Range、变化太多或者出错时返回None，由调用方完整下载
+        """
+        from maya_umbrella_launcher.delta import DeltaInstaller
+        from maya_umbrella_launcher.downloader import DownloadCancelled
+
+        for url in file_urls:
+            installer = DeltaInstaller(file_url=url,
+                                       version_folder=staging_folder,
+                                       base_folder=base_folder,
+                                       proxies=proxies,
+                                       store=store,
+                                       cancel_event=cancel_event,
+                                       progress=progress)
+            try:
+                un_zip_folder = installer.install()
+            except DownloadCancelled:
+                return False
+            except Exception as e:
+                logger.debug(f'Delta update failed: {url}\n{e}')
+                remove_folder(os.path.join(staging_folder, const.REPO_NAME), ignore_errors=True)
+                continue
+
+            if un_zip_folder:
+                stats = installer.stats
+                logger.info(f'Delta update from {os.path.basename(base_folder)}: '
+                            f'{stats["changed"]} files changed, {stats["reused"]} reused, '
+                            f'downloaded {stats["fetched"]} of {stats["size"]} bytes')
+            return un_zip_folder
+        return None
+
+    @staticmethod
+    def get_delta_base_folder(plugin_folder, tag_name):
+        """
+        获取增量更新的基础版本：除了要安装的版本以外，已安装的最新版本
+        要安装的版本本身不作为基础，覆盖安装通常是为了修复损坏的文件
+        """
+        from maya_umbrella_launcher.versions import VersionManifest
+
+        for tag in reversed(VersionManifest(plugin_folder).get_versions()):
+            version_folder = os.path.join(plugin_folder, tag)
+            if tag != tag_name and os.path.isdir(os.path.join(version_folder, const.REPO_NAME)):
+                return version_folder
+        return None
+
+    @staticmethod
+    @traced('plugin.stream_install')
+    def stream_install(file_url, extract_to, proxies=None, cancel_event=None, progress=None, fallback_urls=()):
+        """
+        边下载边解压，返回解压后的目录
+        file_url失败时，依次从fallback_urls重新下载；
+        流式无法解压时停止下载，改为下载完整的zip再解压
+        """
+        from maya_umbrella_launcher.archive import StreamZipExtractor, StreamExtractUnsupported, extract_zip
+        from maya_umbrella_launcher.downloader import DownloadCancelled
+        from maya_umbrella_launcher.github_utils import stream_release_files, download_release_files
+
+        urls = [file_url] + list(fallback_urls)
+        for index, url in enumerate(urls):
+            extractor = StreamZipExtractor(extract_to=extract_to)
+
+            def feed(chunk):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise DownloadCancelled(f'Download cancelled: {url}')
+                extractor.feed(chunk)
+
+            try:
+                is_success = stream_release_files(file_url=url, consumer=feed, proxies=proxies, progress=progress)
+            except StreamExtractUnsupported as e:
+                logger.debug(f'Stream extract unsupported, download the whole zip instead: {e}')
+                zip_path = f'{extract_to}.zip'
+                if not download_release_files(file_url=url, fallback_urls=urls[index + 1:], file_save_path=zip_path,
+                                              proxies=proxies, cancel_event=cancel_event, progress=progress):
+                    return logger.error(tr.download_failed.text)
+                try:
+                    return extract_zip(zip_path=zip_path, extract_to=extract_to)
+                except Exception as e:
+                    logger.error(tr.download_failed.text + '\n' + str(e))
+                    return False
+                finally:
+                    os.remove(zip_path)
+
+            if not is_success:
+                extractor.abort()
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+                continue
+
+            try:
+                return extractor.close()
+            except Exception as e:
+                logger.error(tr.download_failed.text + '\n' + str(e))
+                return False
+
+        return logger.error(tr.download_failed.text)
+
     @staticmethod
     def get_latest_version():
         """
-        获取插件最新版本号
+        获取插件最新版本号，beta通道包括预发布版本
         """
-        return get_latest_release(owner=const.USER_NAME, repo=const.REPO_NAME)['tag_name']
+        from maya_umbrella_launcher.versions import get_channel
+        from maya_umbrella_launcher.github_utils import get_latest_release
+
+        return get_latest_release(owner=const.USER_NAME,
+                                  repo=const.REPO_NAME,
+                                  ttl=PluginManager.get_release_cache_ttl(),
+                                  channel=get_channel())['tag_name']
+
+    @staticmethod
+    def get_release_cache_ttl():
+        """
+        获取release信息缓存的有效期，单位为秒
+        """
+        try:
+            return int(UserSetting.get('release_cache_ttl', const.RELEASE_CACHE_TTL))
+        except (TypeError, ValueError):
+            return const.RELEASE_CACHE_TTL
 
 
 class PluginInstaller:
@@ -129,30 +440,114 @@ class PluginInstaller:
     插件安装器
     """
 
+    mod_file_name = 'maya_umbrella.mod'
+
     @staticmethod
     def install(maya_version):
-        module_folder = MayaSystem.get_maya_module_folder(version_number=maya_version)
+        """
+        把插件安装到一个本地安装的maya版本
+        Return:
+            是否安装成功
+        """
+        if str(maya_version) not in MayaSystem.get_installed_maya_versions():
+            logger.error(tr.unable_found_maya.text.format(maya_version))
+            return False
+
+        module_folder = MayaSystem.get_maya_module_folder(version_number=maya_version, create=True)
         if not validate_folder_exist(module_folder):
             return False
 
-        script_folder = PluginManager.get_maya_umbrella_script_folder()
+        script_folder = PluginManager.get_maya_umbrella_script_folder(maya_version=maya_version)
         if not script_folder:
             return False
 
-        script_folder = os.path.dirname(script_folder)
-        mod_file = os.path.join(module_folder, 'maya_umbrella.mod')
+        mod_file = os.path.join(module_folder, PluginInstaller.mod_file_name)
+        PluginInstaller.write_mod_file(mod_file, PluginInstaller.get_mod_content(script_folder))
 
-        if os.path.isfile(mod_file):
-            os.remove(mod_file)
+        return True
+
+    @staticmethod
+    def install_all(document_folders=None, workers=None):
+        """
+        把插件安装到所有本地安装的maya版本，可以同时安装到多个用户的文档目录
+        mod文件内容没有变化时不会写入
+        Args:
+            document_folders(list): 用户文档目录列表，默认为当前用户的文档目录
+            workers(int): 线程数
+        Return:
+            {'changed': [...], 'unchanged': [...], 'failed': [...]}，每一项为
+            {'maya_version': 版本号, 'mod_file': mod文件路径, 'error': 失败原因}
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        report = {'changed': [], 'unchanged': [], 'failed': []}
+
+        if not PluginManager.get_maya_umbrella_script_folder():
+            report['failed'].append({'maya_version': None, 'mod_file': None,
+                                     'error': tr.unable_found_script.text})
+            return report
+
+        # 每个maya版本可能固定了不同的插件版本
+        maya_versions = MayaSystem.get_installed_maya_versions()
+        script_folders = {maya_version: PluginManager.get_maya_umbrella_script_folder(maya_version=maya_version)
+                          for maya_version in maya_versions}
+
+        tasks = [(maya_version, document_folder)
+                 for document_folder in document_folders or [MayaSystem.get_document_folder()]
+                 for maya_version in maya_versions]
+
+        def install_one(task):
+            maya_version, document_folder = task
+            entry = {'maya_version': maya_version, 'mod_file': None, 'error': None}
+            if not script_folders[maya_version]:
+                entry['error'] = tr.unable_found_script.text
+                return 'failed', entry
+            try:
+                module_folder = MayaSystem.get_maya_module_folder(version_number=maya_version,
+                                                                  document_folder=document_folder,
+                                                                  create=True)
+                entry['mod_file'] = os.path.join(module_folder, PluginInstaller.mod_file_name)
+                content = PluginInstaller.get_mod_content(script_folders[maya_version])
+                changed = PluginInstaller.write_mod_file(entry['mod_file'], content)
+                return 'changed' if changed else 'unchanged', entry
+            except OSError as e:
+                entry['error'] = str(e)
+                return 'failed', entry
+
+        with ThreadPoolExecutor(max_workers=workers or min(32, len(tasks) or 1)) as executor:
+            for status, entry in executor.map(install_one, tasks):
+                report[status].append(entry)
+
+        return report
 
-        with open(mod_file, 'w') as f:
-            f.write(f'+ maya_umbrella any {script_folder}\n')
+    @staticmethod
+    def get_mod_content(script_folder):
+        """
+        获取mod文件的内容
+        """
+        return f'+ maya_umbrella any {os.path.dirname(script_folder)}\n'
 
+    @staticmethod
+    def write_mod_file(mod_file, content):
+        """
+        写入mod文件，内容相同时不写入
+        Return:
+            是否写入了文件
+        """
+        if os.path.isfile(mod_file):
+            with open(mod_file, 'r') as f:
+                if f.read() == content:
+                    return False
+
+        tmp_file = mod_file + '.tmp'
+        with open(tmp_file, 'w') as f:
+            f.write(content)
+        os.replace(tmp_file, mod_file)
         return True
 
     @staticmethod
     def uninstall(maya_version):
         module_folder = MayaSystem.get_maya_module_folder(version_number=maya_version)
-        mod_file = os.path.join(module_folder, 'maya_umbrella.mod')
+        mod_file = os.path.join(module_folder, PluginInstaller.mod_file_name)
         if os.path.isfile(mod_file):
             os.remove(mod_file)
@@ -0,0 +1,382 @@
+import os
+import json
+import zlib
+import bisect
+import zipfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import maya_umbrella_launcher.constant as const
+from maya_umbrella_launcher.log import logger
+from maya_umbrella_launcher.http_client import http_client
+from maya_umbrella_launcher.progress import AdaptiveChunkSize, iter_chunks
+from maya_umbrella_launcher.downloader import DownloadCancelled
+from maya_umbrella_launcher.archive import safe_extract_path, extract_member
+from maya_umbrella_launcher.filesystem import create_folder_if_not_exist, link_or_copy
+from maya_umbrella_launcher.profiling import traced, span
+
+
+class RangeNotSupported(IOError):
+    """
+    服务器不支持Range请求
+    """
+
+
+class RemoteZipFile(object):
+    """
+    通过HTTP Range按需读取的远程文件
+    实现了zipfile需要的seek/tell/read，读取的数据按范围缓存，没有缓存的部分每次至少下载read_block字节。
+    打开时只下载文件末尾（中央目录所在的位置），成员的数据先用fetch批量并发下载，再交给zipfile解压。
+    """
+
+    def __init__(self, file_url, proxies=None, timeout=None,
+                 connections=const.DOWNLOAD_CONNECTIONS,
+                 read_block=const.DELTA_READ_BLOCK,
+                 segment_size=const.DOWNLOAD_SEGMENT_SIZE,
+                 cancel_event=None,
+                 progress=None):
+        self.file_url = file_url
+        self.proxies = proxies
+        self.timeout = timeout
+        self.connections = max(1, connections)
+        self.read_block = read_block
+        self.segment_size = segment_size
+        self.cancel_event = cancel_event
+        self.progress = progress
+
+        self.size = 0
+        self.fetched = 0
+        self._chunk_size = AdaptiveChunkSize()
+        self._pos = 0
+        self._starts = []
+        self._blocks = []
+        self._lock = threading.Lock()
+
+    def open(self, tail_size=const.DELTA_TAIL_SIZE):
+        """
+        获取文件大小，下载文件末尾
+        Return:
+            文件大小
+        """
+        headers = {'Range': 'bytes=0-0'}
+        with http_client.get(self.file_url, headers=headers, stream=True,
+                             proxies=self.proxies, timeout=self.timeout) as r:
+            r.raise_for_status()
+            total = r.headers.get('Content-Range', '').rpartition('/')[2]
+            if r.status_code != 206 or not total.isdigit():
+                raise RangeNotSupported(f'Range not supported: {self.file_url}')
+        self.size = int(total)
+        self.fetch([(max(0, self.size - tail_size), self.size)])
+        return self.size
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self._pos
+        elif whence == os.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError(f'Negative seek position {offset}')
+        self._pos = offset
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def read(self, size=-1):
+        end = self.size if size is None or size < 0 else min(self.size, self._pos + size)
+        data = self._read_range(self._pos, end)
+        self._pos += len(data)
+        return data
+
+    def fetch(self, ranges):
+        """
+        下载并缓存多个范围，超过segment_size的范围拆开，用多个连接同时下载
+        Args:
+            ranges(list): [(start, end)]，不包含end
+        """
+        segments = [(start, min(start + self.segment_size, end))
+                    for start, end in ranges
+                    for start in range(start, end, self.segment_size)]
+        if len(segments) > 1 and self.connections > 1:
+            with ThreadPoolExecutor(max_workers=min(self.connections, len(segments))) as executor:
+                list(executor.map(lambda segment: self._fetch(*segment), segments))
+        else:
+            for start, end in segments:
+                self._fetch(start, end)
+
+    def _fetch(self, start, end):
+        headers = {'Range': f'bytes={start}-{end - 1}'}
+        chunks = []
+        with http_client.get(self.file_url, headers=headers, stream=True,
+                             proxies=self.proxies, timeout=self.timeout) as r:
+            r.raise_for_status()
+            if r.status_code != 206:
+                raise RangeNotSupported(f'Range not supported: {self.file_url}')
+            # 远端文件在两次请求之间发生了变化
+            if r.headers.get('Content-Range', '').rpartition('/')[2] != str(self.size):
+                raise IOError(f'Remote file changed: {self.file_url}')
+
+            for chunk in iter_chunks(r, self._chunk_size):
+                if self.cancel_event is not None and self.cancel_event.is_set():
+                    raise DownloadCancelled(f'Download cancelled: {self.file_url}')
+                chunks.append(chunk)
+                if self.progress:
+                    self.progress.update(len(chunk), chunk_size=self._chunk_size.size)
+
+        data = b''.join(chunks)
+        if len(data) != end - start:
+            raise IOError(f'Incomplete range {start}-{end - 1}: {len(data)} bytes, {self.file_url}')
+
+        with self._lock:
+            self.fetched += len(data)
+            index = bisect.bisect_left(self._starts, start)
+            self._starts.insert(index, start)
+            self._blocks.insert(index, data)
+
+    def _find(self, pos):
+        """
+        Return:
+            包含pos的缓存(起始位置, 数据)，没有缓存时返回None
+        """
+        with self._lock:
+            index = bisect.bisect_right(self._starts, pos) - 1
+            # 缓存的块可能重叠，每块不超过segment_size，往前找到不可能包含pos的块为止
+            while index >= 0 and self._starts[index] + self.segment_size > pos:
+                start, data = self._starts[index], self._blocks[index]
+                if pos < start + len(data):
+                    return start, data
+                index -= 1
+        return None
+
+    def _read_range(self, start, end):
+        parts = []
+        while start < end:
+            block = self._find(start)
+            if block is None:
+                self.fetch([(start, min(self.size, max(end, start + self.read_block)))])
+                continue
+            block_start, data = block
+            part = data[start - block_start:end - block_start]
+            parts.append(part)
+            start += len(part)
+        return b''.join(parts)
+
+
+def member_key(name):
+    """
+    成员在文件清单里的名字，和safe_extract_path一样去掉`..`等路径
+    """
+    return '/'.join(part for part in name.replace('\\', '/').split('/') if part not in ('', '.', '..'))
+
+
+def get_file_manifest_path(version_folder):
+    return os.path.join(version_folder, const.FILE_MANIFEST_NAME)
+
+
+def build_file_manifest(folder):
+    """
+    读取目录里的文件，计算每个文件的CRC-32和大小
+    Return:
+        {相对路径: [crc32, 大小]}
+    """
+    files = {}
+    for root, _, names in os.walk(folder):
+        for name in names:
+            file_path = os.path.join(root, name)
+            files[os.path.relpath(file_path, folder).replace(os.sep, '/')] = get_file_crc(file_path)
+    return files
+
+
+def get_file_crc(file_path):
+    """
+    计算文件的CRC-32和大小
+    Return:
+        [crc32, 大小]
+    """
+    crc = 0
+    size = 0
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+    return [crc, size]
+
+
+def read_zip_manifest(zip_ref):
+    """
+    从zip的中央目录获取文件清单，不需要解压
+    Args:
+        zip_ref(zipfile.ZipFile|str): zip对象或者路径
+    """
+    if not isinstance(zip_ref, zipfile.ZipFile):
+        with zipfile.ZipFile(zip_ref, 'r') as zip_ref:
+            return read_zip_manifest(zip_ref)
+    return {member_key(info.filename): [info.CRC, info.file_size]
+            for info in zip_ref.infolist() if not info.is_dir()}
+
+
+def save_file_manifest(version_folder, files):
+    """
+    保存版本的文件清单`<版本目录>/files.json`，在发布版本目录之前调用，
+    这样清单和版本目录一起出现，也包括在版本的完整性哈希里
+    """
+    path = get_file_manifest_path(version_folder)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(files, f, sort_keys=True)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_file_manifest(version_folder):
+    """
+    读取版本的文件清单，没有清单的旧版本从磁盘计算（不写入，避免改变版本目录的哈希）
+    """
+    path = get_file_manifest_path(version_folder)
+    if os.path.isfile(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.debug(f'Failed to read file manifest {path}: {e}')
+    return build_file_manifest(os.path.join(version_folder, const.REPO_NAME))
+
+
+def plan_ranges(zip_ref, infos, merge_gap=const.DELTA_MERGE_GAP):
+    """
+    计算下载infos需要的字节范围
+    成员的数据从local header开始，到下一个成员的local header（或中央目录）结束，包括数据描述符。
+    间隔不超过merge_gap的范围合并成一个，多下载一点数据比多一次请求快。
+    Return:
+        [(start, end)]，不包含end
+    """
+    offsets = sorted({info.header_offset for info in zip_ref.infolist()} | {zip_ref.start_dir})
+    ranges = []
+    for start in sorted(info.header_offset for info in infos):
+        end = offsets[bisect.bisect_right(offsets, start)]
+        if ranges and start - ranges[-1][1] <= merge_gap:
+            ranges[-1] = (ranges[-1][0], end)
+        else:
+            ranges.append((start, end))
+    return ranges
+
+
+class DeltaInstaller(object):
+    """
+    增量安装
+    用Range请求只读取远程zip的中央目录，和已安装版本的文件清单比较CRC-32和大小，
+    只下载、解压有变化的成员，没有变化的文件重新校验CRC后从旧版本链接（或复制）过来。
+    服务器不支持Range，或者需要下载的数据超过整个zip的max_ratio时，返回None由调用方完整下载。
+    """
+
+    def __init__(self, file_url, version_folder, base_folder, proxies=None, store=None,
+                 max_ratio=const.DELTA_MAX_RATIO, cancel_event=None, progress=None):
+        """
+        Args:
+            file_url(str): 新版本zip的地址
+            version_folder(str): 新版本的目录（安装时为staging目录）
+            base_folder(str): 已安装的旧版本目录
+            store(ContentStore): 使用内容寻址存储时，变化的文件收进仓库，没有变化的文件直接链接
+        """
+        self.file_url = file_url
+        self.version_folder = version_folder
+        self.base_folder = base_folder
+        self.proxies = proxies
+        self.store = store
+        self.max_ratio = max_ratio
+        self.cancel_event = cancel_event
+        self.progress = progress
+        self.stats = {'changed': 0, 'reused': 0, 'fetched': 0, 'size': 0}
+
+    @traced('delta.install')
+    def install(self):
+        """
+        Return:
+            解压目录，不适合增量更新时返回None
+        """
+        remote = RemoteZipFile(self.file_url, proxies=self.proxies, cancel_event=self.cancel_event)
+        try:
+            with span('delta.central_directory', url=self.file_url):
+                self.stats['size'] = remote.open()
+        except RangeNotSupported as e:
+            logger.debug(str(e))
+            return None
+
+        with zipfile.ZipFile(remote, 'r') as zip_ref:
+            infos = zip_ref.infolist()
+            changed, reused = self.diff(infos)
+
+            ranges = plan_ranges(zip_ref, changed)
+            total = sum(end - start for start, end in ranges)
+            if total > self.stats['size'] * self.max_ratio:
+                logger.debug(f'Too many changes for delta update ({total}/{self.stats["size"]} bytes)')
+                return None
+
+            if self.progress:
+                self.progress.start(total=total)
+            remote.progress = self.progress
+            with span('delta.fetch', ranges=len(ranges), size=total):
+                remote.fetch(ranges)
+
+            extract_to = os.path.join(self.version_folder, const.REPO_NAME)
+            create_folder_if_not_exist(extract_to)
+            for info in infos:
+                if info.is_dir():
+                    create_folder_if_not_exist(safe_extract_path(extract_to, info.filename))
+
+            for info in changed:
+                if self.cancel_event is not None and self.cancel_event.is_set():
+                    raise DownloadCancelled(f'Download cancelled: {self.file_url}')
+                extract_member(zip_ref, info, extract_to)
+                if self.store:
+                    self.store.ingest_file(safe_extract_path(extract_to, info.filename))
+
+            for info, base_path in reused:
+                link_or_copy(base_path, safe_extract_path(extract_to, info.filename), link=bool(self.store))
+
+            save_file_manifest(self.version_folder, read_zip_manifest(zip_ref))
+
+        if self.progress:
+            self.progress.finish()
+        self.stats.update(changed=len(changed), reused=len(reused), fetched=remote.fetched)
+        logger.debug(f'Delta update: {self.stats}')
+        print(f'Files extracted to: {extract_to}')
+        return extract_to
+
+    def diff(self, infos):
+        """
+        和旧版本比较
+        Return:
+            (需要下载的成员列表, [(没有变化的成员, 旧版本文件路径)])
+        """
+        base_files = load_file_manifest(self.base_folder)
+        base_extract = os.path.join(self.base_folder, const.REPO_NAME)
+
+        changed = []
+        reused = []
+        for info in infos:
+            if info.is_dir():
+                continue
+            base_path = safe_extract_path(base_extract, info.filename)
+            if base_files.get(member_key(info.filename)) == [info.CRC, info.file_size] \
+                    and self.is_intact(base_path, info):
+                reused.append((info, base_path))
+            else:
+                changed.append(info)
+        return changed, reused
+
+    @staticmethod
+    def is_intact(base_path, info):
+        """
+        清单只记录了安装时的内容，旧版本的文件之后可能被删除或修改（大小不变的修改也算），
+        所以重新计算CRC，和新版本的成员一致才能复用
+        """
+        if not os.path.isfile(base_path) or os.path.getsize(base_path) != info.file_size:
+            return False
+        try:
+            return get_file_crc(base_path) == [info.CRC, info.file_size]
+        except OSError:
+            return False
@@ -0,0 +1,228 @@
+import os
+import re
+import sys
+import json
+import threading
+from collections import namedtuple
+
+import maya_umbrella_launcher.constant as const
+from maya_umbrella_launcher.log import logger
+from maya_umbrella_launcher.profiling import traced
+
+
+MayaInstall = namedtuple('MayaInstall', ['version', 'location', 'app_path', 'source'])
+
+MAYA_EXECUTABLE = 'maya.exe' if sys.platform == 'win32' else 'maya'
+
+
+def make_install(version, location, source):
+    return MayaInstall(version=str(version),
+                       location=location,
+                       app_path=os.path.join(location, 'bin', MAYA_EXECUTABLE),
+                       source=source)
+
+
+class RegistryBackend(object):
+    """
+    从Windows注册表查找maya
+    """
+
+    name = 'registry'
+    key_path = 'SOFTWARE\\Autodesk\\Maya'
+
+    def is_available(self):
+        return sys.platform == 'win32'
+
+    def get_stamp(self):
+        """
+        注册表项的最后修改时间，安装或卸载maya时会变化
+        """
+        import winreg
+        try:
+            with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, self.key_path) as key:
+                return winreg.QueryInfoKey(key)[2]
+        except OSError:
+            return None
+
+    def discover(self):
+        import winreg
+
+        installs = []
+        try:
+            with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, self.key_path) as key:
+                i = 0
+                while True:
+                    try:
+                        version_number = winreg.EnumKey(key, i)
+                    except OSError:
+                        break
+                    i += 1
+                    if not version_number.isdigit():
+                        continue
+                    try:
+                        with winreg.OpenKey(key, f'{version_number}\\Setup\\InstallPath') as sub_key:
+                            location, _ = winreg.QueryValueEx(sub_key, 'MAYA_INSTALL_LOCATION')
+                    except OSError:
+                        continue
+                    installs.append(make_install(version_number, os.path.normpath(location), self.name))
+        except OSError as e:
+            logger.debug(f'Error accessing registry: {e}')
+
+        return installs
+
+
+class PathBackend(object):
+    """
+    扫描安装目录查找maya，比如Linux的/usr/autodesk/maya2024
+    """
+
+    name = 'path'
+    folder_pattern = re.compile(r'^maya(\d{4})$', re.IGNORECASE)
+
+    def __init__(self, roots=None):
+        self.roots = roots if roots is not None else const.MAYA_INSTALL_ROOTS
+
+    def is_available(self):
+        return bool(self.roots)
+
+    def get_stamp(self):
+        stamps = []
+        for root in self.roots:
+            try:
+                stamps.append(os.stat(root).st_mtime_ns)
+            except OSError:
+                stamps.append(None)
+        return stamps
+
+    def discover(self):
+        installs = []
+        for root in self.roots:
+            if not os.path.isdir(root):
+                continue
+            for name in sorted(os.listdir(root)):
+                match = self.folder_pattern.match(name)
+                location = os.path.join(root, name)
+                if match and os.path.isdir(location):
+                    installs.append(make_install(match.group(1), location, self.name))
+        return installs
+
+
+class EnvBackend(object):
+    """
+    从环境变量指定maya，优先级最高
+        - MAYA_LOCATION: 版本号从路径末尾的4位数字获取
+        - MAYA_LOCATION_<版本号>: 比如MAYA_LOCATION_2024
+    """
+
+    name = 'env'
+    version_pattern = re.compile(r'(\d{4})[^\\/]*$')
+    env_prefix = 'MAYA_LOCATION_'
+
+    def __init__(self, environ=None):
+        self.environ = os.environ if environ is None else environ
+
+    def is_available(self):
+        return True
+
+    def get_stamp(self):
+        return sorted((key, value) for key, value in self.environ.items() if key.startswith('MAYA_LOCATION'))
+
+    def discover(self):
+        installs = []
+        location = self.environ.get('MAYA_LOCATION')
+        if location:
+            match = self.version_pattern.search(location.rstrip('\\/'))
+            if match:
+                installs.append(make_install(match.group(1), location, self.name))
+
+        for key, value in self.environ.items():
+            version_number = key[len(self.env_prefix):]
+            if key.startswith(self.env_prefix) and version_number.isdigit() and value:
+                installs.append(make_install(version_number, value, self.name))
+        return installs
+
+
+class MayaDiscovery(object):
+    """
+    maya安装查找服务
+    依次使用多个查找方式，后面的结果覆盖前面的同版本结果，
+    结果保存在磁盘索引里，各查找方式的失效标记（安装目录、注册表的修改时间）不变时直接使用索引。
+    同一个进程内只查找一次，之后的查询都是字典访问。
+    """
+
+    index_file_name = 'maya_installs.json'
+
+    def __init__(self, backends=None, cache_folder=const.CACHE_FOLDER):
+        self.backends = backends if backends is not None else [RegistryBackend(), PathBackend(), EnvBackend()]
+        self.index_file = os.path.join(cache_folder, self.index_file_name) if cache_folder else None
+        self._installs = None
+        self._lock = threading.Lock()
+
+    def get_installs(self):
+        """
+        Return:
+            {版本号: MayaInstall}
+        """
+        with self._lock:
+            if self._installs is None:
+                self._installs = self._load_or_discover()
+            return self._installs
+
+    def get_versions(self):
+        return sorted(self.get_installs())
+
+    def get(self, version):
+        return self.get_installs().get(str(version))
+
+    def refresh(self):
+        """
+        忽略索引重新查找
+        """
+        with self._lock:
+            self._installs = self._discover(self._get_stamps())
+            return self._installs
+
+    def _get_stamps(self):
+        return {backend.name: backend.get_stamp()
+                for backend in self.backends if backend.is_available()}
+
+    @traced('maya_discovery.load')
+    def _load_or_discover(self):
+        stamps = self._get_stamps()
+        if self.index_file:
+            try:
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+                if index.get('stamps') == json.loads(json.dumps(stamps)):
+                    return {item[0]: MayaInstall(*item) for item in index['installs']}
+            except (OSError, ValueError, TypeError, KeyError):
+                pass
+        return self._discover(stamps)
+
+    @traced('maya_discovery.discover')
+    def _discover(self, stamps):
+        installs = {}
+        for backend in self.backends:
+            if not backend.is_available():
+                continue
+            for install in backend.discover():
+                installs[install.version] = install
+
+        if self.index_file:
+            self._save_index(stamps, installs)
+        return installs
+
+    def _save_index(self, stamps, installs):
+        folder = os.path.dirname(self.index_file)
+        tmp_path = f'{self.index_file}.{os.getpid()}.tmp'
+        try:
+            if not os.path.isdir(folder):
+                os.makedirs(folder, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'stamps': stamps, 'installs': [list(install) for install in installs.values()]}, f)
+            os.replace(tmp_path, self.index_file)
+        except OSError as e:
+            logger.debug(f'Failed to save maya install index: {e}')
+
+
+maya_discovery = MayaDiscovery()
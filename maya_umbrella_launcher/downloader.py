@@ -0,0 +1,230 @@
+import os
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import maya_umbrella_launcher.constant as const
+from maya_umbrella_launcher.log import logger
+from maya_umbrella_launcher.http_client import http_client
+from maya_umbrella_launcher.progress import AdaptiveChunkSize, AdaptiveWriteBuffer, iter_chunks
+
+
+class DownloadCancelled(IOError):
+    """
+    下载被取消，已下载的部分保留，下次可以继续
+    """
+
+
+class RangedDownloader(object):
+    """
+    分段并发下载器
+    把文件按HTTP Range切成多段，用多个连接同时下载，写入`.part`文件，
+    并在旁边保存一个状态文件，中断后再次下载会从上次停止的位置继续。
+    服务器不支持Range时，退回到单连接流式下载。
+    读取和写入的大小按测得的带宽调整，所有连接共用一个调整器，进度通过progress(ProgressMeter)报告。
+    """
+
+    part_suffix = '.part'
+    state_suffix = '.part.json'
+
+    def __init__(self, file_url, file_save_path, proxies=None,
+                 connections=const.DOWNLOAD_CONNECTIONS,
+                 segment_size=const.DOWNLOAD_SEGMENT_SIZE,
+                 chunk_size=const.DOWNLOAD_CHUNK_SIZE,
+                 timeout=None,
+                 cancel_event=None,
+                 progress=None,
+                 adaptive_chunk=True):
+        self.file_url = file_url
+        self.file_save_path = file_save_path
+        self.proxies = proxies
+        self.connections = max(1, connections)
+        self.segment_size = segment_size
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.cancel_event = cancel_event
+        self.progress = progress
+        self.adaptive_chunk = adaptive_chunk
+
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._state = None
+        self._chunk_size = None
+
+    @property
+    def part_path(self):
+        return self.file_save_path + self.part_suffix
+
+    @property
+    def state_path(self):
+        return self.file_save_path + self.state_suffix
+
+    @classmethod
+    def has_partial(cls, file_save_path):
+        """
+        是否存在未完成的下载
+        """
+        return os.path.isfile(file_save_path + cls.state_suffix)
+
+    def download(self):
+        """
+        开始下载，完成后把`.part`文件重命名为目标文件
+        Return:
+            目标文件路径
+        """
+        size, accept_ranges, validator = self._probe()
+        self._chunk_size = AdaptiveChunkSize(initial=self.chunk_size, adaptive=self.adaptive_chunk)
+
+        if not accept_ranges or not size:
+            logger.debug(f'Range not supported, fallback to single stream: {self.file_url}')
+            self._start_progress(size or None)
+            self._stream_download()
+        else:
+            self._state = self._load_state(size, validator)
+            self._prepare_part_file(size)
+            self._start_progress(size, sum(seg[2] for seg in self._state['segments']))
+            self._ranged_download()
+
+        if self.progress:
+            self.progress.finish()
+
+        os.replace(self.part_path, self.file_save_path)
+        self._remove_state()
+        return self.file_save_path
+
+    def _start_progress(self, total, done=0):
+        if self.progress:
+            self.progress.start(total=total, done=done)
+
+    def _update_progress(self, size):
+        if self.progress:
+            self.progress.update(size, chunk_size=self._chunk_size.size)
+
+    def _check_cancelled(self):
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise DownloadCancelled(f'Download cancelled: {self.file_url}')
+
+    def _probe(self):
+        """
+        请求第一个字节，判断服务器是否支持Range，并获取文件大小
+        Return:
+            (文件大小, 是否支持Range, 校验标识ETag/Last-Modified)
+        """
+        headers = {'Range': 'bytes=0-0'}
+        with http_client.get(self.file_url, headers=headers, stream=True,
+                             proxies=self.proxies, timeout=self.timeout) as r:
+            r.raise_for_status()
+            validator = r.headers.get('ETag') or r.headers.get('Last-Modified') or ''
+
+            if r.status_code == 206:
+                content_range = r.headers.get('Content-Range', '')
+                total = content_range.rpartition('/')[2]
+                if total.isdigit():
+                    return int(total), True, validator
+
+            length = r.headers.get('Content-Length', '')
+            return int(length) if length.isdigit() else 0, False, validator
+
+    def _new_state(self, size, validator):
+        segments = [[start, min(start + self.segment_size, size) - 1, 0]
+                    for start in range(0, size, self.segment_size)]
+        return {'url': self.file_url, 'size': size, 'validator': validator, 'segments': segments}
+
+    def _load_state(self, size, validator):
+        """
+        读取状态文件，远端文件发生变化或`.part`文件丢失时重新开始
+        """
+        if os.path.isfile(self.state_path) and os.path.isfile(self.part_path):
+            try:
+                with open(self.state_path, 'r') as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                state = None
+
+            if state and state.get('size') == size and state.get('validator') == validator \
+                    and os.path.getsize(self.part_path) == size:
+                done = sum(seg[2] for seg in state['segments'])
+                logger.debug(f'Resume download from {done}/{size} bytes: {self.file_url}')
+                return state
+
+        if os.path.isfile(self.part_path):
+            os.remove(self.part_path)
+        return self._new_state(size, validator)
+
+    def _save_state(self):
+        tmp_path = self.state_path + '.tmp'
+        with self._save_lock:
+            with self._lock:
+                data = json.dumps(self._state)
+            with open(tmp_path, 'w') as f:
+                f.write(data)
+            os.replace(tmp_path, self.state_path)
+
+    def _remove_state(self):
+        if os.path.isfile(self.state_path):
+            os.remove(self.state_path)
+
+    def _prepare_part_file(self, size):
+        if not os.path.isfile(self.part_path):
+            with open(self.part_path, 'wb') as f:
+                f.truncate(size)
+        self._save_state()
+
+    def _ranged_download(self):
+        pending = [seg for seg in self._state['segments'] if seg[0] + seg[2] <= seg[1]]
+        if not pending:
+            return
+
+        workers = min(self.connections, len(pending))
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for future in [executor.submit(self._download_segment, seg) for seg in pending]:
+                    future.result()
+        finally:
+            self._save_state()
+
+        if sum(seg[2] for seg in self._state['segments']) != self._state['size']:
+            raise IOError(f'Incomplete download: {self.file_url}')
+
+    def _download_segment(self, segment):
+        """
+        下载一个分段，每个线程持有自己的文件句柄
+        """
+        start, end, _ = segment
+        offset = start + segment[2]
+        headers = {'Range': f'bytes={offset}-{end}'}
+
+        with http_client.get(self.file_url, headers=headers, stream=True,
+                             proxies=self.proxies, timeout=self.timeout) as r:
+            r.raise_for_status()
+            if r.status_code != 206:
+                raise IOError(f'Server ignored range request: {headers["Range"]}')
+
+            # 状态文件只在写入缓冲之后保存，记录的进度不会超过文件里的数据
+            with open(self.part_path, 'r+b', buffering=0) as f:
+                f.seek(offset)
+                with AdaptiveWriteBuffer(f, self._chunk_size) as buffer:
+                    for chunk in iter_chunks(r, self._chunk_size):
+                        self._check_cancelled()
+                        chunk = chunk[:end + 1 - offset]
+                        buffer.write(chunk)
+                        offset += len(chunk)
+                        with self._lock:
+                            segment[2] = offset - start
+                        self._update_progress(len(chunk))
+                        if offset > end:
+                            break
+
+        if offset <= end:
+            raise IOError(f'Segment ended early at {offset}, expected {end + 1}')
+        self._save_state()
+
+    def _stream_download(self):
+        self._remove_state()
+        with http_client.get(self.file_url, stream=True, proxies=self.proxies, timeout=self.timeout) as r:
+            r.raise_for_status()
+            with open(self.part_path, 'wb', buffering=0) as f, AdaptiveWriteBuffer(f, self._chunk_size) as buffer:
+                for chunk in iter_chunks(r, self._chunk_size):
+                    self._check_cancelled()
+                    buffer.write(chunk)
+                    self._update_progress(len(chunk))
@@ -1,10 +1,15 @@
 import os
-import winreg
-import zipfile
-import subprocess as sp
+import sys
+import stat
+import time
+import shutil
 
 import maya_umbrella_launcher.translator as tr
+import maya_umbrella_launcher.constant as const
 from maya_umbrella_launcher.log import logger
+from maya_umbrella_launcher.discovery import maya_discovery
+from maya_umbrella_launcher.supervisor import process_supervisor
+from maya_umbrella_launcher.profiling import traced
 
 
 class MayaSystem:
@@ -12,87 +17,209 @@ class MayaSystem:
     @staticmethod
     def get_document_folder():
         """
-        获取文档目录
+        获取文档目录，Linux和macOS上maya的用户目录直接在home下
         """
+        if sys.platform != 'win32':
+            return os.path.expanduser('~')
         return os.path.join(os.path.expanduser('~'), 'Documents')
 
     @classmethod
-    def get_maya_module_folder(cls, version_number):
+    def get_maya_module_folder(cls, version_number, document_folder=None, create=False):
         """
         获取maya模块目录
+        Args:
+            version_number(str): maya版本号
+            document_folder(str): 用户文档目录，默认为当前用户的文档目录
+            create(bool): 目录不存在时是否创建，只在安装插件时创建
         """
-        document_path = cls.get_document_folder()
+        document_path = document_folder or cls.get_document_folder()
         maya_module_folder = os.path.join(document_path, 'maya', str(version_number), 'modules')
-        create_folder_if_not_exist(maya_module_folder)
+        if create:
+            create_folder_if_not_exist(maya_module_folder)
         return maya_module_folder
 
     @staticmethod
     def get_maya_app_path(maya_version):
         """
         获取指定maya版本的程序路径
+        索引里的程序不存在时（卸载、移动）重新查找一次，还是不存在时返回None
         """
-        try:
-            key = winreg.OpenKey(
-                winreg.HKEY_LOCAL_MACHINE,
-                f'SOFTWARE\\Autodesk\\Maya\\{maya_version}\\Setup\\InstallPath',
-            )
-            root, _ = winreg.QueryValueEx(key, "MAYA_INSTALL_LOCATION")
-            if not os.path.isdir(root):
-                print('Failed to locate the appropriate Maya path in the registration list.')
-        except OSError:
+        install = maya_discovery.get(maya_version)
+        if install and not os.path.isfile(install.app_path):
+            maya_discovery.refresh()
+            install = maya_discovery.get(maya_version)
+        if not install or not os.path.isfile(install.app_path):
             return
-        app_path = os.path.join(root, 'bin', 'maya.exe')
-        return app_path
+        return install.app_path
 
     @staticmethod
     def get_installed_maya_versions():
         """
         列出所有本地安装的maya版本
+        查找结果有缓存，见discovery.MayaDiscovery
         Return:
             由版本号组成的列表
         """
-        maya_versions = []
-        try:
-            with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, 'SOFTWARE\\Autodesk\\Maya') as key:
-                i = 0
-                while True:
-                    try:
-                        version_number = winreg.EnumKey(key, i)
-                        if version_number.isdigit():
-                            maya_versions.append(version_number)
-                    except OSError:
-                        break
-                    i += 1
-        except Exception as e:
-            print(f'Error accessing registry: {e}')
-
-        return maya_versions
+        return maya_discovery.get_versions()
 
     @staticmethod
-    def launch_maya(maya_path, envs):
+    @traced('maya.launch')
+    def launch_maya(maya_path, envs, name='', restart_on_crash=False):
+        """
+        启动maya，进程注册到process_supervisor
+        Return:
+            会话字典
+        """
         bin_folder = os.path.dirname(maya_path)
         qt_path = os.path.join(os.path.dirname(bin_folder), 'plugins', 'platforms')
         envs['QT_PLUGIN_PATH'] = qt_path
-        sp.Popen(maya_path, env=envs, cwd=bin_folder)
+        return process_supervisor.launch([maya_path], envs=envs, cwd=bin_folder,
+                                         name=name, restart_on_crash=restart_on_crash)
 
 
-def extract_zip(zip_path, extract_to=None):
+def replace_folder(source_folder, target_folder, old_folder=None):
     """
-    解压文件
+    用source_folder替换target_folder，target_folder已存在时先移走再删除
+    Args:
+        old_folder(str): 旧目录移到的位置，默认为target_folder旁边
     """
-    if extract_to is None:
-        extract_to = zip_path.replace('.zip', '')
+    create_folder_if_not_exist(source_folder)
+    if os.path.isdir(target_folder):
+        old_folder = old_folder or f'{target_folder}.old.{os.getpid()}'
+        os.replace(target_folder, old_folder)
+    else:
+        old_folder = None
 
-    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-        zip_ref.extractall(extract_to)
-        print(f'Files extracted to: {extract_to}')
+    os.replace(source_folder, target_folder)
+    if old_folder:
+        remove_folder(old_folder, ignore_errors=True)
 
-    return extract_to
+
+def make_read_only(file_path):
+    """
+    去掉文件的写权限
+    """
+    mode = os.stat(file_path).st_mode
+    os.chmod(file_path, mode & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH))
+
+
+def remove_folder(folder_path, ignore_errors=False):
+    """
+    删除目录，包括只读的文件（windows上shutil.rmtree删不掉只读文件）
+    """
+    def on_error(func, path, exc):
+        try:
+            os.chmod(path, stat.S_IWRITE | stat.S_IREAD)
+            func(path)
+        except OSError:
+            if not ignore_errors:
+                raise
+
+    # Python 3.12开始onerror已弃用，改为onexc，回调的第三个参数是异常对象而不是exc_info
+    if sys.version_info >= (3, 12):
+        shutil.rmtree(folder_path, onexc=on_error)
+    else:
+        shutil.rmtree(folder_path, onerror=on_error)
+
+
+class LockTimeout(IOError):
+    """
+    等待文件锁超时
+    """
+
+
+class FileLock(object):
+    """
+    跨进程（包括跨机器共享目录）的建议锁
+    Windows使用msvcrt.locking，其他系统使用fcntl.flock。锁由系统持有，进程崩溃或退出时自动释放，
+    不会留下需要手动删除的锁文件。同一进程里不同的FileLock对象之间也是互斥的。
+    Args:
+        path(str): 锁文件路径，目录不存在时自动创建
+        poll_interval(float): 等待时检查的间隔，单位为秒
+    """
+
+    def __init__(self, path, poll_interval=const.INSTALL_LOCK_POLL_INTERVAL):
+        self.path = path
+        self.poll_interval = poll_interval
+        self._file = None
+
+    @property
+    def locked(self):
+        return self._file is not None
+
+    def acquire(self, timeout=None, cancel_event=None):
+        """
+        获取锁
+        Args:
+            timeout(float): 最多等待的秒数，0为不等待，None为一直等待
+            cancel_event(threading.Event): 设置后停止等待
+        Return:
+            是否获取到锁
+        """
+        if self.locked:
+            return True
+
+        create_folder_if_not_exist(os.path.dirname(self.path))
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            lock_file = open(self.path, 'a+b')
+            try:
+                _lock_file(lock_file)
+            except OSError:
+                lock_file.close()
+            else:
+                self._file = lock_file
+                return True
+
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            if cancel_event is not None:
+                if cancel_event.wait(self.poll_interval):
+                    return False
+            else:
+                time.sleep(self.poll_interval)
+
+    def release(self):
+        if not self.locked:
+            return
+        try:
+            _unlock_file(self._file)
+        finally:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        if not self.acquire():
+            raise LockTimeout(f'Failed to lock {self.path}')
+        return self
+
+    def __exit__(self, *args):
+        self.release()
+
+
+if sys.platform == 'win32':
+    import msvcrt
+
+    def _lock_file(lock_file):
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+
+    def _unlock_file(lock_file):
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def _lock_file(lock_file):
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def _unlock_file(lock_file):
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
 
 
 def create_folder_if_not_exist(folder_path):
     if not os.path.isdir(folder_path):
-        os.makedirs(folder_path)
+        os.makedirs(folder_path, exist_ok=True)
 
 
 def validate_folder_exist(folder_path):
@@ -100,3 +227,23 @@ def validate_folder_exist(folder_path):
         logger.warning(tr.path_not_exists.text.format(folder_path))
         return False
     return True
+
+
+def link_or_copy(source_path, target_path, link=True):
+    """
+    在target_path创建指向source_path的硬链接，不支持硬链接（跨磁盘、文件系统不支持）时复制
+    Return:
+        是否为硬链接
+    """
+    create_folder_if_not_exist(os.path.dirname(target_path))
+    if os.path.lexists(target_path):
+        os.chmod(target_path, stat.S_IWRITE | stat.S_IREAD)
+        os.remove(target_path)
+    if link:
+        try:
+            os.link(source_path, target_path)
+            return True
+        except OSError as e:
+            logger.debug(f'Hardlink not supported, fallback to copy: {e}')
+    shutil.copy2(source_path, target_path)
+    return False
@@ -1,39 +1,135 @@
-import requests
-import urllib3
+import maya_umbrella_launcher.constant as const
+from maya_umbrella_launcher.log import logger
+from maya_umbrella_launcher.downloader import RangedDownloader, DownloadCancelled
+from maya_umbrella_launcher.archive import StreamExtractUnsupported
+from maya_umbrella_launcher.http_client import http_client
+from maya_umbrella_launcher.progress import AdaptiveChunkSize, iter_chunks
+from maya_umbrella_launcher.release_cache import release_cache
+from maya_umbrella_launcher.mirror import release_sources
+from maya_umbrella_launcher.profiling import traced
 
-urllib3.disable_warnings()
 
-
-def get_latest_release(owner, repo):
+@traced('github.latest_release')
+def get_latest_release(owner, repo, ttl=const.RELEASE_CACHE_TTL, proxies=None, channel=const.CHANNEL_STABLE):
     """
     获取仓库的最新release
+    按顺序尝试release_sources里健康的源（局域网镜像、GitHub），
+    结果缓存在本地，TTL内不发请求，过期后用ETag做条件请求，离线时返回过期的缓存
+    Args:
+        owner(str): 仓库所有者
+        repo(str): 仓库名
+        ttl(int): 缓存有效期，单位为秒
+        proxies(dict): 代理设置，为None时使用设置里的代理
+        channel(str): stable使用GitHub标记的最新正式版本，beta在最近的release里按语义化版本取最新的，包括预发布版本
     Return:
         返回一个字典，包含最新发布的json信息，格式如下:
             - tag_name 版本名
             - ['assets'][0]['browser_download_url'] 最新版zip包文件的url地址
+        所有源都失败时返回False
     """
-
-    url = f'https://api.github.com/repos/{owner}/{repo}/releases/latest'
-    response = requests.get(url)
-    if response.status_code == 200:
-        tags = response.json()
-        if tags:
-            return tags
+    for source in release_sources.get_healthy_sources():
+        api_base = release_sources.get_api_base(source)
+        if channel == const.CHANNEL_BETA:
+            url = f'{api_base}/repos/{owner}/{repo}/releases?per_page={const.RELEASE_LIST_SIZE}'
+        else:
+            url = f'{api_base}/repos/{owner}/{repo}/releases/latest'
+        release = release_cache.get(url, ttl=ttl, proxies=release_sources.get_proxies(source, proxies))
+        if isinstance(release, list):
+            release = get_newest_release(release)
+        if release:
+            return release
+        release_sources.mark_failed(url)
     return False
 
 
-def download_release_files(file_url, file_save_path, proxies=None):
+def get_newest_release(releases):
+    """
+    在release列表里按语义化版本取最新的，忽略草稿和没有资源文件的release
+    """
+    from maya_umbrella_launcher.versions import version_key
+
+    releases = [release for release in releases if not release.get('draft') and release.get('assets')]
+    return max(releases, key=lambda release: version_key(release['tag_name'])) if releases else None
+
+
+def get_asset_urls(asset):
+    """
+    获取资源文件的下载地址列表，镜像返回的资源带有上游地址，作为镜像失败时的备用地址
+    """
+    urls = [asset['browser_download_url']]
+    if asset.get('upstream_url'):
+        urls.append(asset['upstream_url'])
+    return urls
+
+
+@traced('github.download')
+def download_release_files(file_url, file_save_path, proxies=None, cancel_event=None, progress=None,
+                           fallback_urls=()):
     """
     下载github release文件
+    支持分段并发下载和断点续传，服务器不支持Range时使用单连接下载
+    Args:
+        cancel_event(threading.Event): 设置后停止下载，已下载的部分保留
+        progress(ProgressMeter): 进度统计
+        fallback_urls(list): file_url下载失败时依次尝试的地址
+    """
+    for url in [file_url] + list(fallback_urls):
+        try:
+            RangedDownloader(file_url=url,
+                             file_save_path=file_save_path,
+                             proxies=release_sources.get_proxies(_get_source(url), proxies),
+                             cancel_event=cancel_event,
+                             progress=progress).download()
+            return True
+        except DownloadCancelled as e:
+            print(e)
+            return False
+        except Exception as e:
+            print(e)
+            release_sources.mark_failed(url)
+            logger.debug(f'Download failed from {url}, trying next source')
+    return False
+
+
+def _get_source(url):
+    for source in release_sources.get_sources():
+        if source != release_sources.github and url.startswith(source + '/'):
+            return source
+    return release_sources.github
+
+
+@traced('github.stream')
+def stream_release_files(file_url, consumer, proxies=None, progress=None):
+    """
+    流式下载github release文件，不写入磁盘
+    consumer抛出的DownloadCancelled（取消）不算下载源的错误，StreamExtractUnsupported原样抛出
+    Args:
+        file_url(str): 文件地址
+        consumer(callable): 接收每一个数据块的回调
+        proxies(dict): 代理设置
+        progress(ProgressMeter): 进度统计
     """
-    proxies = proxies if proxies else {}
     try:
-        with requests.get(file_url, stream=True, proxies=proxies) as r:
+        with http_client.get(file_url, stream=True,
+                             proxies=release_sources.get_proxies(_get_source(file_url), proxies)) as r:
             r.raise_for_status()
-            with open(file_save_path, 'wb') as f:
-                for chunk in r.iter_content(chunk_size=8192):
-                    f.write(chunk)
-                return True
+            length = r.headers.get('Content-Length', '')
+            chunk_size = AdaptiveChunkSize()
+            if progress:
+                progress.start(total=int(length) if length.isdigit() else None)
+            for chunk in iter_chunks(r, chunk_size):
+                consumer(chunk)
+                if progress:
+                    progress.update(len(chunk), chunk_size=chunk_size.size)
+            if progress:
+                progress.finish()
+        return True
+    except StreamExtractUnsupported:
+        raise
+    except DownloadCancelled as e:
+        print(e)
+        return False
     except Exception as e:
         print(e)
+        release_sources.mark_failed(file_url)
         return False
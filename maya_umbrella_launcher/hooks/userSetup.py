@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""
+maya_umbrella_launcher的启动耗时钩子
+maya启动完成、界面空闲后，把当前时间和maya_umbrella是否导入成功写到MUL_READY_MARKER指定的文件里。
+maya自带python可能是2.7，这里不能使用f-string等python3语法。
+"""
+import os
+import sys
+import json
+import time
+
+
+def _report_ready():
+    marker = os.environ.get('MUL_READY_MARKER')
+    if not marker:
+        return
+
+    loaded = 'maya_umbrella' in sys.modules
+    if not loaded:
+        try:
+            __import__('maya_umbrella')
+            loaded = True
+        except Exception:
+            pass
+
+    tmp_path = marker + '.tmp'
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump({'time': time.time(), 'pid': os.getpid(), 'loaded': loaded}, f)
+        if os.path.exists(marker):
+            os.remove(marker)
+        os.rename(tmp_path, marker)
+    except (IOError, OSError):
+        pass
+
+
+try:
+    import maya.utils
+except ImportError:
+    pass
+else:
+    try:
+        maya.utils.executeDeferred(_report_ready, lowestPriority=True)
+    except TypeError:
+        maya.utils.executeDeferred(_report_ready)
@@ -0,0 +1,154 @@
+import time
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import maya_umbrella_launcher.constant as const
+from maya_umbrella_launcher.log import logger
+from maya_umbrella_launcher.settings import settings
+from maya_umbrella_launcher.profiling import span
+
+
+class HttpClient(object):
+    """
+    共享的HTTP客户端
+    所有GitHub请求共用一个带连接池的Session，同一主机的请求复用keep-alive连接（包括TLS握手）。
+    连接失败、连接被重置和429/5xx响应按指数退避加随机抖动重试，429/503会遵守Retry-After。
+    没有指定代理时使用设置里的代理，超时时间也可以在设置里修改。
+    每个请求完成后调用注册的计时回调。
+    """
+
+    status_forcelist = (429, 500, 502, 503, 504)
+
+    def __init__(self, retries=const.HTTP_RETRIES, backoff_factor=const.HTTP_BACKOFF_FACTOR,
+                 backoff_jitter=const.HTTP_BACKOFF_JITTER, pool_size=const.HTTP_POOL_SIZE):
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.backoff_jitter = backoff_jitter
+        self.pool_size = pool_size
+
+        self._session = None
+        self._lock = threading.Lock()
+        self._hooks = [log_request]
+
+    @property
+    def session(self):
+        with self._lock:
+            if self._session is None:
+                self._session = self._create_session()
+            return self._session
+
+    def _create_session(self):
+        retry = Retry(total=self.retries,
+                      connect=self.retries,
+                      read=self.retries,
+                      status=self.retries,
+                      backoff_factor=self.backoff_factor,
+                      backoff_jitter=self.backoff_jitter,
+                      status_forcelist=self.status_forcelist,
+                      allowed_methods=frozenset(['GET', 'HEAD']),
+                      respect_retry_after_header=True,
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=retry)
+
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    @staticmethod
+    def get_proxies(proxies=None):
+        """
+        获取代理设置，没有指定时读取设置里的proxy_on和proxy_url
+        """
+        if proxies is not None:
+            return proxies
+        proxy_url = settings.get('proxy_url', '')
+        if settings.get_bool('proxy_on') and proxy_url:
+            return {'http': proxy_url, 'https': proxy_url}
+        return {}
+
+    @staticmethod
+    def get_timeout():
+        """
+        Return:
+            (连接超时, 读取超时)，单位为秒
+        """
+        try:
+            return (float(settings.get('http_connect_timeout', const.HTTP_CONNECT_TIMEOUT)),
+                    float(settings.get('http_read_timeout', const.HTTP_READ_TIMEOUT)))
+        except (TypeError, ValueError):
+            return const.HTTP_CONNECT_TIMEOUT, const.HTTP_READ_TIMEOUT
+
+    def request(self, method, url, proxies=None, timeout=None, **kwargs):
+        """
+        发送请求，参数和requests.request一致
+        Args:
+            proxies(dict): 代理设置，为None时使用设置里的代理
+            timeout(float|tuple): 超时时间，为None时使用设置里的超时时间
+        Return:
+            requests.Response
+        """
+        start = time.perf_counter()
+        response = None
+        error = None
+        try:
+            with span('http.request', method=method, url=url):
+                response = self.session.request(method, url,
+                                                proxies=self.get_proxies(proxies),
+                                                timeout=timeout or self.get_timeout(),
+                                                **kwargs)
+            return response
+        except requests.RequestException as e:
+            error = e
+            raise
+        finally:
+            self._call_hooks({'method': method,
+                              'url': url,
+                              'status': response.status_code if response is not None else None,
+                              'elapsed': time.perf_counter() - start,
+                              'retries': _get_retry_count(response),
+                              'error': str(error) if error else None})
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def add_hook(self, callback):
+        """
+        注册计时回调，每个请求收到响应头（或失败）后调用，
+        参数是包含method, url, status, elapsed, retries, error的字典
+        """
+        if callback not in self._hooks:
+            self._hooks.append(callback)
+
+    def remove_hook(self, callback):
+        if callback in self._hooks:
+            self._hooks.remove(callback)
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def _call_hooks(self, record):
+        for callback in list(self._hooks):
+            try:
+                callback(record)
+            except Exception as e:
+                logger.debug(f'HTTP hook failed: {e}')
+
+
+def _get_retry_count(response):
+    retries = getattr(getattr(response, 'raw', None), 'retries', None)
+    return len(retries.history) if retries is not None else 0
+
+
+def log_request(record):
+    logger.debug(f'{record["method"]} {record["url"]} -> {record["status"] or record["error"]} '
+                 f'in {record["elapsed"] * 1000:.0f} ms, retries {record["retries"]}')
+
+
+http_client = HttpClient()
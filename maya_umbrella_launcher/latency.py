@@ -0,0 +1,231 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import threading
+
+import maya_umbrella_launcher.constant as const
+from maya_umbrella_launcher.log import logger
+from maya_umbrella_launcher.filesystem import FileLock
+from maya_umbrella_launcher.supervisor import is_pid_alive
+
+
+HOOK_SOURCE_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'hooks')
+
+
+class LaunchLatencyStore(object):
+    """
+    maya启动耗时统计
+    启动时通过PYTHONPATH注入一个userSetup.py钩子，maya空闲后钩子写入标记文件，
+    从点击启动到标记文件里的时间就是启动耗时，按maya版本和插件版本保存最近的样本。
+    启动器先退出时（比如命令行启动），未完成的记录保留在pending里，下次统计时再收集。
+    多个启动器进程同时启动maya时，统计文件的读取、修改、写回都在文件锁内进行。
+    """
+
+    store_file_name = 'launch_latency.json'
+
+    def __init__(self, data_folder=const.DATA_FOLDER, timeout=const.READY_TIMEOUT,
+                 poll_interval=const.READY_POLL_INTERVAL, keep_samples=const.LATENCY_KEEP_SAMPLES):
+        self.store_file = os.path.join(data_folder, self.store_file_name)
+        self.hook_folder = os.path.join(data_folder, 'hooks')
+        self.marker_folder = os.path.join(data_folder, 'ready')
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.keep_samples = keep_samples
+
+        self._lock = threading.Lock()
+
+    def prepare(self, envs):
+        """
+        在环境变量里注入钩子目录和标记文件路径
+        钩子目录放在PYTHONPATH最后，不会覆盖maya_umbrella自己的userSetup.py
+        Return:
+            标记文件路径，钩子安装失败时返回None
+        """
+        try:
+            self._install_hook()
+            os.makedirs(self.marker_folder, exist_ok=True)
+        except OSError as e:
+            logger.debug(f'Failed to install ready hook: {e}')
+            return None
+
+        marker = os.path.join(self.marker_folder, f'{uuid.uuid4().hex[:12]}.json')
+        envs[const.READY_MARKER_ENV] = marker
+        envs['PYTHONPATH'] = os.pathsep.join(filter(None, [envs.get('PYTHONPATH', ''), self.hook_folder]))
+        return marker
+
+    def track(self, session, marker, maya_version, plugin_version, start_time):
+        """
+        记录一次启动，并在后台线程等待标记文件
+        Args:
+            session(dict): process_supervisor返回的会话
+            marker(str): prepare返回的标记文件路径
+            maya_version(str): maya版本号
+            plugin_version(str): 插件版本目录名
+            start_time(float): 点击启动的时间
+        """
+        pending = {'marker': marker, 'pid': session['pid'], 'start_time': start_time,
+                   'maya_version': str(maya_version), 'plugin_version': str(plugin_version)}
+        self._update(lambda data: data['pending'].append(pending))
+
+        thread = threading.Thread(target=self._watch, args=(session, marker), daemon=True,
+                                  name=f'ready-{session["id"]}')
+        thread.start()
+
+    def collect(self):
+        """
+        处理所有未完成的记录：标记文件已出现的记为样本，
+        进程已退出的记为失败，超时仍未就绪的记为超时
+        """
+        self._update(self._collect)
+
+    def get_report(self):
+        """
+        Return:
+            按maya版本、插件版本排序的统计列表，
+            每项包含count, p50, p95, max, not_loaded, failed, timeout
+        """
+        self.collect()
+        with self._lock:
+            data = self._load()
+
+        rows = []
+        for maya_version, plugins in sorted(data['stats'].items()):
+            for plugin_version, stat in sorted(plugins.items()):
+                samples = sorted(stat['samples'])
+                rows.append({'maya_version': maya_version, 'plugin_version': plugin_version,
+                             'count': len(samples),
+                             'p50': percentile(samples, 50),
+                             'p95': percentile(samples, 95),
+                             'max': samples[-1] if samples else None,
+                             'not_loaded': stat['not_loaded'],
+                             'failed': stat['failed'],
+                             'timeout': stat['timeout']})
+        return rows
+
+    def _watch(self, session, marker):
+        deadline = time.time() + self.timeout
+        while not os.path.isfile(marker) and session['exit_time'] is None and time.time() < deadline:
+            time.sleep(self.poll_interval)
+        self.collect()
+
+    def _collect(self, data):
+        now = time.time()
+        remaining = []
+        for pending in data['pending']:
+            stat = data['stats'].setdefault(pending['maya_version'], {}).setdefault(
+                pending['plugin_version'], {'samples': [], 'not_loaded': 0, 'failed': 0, 'timeout': 0})
+
+            if os.path.isfile(pending['marker']):
+                try:
+                    with open(pending['marker'], 'r') as f:
+                        ready = json.load(f)
+                except (OSError, ValueError):
+                    remaining.append(pending)
+                    continue
+                self._remove_marker(pending['marker'])
+
+                if ready.get('loaded'):
+                    stat['samples'].append(round(ready['time'] - pending['start_time'], 3))
+                    del stat['samples'][:-self.keep_samples]
+                    logger.debug(f'Maya {pending["maya_version"]} ready in '
+                                 f'{ready["time"] - pending["start_time"]:.2f}s')
+                else:
+                    stat['not_loaded'] += 1
+            elif not is_pid_alive(pending['pid']):
+                stat['failed'] += 1
+            elif now - pending['start_time'] > self.timeout:
+                stat['timeout'] += 1
+            else:
+                remaining.append(pending)
+        data['pending'] = remaining
+
+    def _install_hook(self):
+        """
+        把钩子复制到数据目录，打包后的临时目录在启动器退出时会被删除，不能直接使用
+        """
+        source = os.path.join(HOOK_SOURCE_FOLDER, 'userSetup.py')
+        target = os.path.join(self.hook_folder, 'userSetup.py')
+        with open(source, 'rb') as f:
+            content = f.read()
+        try:
+            with open(target, 'rb') as f:
+                if f.read() == content:
+                    return
+        except OSError:
+            pass
+
+        os.makedirs(self.hook_folder, exist_ok=True)
+        tmp_path = f'{target}.{os.getpid()}.tmp'
+        shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, target)
+
+    @staticmethod
+    def _remove_marker(marker):
+        try:
+            os.remove(marker)
+        except OSError:
+            pass
+
+    def _update(self, func):
+        with self._lock:
+            try:
+                with FileLock(f'{self.store_file}.lock'):
+                    data = self._load()
+                    func(data)
+                    self._save(data)
+            except OSError as e:
+                logger.debug(f'Failed to lock launch latency: {e}')
+
+    def _load(self):
+        try:
+            with open(self.store_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        data.setdefault('pending', [])
+        data.setdefault('stats', {})
+        return data
+
+    def _save(self, data):
+        tmp_path = f'{self.store_file}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(os.path.dirname(self.store_file), exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.store_file)
+        except OSError as e:
+            logger.debug(f'Failed to save launch latency: {e}')
+
+
+def percentile(samples, pct):
+    """
+    最近秩法计算百分位数
+    Args:
+        samples(list): 已排序的样本
+        pct(float): 0到100
+    """
+    if not samples:
+        return None
+    rank = max(1, int(-(-pct * len(samples) // 100)))
+    return samples[rank - 1]
+
+
+def format_report(rows):
+    """
+    生成启动耗时统计文字，单位为秒
+    """
+    def seconds(value):
+        return '' if value is None else f'{value:.2f}'
+
+    lines = [f'{"maya":<6} {"plugin":<12} {"count":>5} {"p50":>8} {"p95":>8} {"max":>8} '
+             f'{"not_loaded":>10} {"failed":>6} {"timeout":>7}']
+    for row in rows:
+        lines.append(f'{row["maya_version"]:<6} {row["plugin_version"]:<12} {row["count"]:>5} '
+                     f'{seconds(row["p50"]):>8} {seconds(row["p95"]):>8} {seconds(row["max"]):>8} '
+                     f'{row["not_loaded"]:>10} {row["failed"]:>6} {row["timeout"]:>7}')
+    return '\n'.join(lines)
+
+
+launch_latency = LaunchLatencyStore()
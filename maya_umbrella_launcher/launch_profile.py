@@ -0,0 +1,122 @@
+import os
+import json
+import threading
+
+import maya_umbrella_launcher.constant as const
+from maya_umbrella_launcher.log import logger
+from maya_umbrella_launcher.profiling import traced
+
+
+class LaunchProfileCache(object):
+    """
+    启动配置缓存
+    按maya版本保存解析好的启动配置（script目录、插件版本、环境变量增量、maya程序路径），
+    插件目录或版本清单的修改时间变化（安装、删除、固定版本），切换更新通道，或者maya程序不存在（卸载、移动）时失效。
+    缓存命中时启动maya只需要stat插件目录和maya程序，不再扫描目录和查询注册表。
+    """
+
+    cache_file_name = 'launch_profiles.json'
+
+    def __init__(self, cache_folder=const.CACHE_FOLDER):
+        self.cache_file = os.path.join(cache_folder, self.cache_file_name)
+        self._profiles = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_stamp(plugin_folder):
+        """
+        获取失效标记
+        Return:
+            [插件目录的修改时间, 版本清单的修改时间, 更新通道]，插件目录不存在时返回None
+        """
+        from maya_umbrella_launcher.versions import get_channel
+
+        try:
+            folder_mtime = os.stat(plugin_folder).st_mtime_ns
+        except (OSError, TypeError):
+            return None
+        try:
+            manifest_mtime = os.stat(os.path.join(plugin_folder, const.VERSION_MANIFEST_NAME)).st_mtime_ns
+        except OSError:
+            manifest_mtime = None
+        return [folder_mtime, manifest_mtime, get_channel()]
+
+    def get(self, maya_version, plugin_folder):
+        """
+        获取缓存的启动配置，不存在或已失效时返回None
+        """
+        with self._lock:
+            profile = self._load().get(str(maya_version))
+
+        if not profile or profile['plugin_folder'] != plugin_folder or 'plugin_version' not in profile:
+            return None
+        if profile['stamp'] != self.get_stamp(plugin_folder):
+            return None
+        if not os.path.isfile(profile['app_path']):
+            return None
+        return profile
+
+    def set(self, maya_version, plugin_folder, app_path, script_folder):
+        """
+        保存启动配置
+        Return:
+            启动配置字典
+        """
+        bin_folder = os.path.dirname(app_path)
+        profile = {
+            'maya_version': str(maya_version),
+            'plugin_folder': plugin_folder,
+            'plugin_version': os.path.basename(os.path.dirname(os.path.dirname(script_folder))),
+            'stamp': self.get_stamp(plugin_folder),
+            'app_path': app_path,
+            'script_folder': script_folder,
+            'env_append': {'PYTHONPATH': script_folder},
+            'env_set': {'QT_PLUGIN_PATH': os.path.join(os.path.dirname(bin_folder), 'plugins', 'platforms')},
+        }
+        with self._lock:
+            profiles = self._load()
+            profiles[str(maya_version)] = profile
+            self._save(profiles)
+        return profile
+
+    def clear(self):
+        with self._lock:
+            self._profiles = {}
+            if os.path.isfile(self.cache_file):
+                os.remove(self.cache_file)
+
+    @staticmethod
+    @traced('launch_profile.build_env')
+    def build_env(profile, base_env=None):
+        """
+        把启动配置里的环境变量增量应用到base_env的副本上
+        """
+        envs = dict(os.environ if base_env is None else base_env)
+        for key, value in profile['env_append'].items():
+            envs[key] = os.pathsep.join(filter(None, [envs.get(key, ''), value]))
+        envs.update(profile['env_set'])
+        return envs
+
+    def _load(self):
+        if self._profiles is None:
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    self._profiles = json.load(f)
+            except (OSError, ValueError):
+                self._profiles = {}
+        return self._profiles
+
+    def _save(self, profiles):
+        folder = os.path.dirname(self.cache_file)
+        tmp_path = f'{self.cache_file}.{os.getpid()}.tmp'
+        try:
+            if not os.path.isdir(folder):
+                os.makedirs(folder)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(profiles, f)
+            os.replace(tmp_path, self.cache_file)
+        except OSError as e:
+            logger.debug(f'Failed to save launch profiles: {e}')
+
+
+launch_profile_cache = LaunchProfileCache()
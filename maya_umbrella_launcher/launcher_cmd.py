@@ -1,9 +1,12 @@
 import os
+import sys
+import json
+import time
 import argparse
 
 
+import maya_umbrella_launcher.constant as const
 import maya_umbrella_launcher.translator as tr
-from maya_umbrella_launcher.filesystem import MayaSystem
 from maya_umbrella_launcher.core import PluginManager, PluginInstaller, UserSetting
 
 
@@ -12,12 +15,38 @@ def main():
 
     parser.add_argument('-p', '--path', type=str, nargs='?', const='', help=tr.no_plugin_folder.text)
     parser.add_argument('-d', '--download', action='store_true', help=tr.run_download.text)
+    parser.add_argument('--stream', action='store_true', help=tr.run_stream_extract.text)
+    parser.add_argument('--full', action='store_true', help=tr.run_full_download.text)
+    parser.add_argument('--cache-stats', action='store_true', help=tr.show_cache_stats.text)
     parser.add_argument('-s', '--start', type=int, help=tr.specify_version.text)
-    parser.add_argument('-i', '--install', type=int, help=tr.run_install.text)
+    parser.add_argument('--supervise', action='store_true', help=tr.supervise_help.text)
+    parser.add_argument('--restart-on-crash', action='store_true', help=tr.restart_on_crash_help.text)
+    parser.add_argument('--sessions', action='store_true', help=tr.show_sessions.text)
+    parser.add_argument('--latency', action='store_true', help=tr.show_latency.text)
+    parser.add_argument('-i', '--install', type=install_target, help=tr.run_install_help.text)
+    parser.add_argument('--document-folders', type=str, nargs='+', help=tr.document_folders_help.text)
     parser.add_argument('-u', '--uninstall', type=int, help=tr.run_uninstall.text)
+    parser.add_argument('--batch', type=str, help=tr.run_batch.text)
+    parser.add_argument('--max-workers', type=int, help=tr.max_workers_help.text)
+    parser.add_argument('--serve-mirror', type=str, metavar='DIR', help=tr.serve_mirror_help.text)
+    parser.add_argument('--mirror-host', type=str, default=const.MIRROR_HOST, help=tr.mirror_host_help.text)
+    parser.add_argument('--mirror-port', type=int, default=const.MIRROR_PORT, help=tr.mirror_port_help.text)
+    parser.add_argument('--mirror-url', type=str, help=tr.mirror_url_help.text)
+    parser.add_argument('--upstream', type=str, default=const.GITHUB_API, help=tr.upstream_help.text)
+    parser.add_argument('--sources', type=str, nargs='*', help=tr.sources_help.text)
+    parser.add_argument('--channel', type=str, choices=const.CHANNELS, help=tr.channel_help.text)
+    parser.add_argument('--versions', action='store_true', help=tr.show_versions.text)
+    parser.add_argument('--pin', type=str, nargs=2, metavar=('MAYA_VERSION', 'TAG'), help=tr.pin_help.text)
+    parser.add_argument('--unpin', type=str, metavar='MAYA_VERSION', help=tr.unpin_help.text)
+    parser.add_argument('--profile', type=str, nargs='?', const=const.PROFILE_TRACE, choices=const.PROFILE_MODES,
+                        help=tr.profile_help.text)
 
     args = parser.parse_args()
 
+    if args.profile:
+        from maya_umbrella_launcher.profiling import start
+        start(args.profile)
+
     if args.path:
         if os.path.isdir(args.path):
             UserSetting.set('plugin_folder', args.path)
@@ -27,20 +56,107 @@ def main():
     elif args.path == '':
         print(UserSetting.get('plugin_folder'))
 
+    if args.sources:
+        UserSetting.set('release_sources', args.sources)
+    elif args.sources is not None:
+        from maya_umbrella_launcher.mirror import release_sources
+        print(', '.join(release_sources.get_sources()))
+
+    if args.channel:
+        UserSetting.set('plugin_channel', args.channel)
+
+    if args.pin or args.unpin or args.versions:
+        from maya_umbrella_launcher.versions import VersionManifest, get_channel
+
+        plugin_folder = UserSetting.get('plugin_folder')
+        if not plugin_folder or not os.path.isdir(plugin_folder):
+            print(tr.no_plugin_folder.text)
+            return 1
+        manifest = VersionManifest(plugin_folder)
+        if args.pin and not manifest.pin(*args.pin):
+            return 1
+        if args.unpin:
+            manifest.unpin(args.unpin)
+        if args.versions:
+            print(format_versions(manifest, get_channel()))
+        return
+
+    if args.serve_mirror:
+        from maya_umbrella_launcher.mirror import MirrorServer
+
+        mirror = MirrorServer(args.serve_mirror, host=args.mirror_host, port=args.mirror_port, upstream=args.upstream,
+                              public_url=args.mirror_url)
+        mirror.start_refresh()
+        try:
+            mirror.serve_forever()
+        except KeyboardInterrupt:
+            mirror.shutdown()
+        return
+
+    if args.cache_stats:
+        from maya_umbrella_launcher.release_cache import release_cache
+        print(json.dumps(release_cache.get_stats(), indent=4))
+
     if args.download:
-        if not PluginManager.download_plugin(overwrite=True):
+        from maya_umbrella_launcher.progress import ProgressMeter, print_progress
+
+        is_success = PluginManager.download_plugin(overwrite=True, stream_extract=args.stream or None,
+                                                   delta_update=False if args.full else None,
+                                                   progress=ProgressMeter(callback=print_progress))
+        sys.stderr.write('\n')
+        if not is_success:
             return
 
-    if args.start:
+    if args.batch:
+        from maya_umbrella_launcher.batch import BatchLauncher
+
         envs = PluginManager.get_python_path_env()
-        maya_app_path = MayaSystem.get_maya_app_path(maya_version=args.start)
-        MayaSystem.launch_maya(maya_path=maya_app_path,
-                               envs=envs
-                               )
+        if not envs:
+            print(tr.unable_found_script.text)
+            return 1
+        jobs, max_workers = BatchLauncher.load_jobs(args.batch)
+        results = BatchLauncher(envs=envs, max_workers=args.max_workers or max_workers).run(jobs)
+        print(BatchLauncher.format_summary(results))
+        return 0 if all(result['status'] == 'ok' for result in results) else 1
+
+    if args.start:
+        start_time = time.time()
+        profile = PluginManager.get_launch_profile(maya_version=args.start)
+        if not profile['app_path']:
+            print(tr.unable_found_maya.text.format(args.start))
+            return
+        if not profile['script_folder']:
+            print(tr.unable_found_script.text)
+            return
+        session = PluginManager.launch(profile, name=args.start, restart_on_crash=args.restart_on_crash,
+                                       start_time=start_time)
+        if args.supervise or args.restart_on_crash:
+            from maya_umbrella_launcher.supervisor import process_supervisor
+            return process_supervisor.wait(session)
+        return
+
+    if args.sessions:
+        from maya_umbrella_launcher.supervisor import process_supervisor, format_sessions
+        print(format_sessions(process_supervisor.get_sessions()))
+        return
+
+    if args.latency:
+        from maya_umbrella_launcher.latency import launch_latency, format_report
+        print(format_report(launch_latency.get_report()))
+        return
+
+    if args.install == 'all':
+        report = PluginInstaller.install_all(document_folders=args.document_folders)
+        for status in ('changed', 'unchanged', 'failed'):
+            for entry in report[status]:
+                print(f'[{status}] {entry["maya_version"]} {entry["mod_file"] or ""} {entry["error"] or ""}'.rstrip())
+        print(tr.install_report.text.format(*[len(report[key]) for key in ('changed', 'unchanged', 'failed')]))
         return
 
     if args.install:
-        PluginInstaller.install(maya_version=args.install)
+        if not PluginInstaller.install(maya_version=args.install):
+            print(tr.install_failed.text)
+            return 1
         print(tr.run_install.text)
         return
 
@@ -50,5 +166,35 @@ def main():
         return
 
 
+def install_target(value):
+    """
+    -i/--install的参数：all或者maya版本号
+    """
+    if value == 'all' or value.isdigit():
+        return value
+    raise argparse.ArgumentTypeError(tr.invalid_install_target.text.format(value))
+
+
+def format_versions(manifest, channel):
+    """
+    已安装版本的列表，标出当前通道使用的版本和按maya版本固定的版本
+    """
+    data = manifest.load()
+    active = manifest.resolve(channel=channel)
+    pins = {}
+    for maya_version, tag in data['pins'].items():
+        pins.setdefault(tag, []).append(maya_version)
+
+    lines = [f'channel: {channel}']
+    for tag in reversed(manifest.get_versions()):
+        entry = data['versions'][tag]
+        flags = ['*'] if tag == active else []
+        if tag in pins:
+            flags.append(f'pinned: {", ".join(sorted(pins[tag]))}')
+        lines.append(f'{tag:<16} {time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["installed_at"]))}  '
+                     f'{entry["size"] / 1024 / 1024:>7.1f} MB  {entry["hash"][:19]}  {" ".join(flags)}'.rstrip())
+    return '\n'.join(lines)
+
+
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
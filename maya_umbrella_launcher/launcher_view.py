@@ -1,15 +1,21 @@
 import os.path
 import sys
+import time
 
 import dayu_widgets as dy
-from PySide2 import QtWidgets, QtCore
-from dayu_widgets.qt import MPixmap, MIcon
+from PySide2 import QtWidgets, QtCore, QtGui
 
 import maya_umbrella_launcher.constant as const
 import maya_umbrella_launcher.translator as tr
-from maya_umbrella_launcher.common_widgets import CommonWidget, CommonDialog, question_box, show_message
+from maya_umbrella_launcher.common_widgets import CommonWidget, CommonDialog, IconToolButton, question_box, \
+    show_message, icon_cache, theme_manager
 from maya_umbrella_launcher.filesystem import MayaSystem
 from maya_umbrella_launcher.core import PluginManager, PluginInstaller, UserSetting
+from maya_umbrella_launcher.supervisor import process_supervisor
+from maya_umbrella_launcher.tasks import task_pool, Task
+from maya_umbrella_launcher.progress import ProgressMeter, format_progress
+from maya_umbrella_launcher.versions import is_newer
+from maya_umbrella_launcher.profiling import span, tracer
 
 
 class MainUI(CommonWidget):
@@ -17,17 +23,22 @@ class MainUI(CommonWidget):
     def __init__(self, parent=None):
         super(MainUI, self).__init__(parent=parent)
 
+        # 先设置主题再创建控件，创建完成后整个窗口只应用一次样式表
+        theme_manager.set_theme(self.current_theme)
+
         # data
-        self.maya_versions = MayaSystem.get_installed_maya_versions()
+        self.maya_versions = []
+        self.setting_dialog = None
 
         # widgets
         self.line_tab = dy.MLineTabWidget(alignment=QtCore.Qt.AlignLeft, parent=self)
         self.launcher_tab = LauncherWidget(parent=self)
         self.installer_tab = InstallerWidget(parent=self)
-        self.help_bt = dy.MToolButton().svg(r'resource/help.svg').icon_only().small()
-        self.setting_bt = dy.MToolButton().svg(r'resource/settings.svg').icon_only().small()
-        self.translate_bt = dy.MToolButton().svg(r'resource/translate.svg').icon_only().small()
-        self.theme_bt = dy.MToolButton().svg(r'resource/dark.svg').icon_only().small()
+        self.help_bt = IconToolButton(r'resource/help.svg').icon_only().small()
+        self.setting_bt = IconToolButton(r'resource/settings.svg').icon_only().small()
+        self.session_bt = IconToolButton(r'resource/list_view.svg').icon_only().small()
+        self.translate_bt = IconToolButton(r'resource/translate.svg').icon_only().small()
+        self.theme_bt = IconToolButton(r'resource/dark.svg').icon_only().small()
         self.div = dy.MDivider()
 
         # init ui
@@ -44,14 +55,15 @@ class MainUI(CommonWidget):
         self.add_widgets_h_line(dy.MLabel('Maya Umbrella Launcher').h2().secondary())
         self.add_widgets_v_line(self.line_tab)
         self.add_widgets_v_line(self.div)
-        self.add_widgets_h_line(self.translate_bt, self.theme_bt, self.setting_bt, self.help_bt, side='right')
+        self.add_widgets_h_line(self.translate_bt, self.theme_bt, self.session_bt, self.setting_bt, self.help_bt,
+                                side='right')
 
         self.setLayout(self.main_layout)
 
     def adjust_ui(self):
         self.line_tab.tool_button_group.set_dayu_checked(0)
         self.setWindowTitle(const.WINDOW_TITLE)
-        self.setWindowIcon(MIcon(r'resource/app_umbrella.ico'))
+        self.setWindowIcon(icon_cache.get(r'resource/app_umbrella.ico'))
 
         main_window_size = UserSetting.get('main_window_size')
         if not main_window_size:
@@ -59,54 +71,54 @@ class MainUI(CommonWidget):
         else:
             self.resize(*main_window_size)
 
-        theme = dy.MTheme(theme=self.current_theme)
-        theme.apply(self)
-        theme.apply(self.installer_tab.version_cb)
-        theme.apply(self.launcher_tab.version_cb)
+        theme_manager.apply(self)
 
     def connect_command(self):
         self.setting_bt.clicked.connect(self.show_setting_dialog)
+        self.session_bt.clicked.connect(self.show_session_dialog)
         self.translate_bt.clicked.connect(self.switch_language)
         self.theme_bt.clicked.connect(self.switch_theme)
+        tr.add_language_listener(self.translate_ui)
 
     def set_data(self):
+        # 查找maya可能要读注册表、扫描目录，放到后台，窗口先显示出来
+        task_pool.run(MayaSystem.get_installed_maya_versions, on_finished=self.maya_versions_loaded)
+
+    def maya_versions_loaded(self, maya_versions):
+        self.maya_versions = maya_versions
         self.launcher_tab.version_cb.addItems(sorted(self.maya_versions))
-        self.installer_tab.version_cb.addItems(sorted(self.maya_versions))
-        self.translate_ui()
+        self.installer_tab.set_maya_versions(self.maya_versions)
 
     def show_setting_dialog(self):
-        dialog = SettingDialog()
-        theme = dy.MTheme(theme=self.current_theme)
-        theme.apply(dialog)
-        theme.apply(dialog.version_cb)
+        # 第一次打开时创建，之后重复使用，只刷新数据
+        if self.setting_dialog is None:
+            self.setting_dialog = SettingDialog(parent=self)
+            theme_manager.apply(self.setting_dialog)
+        else:
+            self.setting_dialog.set_data()
+        self.setting_dialog.exec_()
+
+    def show_session_dialog(self):
+        dialog = SessionDialog()
+        theme_manager.apply(dialog)
         dialog.exec_()
 
     def switch_language(self):
         current_language = tr.get_language()
         tr.set_language('cn' if current_language == 'en' else 'en')
-        self.translate_ui()
 
     def switch_theme(self):
         new_theme = 'dark' if self.current_theme == 'light' else 'light'
-        theme = dy.MTheme(theme=new_theme)
-        theme.apply(self)
-        theme.apply(self.installer_tab.version_cb)
-        theme.apply(self.launcher_tab.version_cb)
+        theme_manager.switch(new_theme)
         self.current_theme = new_theme
 
     def translate_ui(self):
-
-        self.launcher_tab.launch_bt.setText(tr.launch_bt.text)
         self.launcher_tab_bt.setText(tr.launch_tab.text)
-        self.launcher_tab.description_label.setText(tr.launcher_desc.text)
-        self.launcher_tab.version_label.setText(tr.version_label.text)
-
         self.installer_tab_bt.setText(tr.install_tab.text)
-        self.installer_tab.description_label.setText(tr.install_desc.text)
-        self.installer_tab.version_label.setText(tr.version_label.text)
-        self.installer_tab.mod_label.setText(tr.mod_label.text)
-        self.installer_tab.install_bt.setText(tr.install_bt.text)
-        self.installer_tab.remove_bt.setText(tr.remove_bt.text)
+        self.launcher_tab.translate_ui()
+        self.installer_tab.translate_ui()
+        if self.setting_dialog is not None:
+            self.setting_dialog.translate_ui()
 
     @property
     def launcher_tab_bt(self):
@@ -128,6 +140,8 @@ class MainUI(CommonWidget):
     def closeEvent(self, event):
         size = self.size()
         UserSetting.set('main_window_size', (size.width(), size.height()))
+        tr.remove_language_listener(self.translate_ui)
+        task_pool.cancel_all()
 
 
 class LauncherWidget(CommonWidget):
@@ -153,38 +167,75 @@ class LauncherWidget(CommonWidget):
 
     def adjust_ui(self):
         self.version_label.setFixedWidth(60)
-        self.launch_bt.setIcon(MPixmap('app-maya.png'))
+        self.launch_bt.setIcon(icon_cache.get('app-maya.png'))
         self.version_cb.setMaximumWidth(200)
 
     def connect_command(self):
         self.launch_bt.clicked.connect(self.launch_bt_clicked)
 
+    def translate_ui(self):
+        self.description_label.setText(tr.launcher_desc.text)
+        self.version_label.setText(tr.version_label.text)
+        self.launch_bt.setText(tr.launch_bt.text)
+
     def launch_bt_clicked(self):
+        start_time = time.time()
         maya_version = self.version_cb.currentText()
         if not maya_version:
             return
 
-        maya_path = MayaSystem.get_maya_app_path(maya_version)
-        if not maya_path:
+        self.launch_bt.setEnabled(False)
+        task_pool.run(self.launch_maya, maya_version, start_time,
+                      on_finished=self.launch_finished,
+                      on_failed=lambda e: self.launch_finished((maya_version, {})))
+
+    @staticmethod
+    def launch_maya(maya_version, start_time):
+        """
+        在后台线程解析启动配置并启动maya
+        Return:
+            (maya版本号, 启动配置)
+        """
+        profile = PluginManager.get_launch_profile(maya_version)
+        if profile['app_path'] and profile['script_folder']:
+            PluginManager.launch(profile, name=maya_version, start_time=start_time)
+        return maya_version, profile
+
+    def launch_finished(self, result):
+        maya_version, profile = result
+        self.launch_bt.setEnabled(True)
+        if not profile.get('app_path'):
             return show_message(text=tr.unable_found_maya.text.format(maya_version),
                                 typ='error',
                                 parent=self)
 
-        envs = PluginManager.get_python_path_env()
-        if not envs:
+        if not profile.get('script_folder'):
             return show_message(text=tr.unable_found_script.text,
                                 typ='error',
                                 parent=self
                                 )
 
-        MayaSystem.launch_maya(maya_path, envs)
-
 
 class InstallerWidget(CommonWidget):
+    """
+    安装页，第一次切换到这一页时才创建控件，主窗口可以更快显示
+    """
 
     def __init__(self, parent=None):
         super(InstallerWidget, self).__init__(parent=parent)
 
+        # data
+        self.is_built = False
+        self.maya_versions = []
+
+        self.setLayout(self.main_layout)
+
+    def showEvent(self, event):
+        if not self.is_built:
+            self.build()
+        super(InstallerWidget, self).showEvent(event)
+
+    def build(self):
         # widgets
         self.version_label = dy.MLabel()
         self.mod_label = dy.MLabel()
@@ -194,11 +245,14 @@ class InstallerWidget(CommonWidget):
         self.install_bt = dy.MPushButton().small()
         self.remove_bt = dy.MPushButton().small()
         self.status_label = dy.MLabel().strong()
+        self.is_built = True
 
         # init ui
         self.init_ui()
         self.adjust_ui()
         self.connect_command()
+        self.translate_ui()
+        self.set_maya_versions(self.maya_versions)
 
     def init_ui(self):
         self.add_widgets_v_line(self.description_label)
@@ -206,8 +260,6 @@ class InstallerWidget(CommonWidget):
         self.add_widgets_h_line(self.mod_label, self.mod_file_line)
         self.add_widgets_h_line(self.install_bt, self.remove_bt)
 
-        self.setLayout(self.main_layout)
-
     def adjust_ui(self):
         self.mod_file_line.setReadOnly(True)
 
@@ -216,11 +268,26 @@ class InstallerWidget(CommonWidget):
         self.remove_bt.clicked.connect(self.remove_bt_clicked)
         self.version_cb.currentTextChanged.connect(self.version_cb_changed)
 
+    def translate_ui(self):
+        if not self.is_built:
+            return
+        self.description_label.setText(tr.install_desc.text)
+        self.version_label.setText(tr.version_label.text)
+        self.mod_label.setText(tr.mod_label.text)
+        self.install_bt.setText(tr.install_bt.text)
+        self.remove_bt.setText(tr.remove_bt.text)
+
+    def set_maya_versions(self, maya_versions):
+        """
+        后台查找到maya后调用，还没有创建控件时先保存，创建时再填入
+        """
+        self.maya_versions = maya_versions
+        if self.is_built:
+            self.version_cb.clear()
+            self.version_cb.addItems(sorted(maya_versions))
+
     def version_cb_changed(self, version_number):
         if version_number:
-            mod_folder = MayaSystem.get_maya_module_folder(version_number)
-            mod_file = os.path.join(mod_folder, 'maya_umbrella.mod')
-            self.mod_file_line.setText(mod_file)
             self.update_install_status()
 
     def install_bt_clicked(self):
@@ -228,7 +295,14 @@ class InstallerWidget(CommonWidget):
         if not maya_version:
             return
 
-        if PluginInstaller.install(maya_version):
+        self.disable_buttons(True)
+        task_pool.run(PluginInstaller.install, maya_version,
+                      on_finished=self.install_finished,
+                      on_failed=lambda e: self.install_finished(False))
+
+    def install_finished(self, is_success):
+        self.disable_buttons(False)
+        if is_success:
             show_message(text=tr.install_success.text, typ='success', parent=self)
         else:
             show_message(text=tr.install_failed.text, typ='error', parent=self)
@@ -239,13 +313,44 @@ class InstallerWidget(CommonWidget):
         if not maya_version:
             return
 
-        PluginInstaller.uninstall(maya_version)
+        self.disable_buttons(True)
+        task_pool.run(PluginInstaller.uninstall, maya_version,
+                      on_finished=self.remove_finished,
+                      on_failed=self.remove_finished)
+
+    def remove_finished(self, *args):
+        self.disable_buttons(False)
         show_message(text=tr.uninstall_success.text, typ='success', parent=self)
         self.update_install_status()
 
+    def disable_buttons(self, is_disable=True):
+        self.install_bt.setEnabled(not is_disable)
+        self.remove_bt.setEnabled(not is_disable)
+
     def update_install_status(self):
-        mod_file = self.mod_file_line.text()
-        if os.path.isfile(mod_file):
+        maya_version = self.version_cb.currentText()
+        if maya_version:
+            task_pool.run(self.get_install_status, maya_version, on_finished=self.install_status_loaded)
+
+    @staticmethod
+    def get_install_status(maya_version):
+        """
+        在后台线程获取mod文件路径和是否已安装
+        Return:
+            (maya版本号, mod文件路径, 是否已安装)
+        """
+        mod_folder = MayaSystem.get_maya_module_folder(maya_version)
+        mod_file = os.path.join(mod_folder, 'maya_umbrella.mod')
+        return maya_version, mod_file, os.path.isfile(mod_file)
+
+    def install_status_loaded(self, result):
+        maya_version, mod_file, is_installed = result
+        # 切换版本后，之前版本的结果不再显示
+        if maya_version != self.version_cb.currentText():
+            return
+
+        self.mod_file_line.setText(mod_file)
+        if is_installed:
             self.status_label.setText(tr.already_installed_status.text)
             self.status_label.set_dayu_type(dy.MLabel.WarningType)
         else:
@@ -260,6 +365,7 @@ class SettingDialog(CommonDialog):
 
         # widget
         self.loading_msg = None
+        self.tasks = []
         self.setting_title = dy.MLabel().h2().secondary()
         self.plugin_label = dy.MLabel()
         self.version_label = dy.MLabel()
@@ -267,8 +373,11 @@ class SettingDialog(CommonDialog):
         self.version_cb = dy.MComboBox().small()
         self.download_bt = dy.MPushButton().small()
         self.check_bt = dy.MPushButton().small()
+        self.beta_ckb = dy.MCheckBox()
         self.proxy_ckb = dy.MCheckBox()
         self.proxy_line = dy.MLineEdit().small()
+        self.progress_bar = dy.MProgressBar()
+        self.progress_label = dy.MLabel().secondary()
 
         # init ui
         self.init_ui()
@@ -280,8 +389,9 @@ class SettingDialog(CommonDialog):
     def init_ui(self):
         self.add_widgets_h_line(self.setting_title)
         self.add_widgets_h_line(self.plugin_label, self.folder_line, self.download_bt)
-        self.add_widgets_h_line(self.version_label, self.version_cb, self.check_bt)
+        self.add_widgets_h_line(self.version_label, self.version_cb, self.beta_ckb, self.check_bt)
         self.add_widgets_h_line(self.proxy_ckb, self.proxy_line)
+        self.add_widgets_v_line(self.progress_bar, self.progress_label)
 
         self.setLayout(self.main_layout)
 
@@ -294,49 +404,115 @@ class SettingDialog(CommonDialog):
             self.resize(*setting_window_size)
 
         self.setWindowTitle('Settings Dialog')
+        self.show_progress(False)
 
     def set_data(self):
         plugin_folder = UserSetting.get('plugin_folder')
         if plugin_folder:
             self.plugin_folder = plugin_folder
-            self.versions = PluginManager.get_local_version_list(plugin_folder)
+            self.load_versions()
 
-        proxy_on = UserSetting.get('proxy_on', default='')
-        self.proxy_ckb.setChecked(bool(proxy_on))
-        self.proxy_line.setEnabled(bool(proxy_on))
+        self.beta_ckb.setChecked(UserSetting.get('plugin_channel') == const.CHANNEL_BETA)
+        proxy_on = UserSetting.get_bool('proxy_on')
+        self.proxy_ckb.setChecked(proxy_on)
+        self.proxy_line.setEnabled(proxy_on)
         self.proxy_url = UserSetting.get('proxy_url', default='')
         self.proxy_line.setPlaceholderText('Example: http://127.0.0.1:8889')
 
     def connect_command(self):
         self.folder_line.textChanged.connect(self.folder_line_changed)
         self.check_bt.clicked.connect(self.check_bt_clicked)
+        self.beta_ckb.stateChanged.connect(self.beta_ckb_clicked)
         self.download_bt.clicked.connect(self.download_bt_clicked)
         self.proxy_ckb.stateChanged.connect(self.proxy_ckb_clicked)
         self.proxy_line.textChanged.connect(self.update_proxy_setting)
 
     def folder_line_changed(self):
         UserSetting.set('plugin_folder', self.plugin_folder)
-        self.versions = PluginManager.get_local_version_list(self.plugin_folder)
+        self.load_versions()
+
+    def start_task(self, task):
+        """
+        启动任务，窗口关闭时取消所有还在运行的任务
+        """
+        self.tasks = [item for item in self.tasks if item in task_pool.running_tasks()]
+        self.tasks.append(task)
+        return task_pool.start(task)
+
+    def load_versions(self):
+        plugin_folder = self.plugin_folder
+        task = Task(PluginManager.get_local_version_list, plugin_folder)
+        task.signals.finished.connect(lambda versions: self.versions_loaded(plugin_folder, versions))
+        self.start_task(task)
+
+    def versions_loaded(self, plugin_folder, versions):
+        # 输入路径时每次变化都会查询，只使用当前路径的结果
+        if plugin_folder == self.plugin_folder:
+            self.versions = versions
 
     def download_bt_clicked(self):
         self.loading_msg = dy.MToast.loading(tr.downloading.text, parent=self)
         self.disable_dialog(is_disable=True)
-
-        task = DownloadTask(proxies=self.proxies,
-                            parent=self)
-        task.is_success_sig.connect(self.msg_slot_finished)
-        task.start()
+        self.show_progress(True)
+
+        task = Task(self.download_plugin, self.proxies, with_task=True)
+        task.signals.progress.connect(self.download_progress)
+        task.signals.finished.connect(lambda result: self.msg_slot_finished(bool(result)))
+        task.signals.failed.connect(lambda e: self.msg_slot_finished(False))
+        task.signals.cancelled.connect(self.download_cancelled)
+        self.start_task(task)
+
+    @staticmethod
+    def download_plugin(task, proxies):
+        progress = ProgressMeter(callback=task.report_progress)
+        return PluginManager.download_plugin(proxies, cancel_event=task.cancel_event, progress=progress)
+
+    def download_progress(self, snapshot):
+        if snapshot['total']:
+            self.progress_bar.setValue(snapshot['done'] * 100 // snapshot['total'])
+        self.progress_label.setText(format_progress(snapshot))
+
+    def show_progress(self, is_show=True):
+        self.progress_bar.setValue(0)
+        self.progress_label.setText('')
+        self.progress_bar.setVisible(is_show)
+        self.progress_label.setVisible(is_show)
 
     def check_bt_clicked(self):
-        current_latest_version = max(self.versions) if self.versions else 'v0.0.0'
-        latest_version = PluginManager.get_latest_version()
-        if latest_version > current_latest_version:
+        self.check_bt.setEnabled(False)
+        task = Task(self.check_latest_version, self.plugin_folder)
+        task.signals.finished.connect(self.latest_version_loaded)
+        task.signals.failed.connect(self.latest_version_failed)
+        self.start_task(task)
+
+    @staticmethod
+    def check_latest_version(plugin_folder):
+        """
+        在后台线程同时获取最新的版本号和本地已安装的最新版本，不依赖load_versions是否已经完成
+        最新版本号来自release信息缓存，有效期内不发请求
+        Return:
+            (最新版本号, 本地最新版本号)
+        """
+        local_versions = PluginManager.get_local_version_list(plugin_folder)
+        return PluginManager.get_latest_version(), local_versions[-1] if local_versions else ''
+
+    def latest_version_loaded(self, result):
+        self.check_bt.setEnabled(True)
+        latest_version, current_latest_version = result
+        if is_newer(latest_version, current_latest_version):
             if question_box(text=tr.is_download_new_version.text.format(latest_version), parent=self):
                 self.download_bt_clicked()
                 return
         else:
             show_message(text=tr.already_latest_version.text, parent=self)
 
+    def latest_version_failed(self, error):
+        self.check_bt.setEnabled(True)
+        show_message(text=tr.check_update_failed.text, typ='warning', parent=self)
+
+    def beta_ckb_clicked(self):
+        UserSetting.set('plugin_channel', const.CHANNEL_BETA if self.beta_ckb.isChecked() else const.CHANNEL_STABLE)
+
     def proxy_ckb_clicked(self):
         self.proxy_line.setEnabled(self.proxy_ckb.isChecked())
         self.update_proxy_setting()
@@ -352,11 +528,22 @@ class SettingDialog(CommonDialog):
         self.version_label.setText(tr.plugin_version_label.text)
         self.download_bt.setText(tr.download_bt.text)
         self.check_bt.setText(tr.check_update_bt.text)
+        self.beta_ckb.setText(tr.beta_channel_label.text)
         self.proxy_ckb.setText(tr.proxy_label.text)
 
-    def msg_slot_finished(self, is_success):
+    def reset_download_ui(self):
         self.disable_dialog(is_disable=False)
-        self.loading_msg.close()
+        self.show_progress(False)
+        if self.loading_msg:
+            self.loading_msg.close()
+            self.loading_msg = None
+
+    def download_cancelled(self):
+        # 窗口关闭时取消的下载，重新打开窗口（窗口会重复使用）时控件要恢复可用
+        self.reset_download_ui()
+
+    def msg_slot_finished(self, is_success):
+        self.reset_download_ui()
         if is_success:
             self.set_data()
             show_message(text=tr.download_success.text,
@@ -372,13 +559,27 @@ class SettingDialog(CommonDialog):
     def disable_dialog(self, is_disable=True):
         self.download_bt.setEnabled(not is_disable)
         self.check_bt.setEnabled(not is_disable)
+        self.beta_ckb.setEnabled(not is_disable)
         self.folder_line.setEnabled(not is_disable)
         self.version_cb.setEnabled(not is_disable)
 
-    def closeEvent(self, event):
+    def cancel_tasks(self):
+        """
+        保存窗口大小，取消下载等任务，未完成的下载下次继续
+        """
         width = self.size().width()
         height = self.size().height()
         UserSetting.set('setting_window_size', (width, height))
+        for task in self.tasks:
+            task.cancel()
+
+    def closeEvent(self, event):
+        self.cancel_tasks()
+
+    def reject(self):
+        # 按Esc关闭时不经过closeEvent
+        self.cancel_tasks()
+        super(SettingDialog, self).reject()
 
     @property
     def plugin_folder(self):
@@ -396,7 +597,7 @@ class SettingDialog(CommonDialog):
     def versions(self, versions):
         self.version_cb.clear()
         if versions:
-            self.version_cb.addItems(sorted(versions, reverse=True))
+            self.version_cb.addItems(list(reversed(versions)))
 
     @property
     def proxy_url(self):
@@ -414,23 +615,97 @@ class SettingDialog(CommonDialog):
             return
 
 
-class DownloadTask(QtCore.QThread):
+class SessionDialog(CommonDialog):
+    """
+    显示启动过的maya会话，运行中的会话定时刷新
+    """
 
-    is_success_sig = QtCore.Signal(bool)
+    columns = ['id', 'name', 'pid', 'status', 'exit', 'started', 'seconds', 'max MB', 'restarts']
 
-    def __init__(self, proxies, parent=None):
-        super(DownloadTask, self).__init__(parent=parent)
-        self.proxies = proxies
+    def __init__(self, parent=None):
+        super(SessionDialog, self).__init__(parent=parent)
 
-    def run(self):
-        if PluginManager.download_plugin(self.proxies):
-            self.is_success_sig.emit(True)
-        else:
-            self.is_success_sig.emit(False)
+        # widget
+        self.session_title = dy.MLabel().h2().secondary()
+        self.session_tree = QtWidgets.QTreeWidget()
+        self.refresh_bt = dy.MPushButton().small()
+        self.open_log_bt = dy.MPushButton().small()
+        self.refresh_timer = QtCore.QTimer(self)
+        self.refresh_task = None
+
+        # init ui
+        self.init_ui()
+        self.adjust_ui()
+        self.translate_ui()
+        self.set_data()
+        self.connect_command()
+
+    def init_ui(self):
+        self.add_widgets_h_line(self.session_title)
+        self.add_widgets_v_line(self.session_tree)
+        self.add_widgets_h_line(self.refresh_bt, self.open_log_bt, side='right')
+
+        self.setLayout(self.main_layout)
+
+    def adjust_ui(self):
+        self.resize(720, 360)
+        self.setWindowTitle('Sessions Dialog')
+        self.session_tree.setHeaderLabels(self.columns)
+        self.session_tree.setRootIsDecorated(False)
+        self.refresh_timer.setInterval(int(const.SESSION_POLL_INTERVAL * 1000))
+
+    def set_data(self):
+        # 读取会话文件、检查进程都在后台进行，上一次还没完成时跳过
+        if self.refresh_task and self.refresh_task in task_pool.running_tasks():
+            return
+        self.refresh_task = task_pool.run(process_supervisor.get_sessions, on_finished=self.sessions_loaded)
+
+    def sessions_loaded(self, sessions):
+        self.session_tree.clear()
+        for session in reversed(sessions):
+            start_time = session['start_time'] or 0
+            end_time = session['exit_time'] or time.time()
+            exit_code = '' if session['exit_code'] is None else session['exit_code']
+            item = QtWidgets.QTreeWidgetItem([
+                session['id'], session['name'], str(session['pid'] or ''), session['status'], str(exit_code),
+                time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(start_time)),
+                f'{end_time - start_time:.1f}', f'{session["max_rss"] / 1024 / 1024:.1f}',
+                str(session['restarts'])])
+            item.setData(0, QtCore.Qt.UserRole, session['log_file'])
+            self.session_tree.addTopLevelItem(item)
+
+    def connect_command(self):
+        self.refresh_bt.clicked.connect(self.set_data)
+        self.open_log_bt.clicked.connect(self.open_log_bt_clicked)
+        self.session_tree.itemDoubleClicked.connect(self.open_log_bt_clicked)
+        self.refresh_timer.timeout.connect(self.set_data)
+        self.refresh_timer.start()
+
+    def open_log_bt_clicked(self):
+        item = self.session_tree.currentItem()
+        if not item:
+            return
+        log_file = item.data(0, QtCore.Qt.UserRole)
+        if log_file:
+            QtGui.QDesktopServices.openUrl(QtCore.QUrl.fromLocalFile(log_file))
+
+    def translate_ui(self):
+        self.session_title.setText(tr.sessions_title.text)
+        self.refresh_bt.setText(tr.refresh_bt.text)
+        self.open_log_bt.setText(tr.open_log_bt.text)
+
+    def closeEvent(self, event):
+        self.refresh_timer.stop()
+        if self.refresh_task:
+            self.refresh_task.cancel()
 
 
 if __name__ == '__main__':
+    # 设置环境变量MUL_PROFILE=trace或cprofile时记录界面启动的耗时
     app = QtWidgets.QApplication(sys.argv)
-    ui = MainUI()
-    ui.show()
+    with span('gui.create_main_window'):
+        ui = MainUI()
+    with span('gui.show'):
+        ui.show()
+    tracer.instant('gui.shown')
     app.exec_()
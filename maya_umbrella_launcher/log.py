@@ -1,18 +1,134 @@
 import os
+import json
+import queue
+import atexit
 import logging
+import threading
 
+import maya_umbrella_launcher.constant as const
 
-def get_logger():
-    _logger = logging.getLogger('maya_umbrella_launcher')
-    _logger.setLevel(logging.DEBUG)
 
-    file_handler = logging.FileHandler(os.path.join(os.path.expanduser('~'), 'maya_umbrella_launcher.log'), mode='w')
+class JsonFormatter(logging.Formatter):
+    """
+    每条日志输出为一行json，方便用脚本或日志系统分析
+    """
+
+    def format(self, record):
+        entry = {'time': record.created,
+                 'level': record.levelname,
+                 'logger': record.name,
+                 'thread': record.threadName,
+                 'message': record.getMessage()}
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class AsyncQueueHandler(logging.Handler):
+    """
+    异步日志
+    调用线程只把日志放进队列就返回，格式化和文件、控制台的写入都在后台线程完成，
+    界面线程和下载线程不会被磁盘I/O阻塞。
+    后台线程和日志文件在第一条日志时才创建，只导入模块不会打开文件，也不会导入logging.handlers。
+    退出时等待队列写完，之后的日志直接同步写入，不会丢失。
+    Args:
+        handler_factory(callable): 返回实际写入的handler列表
+    """
+
+    def __init__(self, handler_factory):
+        super(AsyncQueueHandler, self).__init__()
+        self.queue = queue.SimpleQueue()
+        self.handler_factory = handler_factory
+        self.listener = None
+        self.handlers = None
+        self._stopped = False
+        self._start_lock = threading.Lock()
+
+    def prepare(self, record):
+        # 只把参数合并进消息，避免参数对象之后被修改，异常和格式化留给后台线程
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def emit(self, record):
+        if self.listener is None:
+            self.start()
+        if self._stopped:
+            return self.handle_sync(record)
+        try:
+            self.queue.put_nowait(self.prepare(record))
+        except Exception:
+            self.handleError(record)
+
+    def start(self):
+        from logging.handlers import QueueListener
+
+        with self._start_lock:
+            if self.listener is not None or self._stopped:
+                return
+            self.handlers = self.handler_factory()
+            self.listener = QueueListener(self.queue, *self.handlers, respect_handler_level=True)
+            self.listener.start()
+            atexit.register(self.stop)
+
+    def stop(self):
+        """
+        等待队列里的日志写完，停止后台线程
+        """
+        with self._start_lock:
+            if self._stopped:
+                return
+            self._stopped = True
+        if self.listener is not None:
+            self.listener.stop()
+
+    def handle_sync(self, record):
+        for handler in self.handlers or []:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def close(self):
+        self.stop()
+        for handler in self.handlers or []:
+            handler.close()
+        super(AsyncQueueHandler, self).close()
+
+
+def create_handlers(log_file=const.LOG_FILE, log_format=const.LOG_FORMAT, console=True):
+    """
+    创建实际写入的handler
+    日志文件按大小轮转，保留之前运行的记录；log_format为json时写入同名的.jsonl文件，每行一条json
+    """
+    from logging.handlers import RotatingFileHandler
+
+    if log_format == 'json':
+        log_file = os.path.splitext(log_file)[0] + '.jsonl'
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter('%(asctime)s %(levelname)s [%(threadName)s] %(message)s')
+
+    file_handler = RotatingFileHandler(log_file,
+                                       maxBytes=const.LOG_MAX_SIZE,
+                                       backupCount=const.LOG_BACKUP_COUNT,
+                                       encoding='utf-8',
+                                       delay=True)
     file_handler.setLevel(logging.DEBUG)
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.DEBUG)
+    file_handler.setFormatter(formatter)
+    handlers = [file_handler]
 
-    _logger.addHandler(file_handler)
-    _logger.addHandler(console_handler)
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(const.LOG_CONSOLE_LEVEL)
+        handlers.append(console_handler)
+    return handlers
+
+
+def get_logger():
+    _logger = logging.getLogger('maya_umbrella_launcher')
+    _logger.setLevel(logging.DEBUG)
+    if not _logger.handlers:
+        _logger.addHandler(AsyncQueueHandler(create_handlers))
 
     return _logger
 
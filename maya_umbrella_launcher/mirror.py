@@ -0,0 +1,373 @@
+import os
+import re
+import json
+import time
+import socket
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import maya_umbrella_launcher.constant as const
+from maya_umbrella_launcher.log import logger
+from maya_umbrella_launcher.settings import settings
+
+
+class ReleaseSources(object):
+    """
+    release的下载源列表
+    按顺序使用设置release_sources（或环境变量MUL_RELEASE_SOURCES）里的源，github表示GitHub本身，
+    其他的是局域网镜像的地址，比如http://mirror:8765。
+    镜像先做健康检查，结果缓存一段时间，检查失败或请求失败的镜像在这段时间内跳过。
+    """
+
+    github = 'github'
+
+    def __init__(self, health_ttl=const.SOURCE_HEALTH_TTL, health_timeout=const.SOURCE_HEALTH_TIMEOUT):
+        self.health_ttl = health_ttl
+        self.health_timeout = health_timeout
+        self._health = {}
+        self._lock = threading.Lock()
+
+    def get_sources(self):
+        """
+        Return:
+            设置的源列表，没有设置时只有github
+        """
+        sources = settings.get('release_sources') or const.RELEASE_SOURCES
+        if isinstance(sources, str):
+            sources = sources.split(',')
+        sources = [source.strip().rstrip('/') for source in sources if source.strip()]
+        return sources or [self.github]
+
+    def get_api_base(self, source):
+        return const.GITHUB_API if source == self.github else source
+
+    def get_proxies(self, source, proxies=None):
+        """
+        镜像在局域网里，不使用启动器设置的代理
+        """
+        return proxies if source == self.github else {}
+
+    def get_healthy_sources(self):
+        """
+        Return:
+            健康的源列表，顺序不变，github总是认为是健康的
+        """
+        return [source for source in self.get_sources() if self.is_healthy(source)]
+
+    def is_healthy(self, source):
+        if source == self.github:
+            return True
+
+        with self._lock:
+            checked_at, healthy = self._health.get(source, (0, False))
+        if time.monotonic() - checked_at < self.health_ttl:
+            return healthy
+
+        from maya_umbrella_launcher.http_client import http_client
+        try:
+            response = http_client.get(f'{source}/health', proxies={}, timeout=self.health_timeout)
+            healthy = response.status_code == 200
+        except Exception as e:
+            logger.debug(f'Mirror {source} is unavailable: {e}')
+            healthy = False
+        self.set_health(source, healthy)
+        return healthy
+
+    def set_health(self, source, healthy):
+        with self._lock:
+            self._health[source] = (time.monotonic(), healthy)
+
+    def mark_failed(self, url):
+        """
+        请求失败时调用，url所属的镜像在health_ttl内不再使用
+        """
+        for source in self.get_sources():
+            if source != self.github and url.startswith(source + '/'):
+                self.set_health(source, False)
+
+
+class MirrorServer(object):
+    """
+    局域网release镜像
+    兼容GitHub API的/repos/<owner>/<repo>/releases/latest和releases列表，release信息从上游获取后缓存，
+    返回给客户端的资源地址改写成镜像地址，原地址保存在upstream_url里，供客户端失败时回退。
+    资源文件第一次被请求时从上游下载到镜像目录，之后直接从磁盘提供，支持Range请求。
+    只提供owner/repo（默认为maya_umbrella）的release，路径里的`.`和`..`会被拒绝，资源文件只能在镜像目录里。
+    默认只监听本机，局域网使用时需要明确指定host为0.0.0.0或本机的局域网地址。
+    改写的资源地址使用public_url或者监听的地址，不使用请求头里的Host，客户端不能让镜像返回指向其他主机的地址。
+    """
+
+    release_pattern = re.compile(r'^/repos/([\w.-]+)/([\w.-]+)/releases/latest$')
+    releases_pattern = re.compile(r'^/repos/([\w.-]+)/([\w.-]+)/releases$')
+    asset_pattern = re.compile(r'^/assets/([\w.-]+)/([\w.-]+)/([\w.-]+)/([\w.-]+)$')
+
+    def __init__(self, folder, host=const.MIRROR_HOST, port=const.MIRROR_PORT, upstream=const.GITHUB_API,
+                 ttl=const.RELEASE_CACHE_TTL, proxies=None, owner=const.USER_NAME, repo=const.REPO_NAME,
+                 public_url=None):
+        from maya_umbrella_launcher.release_cache import ReleaseCache
+
+        self.folder = os.path.abspath(folder)
+        self.owner = owner
+        self.repo = repo
+        self.upstream = upstream.rstrip('/')
+        self.ttl = ttl
+        self.proxies = proxies
+        self.public_url = (public_url or '').rstrip('/')
+        self.release_cache = ReleaseCache(cache_folder=os.path.join(self.folder, 'cache'))
+        self.server = ThreadingHTTPServer((host, port), self._make_handler())
+        self.server.daemon_threads = True
+
+        self._asset_locks = {}
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{"127.0.0.1" if host == "0.0.0.0" else host}:{port}'
+
+    @property
+    def base_url(self):
+        """
+        客户端访问镜像的地址，用于改写资源地址
+        没有指定public_url时使用监听的地址，监听所有网卡时使用本机的主机名
+        """
+        if self.public_url:
+            return self.public_url
+        host, port = self.server.server_address[:2]
+        if host in ('0.0.0.0', '::', ''):
+            host = socket.gethostname()
+        return f'http://{host}:{port}'
+
+    def serve_forever(self):
+        logger.info(f'Serving release mirror {self.folder} at {self.url}')
+        self.server.serve_forever()
+
+    def start(self):
+        """
+        在后台线程运行，主要用于测试
+        """
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def is_allowed(self, owner, repo):
+        """
+        是否为镜像提供的仓库，其他仓库的请求返回404，避免镜像被用来代理和缓存任意的文件
+        """
+        return owner == self.owner and repo == self.repo
+
+    def prefetch(self, owner=None, repo=None):
+        """
+        预先获取最新release和资源文件，第一个客户端不用等待上游
+        """
+        owner, repo = owner or self.owner, repo or self.repo
+        try:
+            release = self.get_release(owner, repo)
+            if not release:
+                return False
+            for asset in release.get('assets', []):
+                self.get_asset_path(owner, repo, release['tag_name'], asset['name'])
+            return True
+        except Exception as e:
+            logger.error(f'Mirror failed to prefetch {owner}/{repo}: {e}')
+            return False
+
+    def start_refresh(self, interval=const.MIRROR_REFRESH_INTERVAL, owner=None, repo=None):
+        """
+        在后台定期预取，新版本发布后镜像自动下载
+        """
+        def refresh():
+            while True:
+                self.prefetch(owner, repo)
+                time.sleep(interval)
+
+        threading.Thread(target=refresh, name='mirror-refresh', daemon=True).start()
+
+    def get_release(self, owner, repo):
+        """
+        获取上游的最新release信息，使用镜像自己的缓存
+        """
+        return self.release_cache.get(f'{self.upstream}/repos/{owner}/{repo}/releases/latest',
+                                      ttl=self.ttl, proxies=self.proxies)
+
+    def get_releases(self, owner, repo):
+        """
+        获取上游最近的release列表，beta通道使用
+        """
+        url = f'{self.upstream}/repos/{owner}/{repo}/releases?per_page={const.RELEASE_LIST_SIZE}'
+        return self.release_cache.get(url, ttl=self.ttl, proxies=self.proxies)
+
+    def find_release(self, owner, repo, tag):
+        """
+        在最新release和release列表里查找tag对应的release
+        """
+        release = self.get_release(owner, repo)
+        if release and release['tag_name'] == tag:
+            return release
+        return next((item for item in self.get_releases(owner, repo) or [] if item['tag_name'] == tag), None)
+
+    def rewrite_release(self, release, owner, repo, base_url):
+        """
+        把资源地址改写成镜像地址
+        """
+        release = json.loads(json.dumps(release))
+        for asset in release.get('assets', []):
+            asset['upstream_url'] = asset['browser_download_url']
+            asset['browser_download_url'] = \
+                f'{base_url}/assets/{owner}/{repo}/{release["tag_name"]}/{asset["name"]}'
+        return release
+
+    def get_asset_path(self, owner, repo, tag, name):
+        """
+        获取资源文件在镜像目录里的路径，不存在时从上游下载
+        Return:
+            文件路径，不是镜像的仓库、路径不合法或者release里没有这个资源时返回None
+        """
+        from maya_umbrella_launcher.downloader import RangedDownloader
+
+        if not self.is_allowed(owner, repo):
+            return None
+        path = self.safe_path(owner, repo, tag, name)
+        if not path:
+            logger.warning(f'Mirror rejected asset path: {owner}/{repo}/{tag}/{name}')
+            return None
+        if os.path.isfile(path):
+            return path
+
+        with self._lock:
+            lock = self._asset_locks.setdefault(path, threading.Lock())
+        # 多个客户端同时请求同一个文件时只下载一次
+        with lock:
+            if os.path.isfile(path):
+                return path
+
+            release = self.find_release(owner, repo, tag)
+            if not release:
+                return None
+            asset = next((item for item in release.get('assets', []) if item['name'] == name), None)
+            if not asset:
+                return None
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            logger.info(f'Mirror downloading {asset["browser_download_url"]}')
+            RangedDownloader(file_url=asset['browser_download_url'],
+                             file_save_path=path,
+                             proxies=self.proxies).download()
+        return path
+
+    def safe_path(self, *parts):
+        """
+        拼接镜像目录里的路径，包含`.`、`..`、空的部分或者解析符号链接后不在镜像目录里时返回None
+        """
+        if any(part in ('', '.', '..') or '/' in part or '\\' in part for part in parts):
+            return None
+        path = os.path.join(self.folder, *parts)
+        root = os.path.realpath(self.folder)
+        if os.path.commonpath([root, os.path.realpath(path)]) != root:
+            return None
+        return path
+
+    def _make_handler(self):
+        return type('Handler', (MirrorRequestHandler,), {'mirror': self})
+
+
+class MirrorRequestHandler(BaseHTTPRequestHandler):
+    """
+    镜像的请求处理
+    """
+
+    mirror = None
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        logger.debug(f'{self.address_string()} {format % args}')
+
+    def do_GET(self):
+        try:
+            if self.path == '/health':
+                return self.send_json({'status': 'ok'})
+
+            path = self.path.split('?')[0]
+            match = MirrorServer.release_pattern.match(path)
+            if match:
+                return self.send_release(*match.groups())
+
+            match = MirrorServer.releases_pattern.match(path)
+            if match:
+                return self.send_releases(*match.groups())
+
+            match = MirrorServer.asset_pattern.match(path)
+            if match:
+                return self.send_asset(*match.groups())
+
+            self.send_error(404)
+        except Exception as e:
+            logger.error(f'Mirror failed to handle {self.path}: {e}')
+            self.send_error(502, str(e))
+
+    def send_json(self, data, status=200):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_release(self, owner, repo):
+        if not self.mirror.is_allowed(owner, repo):
+            return self.send_error(404)
+        release = self.mirror.get_release(owner, repo)
+        if not release:
+            return self.send_error(502, 'Upstream unavailable')
+
+        self.send_json(self.mirror.rewrite_release(release, owner, repo, self.mirror.base_url))
+
+    def send_releases(self, owner, repo):
+        if not self.mirror.is_allowed(owner, repo):
+            return self.send_error(404)
+        releases = self.mirror.get_releases(owner, repo)
+        if releases is False or releases is None:
+            return self.send_error(502, 'Upstream unavailable')
+
+        self.send_json([self.mirror.rewrite_release(release, owner, repo, self.mirror.base_url)
+                        for release in releases])
+
+    def send_asset(self, owner, repo, tag, name):
+        path = self.mirror.get_asset_path(owner, repo, tag, name)
+        if not path:
+            return self.send_error(404)
+
+        stat = os.stat(path)
+        size = stat.st_size
+        start, end = 0, size - 1
+        match = re.match(r'bytes=(\d+)-(\d*)$', self.headers.get('Range', ''))
+        if match and int(match.group(1)) < size:
+            start = int(match.group(1))
+            end = min(int(match.group(2) or size - 1), size - 1)
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        else:
+            self.send_response(200)
+
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(end - start + 1))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('ETag', f'"{stat.st_mtime_ns:x}-{size:x}"')
+        self.end_headers()
+
+        with open(path, 'rb') as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(remaining, const.DOWNLOAD_MAX_CHUNK_SIZE))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+
+
+release_sources = ReleaseSources()
@@ -0,0 +1,176 @@
+import os
+import stat
+import shutil
+import hashlib
+import threading
+
+import maya_umbrella_launcher.constant as const
+from maya_umbrella_launcher.log import logger
+from maya_umbrella_launcher.filesystem import create_folder_if_not_exist, make_read_only
+from maya_umbrella_launcher.archive import safe_extract_path, extract_zip
+from maya_umbrella_launcher.profiling import traced
+
+
+class ContentStore(object):
+    """
+    插件文件的内容寻址存储
+    所有版本的文件按sha256保存在`plugin_folder/.store`下，版本目录里的文件是指向它的硬链接，
+    不支持硬链接时退回到复制。多个版本之间相同的文件只占一份空间，安装新版本时只写入变化的文件。
+    硬链接的文件共用同一份数据，仓库文件设为只读，避免在一个版本目录里修改文件时，
+    其他版本和仓库文件被一起修改（需要修改时先复制一份再替换）。
+    """
+
+    folder_name = '.store'
+    copy_mode_marker = '.copy_mode'
+    chunk_size = 1024 * 1024
+
+    def __init__(self, plugin_folder):
+        self.root = os.path.join(plugin_folder, self.folder_name)
+        self.stats = {'written': 0, 'reused': 0}
+        self._can_link = True
+        self._lock = threading.Lock()
+
+    def blob_path(self, digest):
+        return os.path.join(self.root, digest[:2], digest)
+
+    def has(self, digest):
+        return os.path.isfile(self.blob_path(digest))
+
+    @traced('content_store.extract')
+    def extract_zip(self, zip_path, extract_to, workers=const.EXTRACT_WORKERS):
+        """
+        把zip解压到extract_to，已经在仓库里的文件直接链接，不重复写入
+        和archive.extract_zip一样并行解压、校验CRC，先解压到临时目录再替换
+        Return:
+            解压目录
+        """
+        extract_zip(zip_path, extract_to, workers=workers, extract=self.extract_member)
+        logger.debug(f'Content store: {self.stats}')
+        return extract_to
+
+    def extract_member(self, zip_ref, info, extract_to):
+        """
+        解压一个成员到仓库，再链接到extract_to
+        """
+        digest = self._hash_stream(zip_ref.open(info))
+        if not self.has(digest):
+            self._write_blob(digest, zip_ref.open(info))
+        else:
+            self._count('reused')
+        self.materialize(digest, safe_extract_path(extract_to, info.filename))
+
+    @traced('content_store.ingest')
+    def ingest_folder(self, folder):
+        """
+        把已有的版本目录收进仓库，相同内容的文件替换成链接
+        """
+        for root, _, files in os.walk(folder):
+            for name in files:
+                self.ingest_file(os.path.join(root, name))
+
+        logger.debug(f'Content store: {self.stats}')
+        return folder
+
+    def ingest_file(self, file_path):
+        """
+        把一个文件收进仓库，替换成指向仓库文件的链接
+        """
+        with open(file_path, 'rb') as f:
+            digest = self._hash_stream(f)
+        if self.has(digest):
+            if not os.path.samefile(file_path, self.blob_path(digest)):
+                self.materialize(digest, file_path)
+            self._count('reused')
+        else:
+            with open(file_path, 'rb') as f:
+                self._write_blob(digest, f)
+            self.materialize(digest, file_path)
+
+    def materialize(self, digest, target_path):
+        """
+        在target_path创建指向仓库文件的硬链接，不支持时复制
+        """
+        create_folder_if_not_exist(os.path.dirname(target_path))
+        tmp_path = target_path + '.tmp'
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+
+        blob_path = self.blob_path(digest)
+        if self._can_link:
+            try:
+                # 之前版本写入的仓库文件还没有设为只读
+                make_read_only(blob_path)
+                os.link(blob_path, tmp_path)
+            except OSError as e:
+                logger.debug(f'Hardlink not supported, fallback to copy: {e}')
+                self._can_link = False
+                self._mark_copy_mode()
+        if not self._can_link:
+            shutil.copyfile(blob_path, tmp_path)
+
+        os.replace(tmp_path, target_path)
+
+    def is_copy_mode(self):
+        """
+        是否曾经因为不支持硬链接而复制过文件
+        """
+        return os.path.isfile(os.path.join(self.root, self.copy_mode_marker))
+
+    def prune(self):
+        """
+        删除已经没有任何版本引用的仓库文件
+        按硬链接数判断，复制的文件不会增加链接数，所以复制模式下不做清理
+        Return:
+            删除的文件数
+        """
+        if not os.path.isdir(self.root):
+            return 0
+        if self.is_copy_mode():
+            logger.warning(f'Content store {self.root} contains copied files, skip pruning')
+            return 0
+
+        removed = 0
+        for root, _, files in os.walk(self.root):
+            if root == self.root:
+                continue
+            for name in files:
+                blob_path = os.path.join(root, name)
+                if os.stat(blob_path).st_nlink <= 1:
+                    os.chmod(blob_path, stat.S_IWRITE | stat.S_IREAD)
+                    os.remove(blob_path)
+                    removed += 1
+        return removed
+
+    def _hash_stream(self, stream):
+        sha = hashlib.sha256()
+        with stream:
+            for chunk in iter(lambda: stream.read(self.chunk_size), b''):
+                sha.update(chunk)
+        return sha.hexdigest()
+
+    def _write_blob(self, digest, stream):
+        blob_path = self.blob_path(digest)
+        create_folder_if_not_exist(os.path.dirname(blob_path))
+        tmp_path = f'{blob_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with stream, open(tmp_path, 'wb') as f:
+            shutil.copyfileobj(stream, f, self.chunk_size)
+        try:
+            os.replace(tmp_path, blob_path)
+        except OSError:
+            # 其他线程或进程同时写入了相同的内容（windows上不能替换只读文件）
+            if not os.path.isfile(blob_path):
+                raise
+            os.remove(tmp_path)
+        make_read_only(blob_path)
+        self._count('written')
+
+    def _mark_copy_mode(self):
+        try:
+            create_folder_if_not_exist(self.root)
+            open(os.path.join(self.root, self.copy_mode_marker), 'a').close()
+        except OSError as e:
+            logger.debug(f'Failed to mark content store copy mode: {e}')
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
@@ -0,0 +1,238 @@
+import os
+import sys
+import time
+import atexit
+import threading
+import functools
+
+import maya_umbrella_launcher.constant as const
+
+
+class Tracer(object):
+    """
+    耗时区间记录
+    保存为Chrome trace-event格式的json，可以用chrome://tracing或https://ui.perfetto.dev打开，
+    每个线程一行，能看到读设置、查找maya、解析版本、下载、解压、启动maya各阶段的耗时。
+    没有开启时span()直接返回一个共享的空对象，只多一次属性判断。
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.output = None
+        self._origin = time.perf_counter_ns()
+        self._pid = os.getpid()
+        self._events = []
+        self._threads = {}
+
+    def enable(self, output):
+        self.output = output
+        self.enabled = True
+
+    def clear(self):
+        self._events = []
+        self._threads = {}
+
+    def add(self, name, start, end, args=None):
+        """
+        记录一个区间，start和end为time.perf_counter_ns()
+        """
+        thread = threading.current_thread()
+        self._threads[thread.ident] = thread.name
+        event = {'name': name, 'ph': 'X', 'pid': self._pid, 'tid': thread.ident,
+                 'ts': (start - self._origin) / 1000, 'dur': (end - start) / 1000}
+        if args:
+            event['args'] = args
+        self._events.append(event)
+
+    def instant(self, name, **args):
+        """
+        记录一个时间点，比如窗口第一次显示
+        """
+        if not self.enabled:
+            return
+        thread = threading.current_thread()
+        self._threads[thread.ident] = thread.name
+        event = {'name': name, 'ph': 'i', 's': 't', 'pid': self._pid, 'tid': thread.ident,
+                 'ts': (time.perf_counter_ns() - self._origin) / 1000}
+        if args:
+            event['args'] = args
+        self._events.append(event)
+
+    def save(self, output=None):
+        """
+        Return:
+            保存的文件路径
+        """
+        import json
+
+        output = output or self.output
+        events = [{'name': 'thread_name', 'ph': 'M', 'pid': self._pid, 'tid': ident, 'args': {'name': name}}
+                  for ident, name in list(self._threads.items())]
+        events.extend(self._events)
+
+        folder = os.path.dirname(output)
+        if folder and not os.path.isdir(folder):
+            os.makedirs(folder, exist_ok=True)
+        tmp_path = f'{output}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, default=str)
+        os.replace(tmp_path, output)
+        return output
+
+
+class Span(object):
+    """
+    with span(...)使用的区间
+    """
+
+    __slots__ = ('name', 'args', 'start')
+
+    def __init__(self, name, args=None):
+        self.name = name
+        self.args = args
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        tracer.add(self.name, self.start, time.perf_counter_ns(), self.args)
+        return False
+
+
+class NullSpan(object):
+    """
+    没有开启记录时使用的空区间
+    """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+def span(name, **args):
+    """
+    记录一段代码的耗时
+        with span('download', url=url):
+            ...
+    """
+    if not tracer.enabled:
+        return NULL_SPAN
+    return Span(name, args)
+
+
+def traced(name=None):
+    """
+    记录函数耗时的装饰器，name默认为函数的__qualname__
+    """
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            with Span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def get_output_path(mode):
+    """
+    获取输出文件路径，默认保存在~/.maya_umbrella_launcher/profiles下
+    """
+    if const.PROFILE_OUTPUT:
+        return const.PROFILE_OUTPUT
+    extension = '.json' if mode == const.PROFILE_TRACE else '.prof'
+    return os.path.join(const.PROFILE_FOLDER, f'{mode}-{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}{extension}')
+
+
+def normalize_mode(mode):
+    """
+    1, true, trace为trace，cprofile为cprofile，其他值为不开启
+    """
+    mode = (mode or '').strip().lower()
+    if mode in ('1', 'true', 'on', const.PROFILE_TRACE):
+        return const.PROFILE_TRACE
+    if mode == const.PROFILE_CPROFILE:
+        return const.PROFILE_CPROFILE
+    return None
+
+
+_profiler = None
+_profiler_output = None
+_registered = False
+
+
+def start(mode, output=None):
+    """
+    开启性能分析，进程退出时保存结果
+    Args:
+        mode(str): trace记录各阶段的耗时区间，cprofile用cProfile记录调用它的线程的所有函数
+        output(str): 输出文件路径
+    Return:
+        是否开启
+    """
+    global _profiler, _profiler_output, _registered
+
+    mode = normalize_mode(mode)
+    if not mode:
+        return False
+
+    if mode == const.PROFILE_TRACE and not tracer.enabled:
+        tracer.enable(output or get_output_path(mode))
+    elif mode == const.PROFILE_CPROFILE and _profiler is None:
+        import cProfile
+
+        _profiler_output = output or get_output_path(mode)
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+
+    if not _registered:
+        _registered = True
+        atexit.register(stop)
+    return True
+
+
+def stop():
+    """
+    停止性能分析并保存结果，cprofile模式同时在stderr输出累计耗时最多的函数
+    """
+    global _profiler
+
+    if tracer.enabled:
+        tracer.enabled = False
+        try:
+            print(f'Trace saved to: {tracer.save()}', file=sys.stderr)
+        except OSError as e:
+            print(f'Failed to save trace: {e}', file=sys.stderr)
+
+    if _profiler is not None:
+        import pstats
+
+        profiler, _profiler = _profiler, None
+        profiler.disable()
+        try:
+            folder = os.path.dirname(_profiler_output)
+            if folder and not os.path.isdir(folder):
+                os.makedirs(folder, exist_ok=True)
+            profiler.dump_stats(_profiler_output)
+            print(f'Profile saved to: {_profiler_output}', file=sys.stderr)
+        except OSError as e:
+            print(f'Failed to save profile: {e}', file=sys.stderr)
+        pstats.Stats(profiler, stream=sys.stderr).sort_stats('cumulative').print_stats(const.PROFILE_TOP)
+
+
+tracer = Tracer()
+
+# 用环境变量开启时从导入开始记录
+start(const.PROFILE)
@@ -0,0 +1,204 @@
+import sys
+import time
+import threading
+from collections import deque
+
+import maya_umbrella_launcher.constant as const
+
+
+class ProgressMeter(object):
+    """
+    下载进度统计，多个下载线程可以同时更新
+    速度按最近window秒的数据计算，回调最多每interval秒调用一次，回调参数是snapshot()的字典。
+    """
+
+    def __init__(self, callback=None, interval=const.PROGRESS_INTERVAL, window=const.PROGRESS_WINDOW):
+        self.callback = callback
+        self.interval = interval
+        self.window = window
+
+        self._lock = threading.Lock()
+        self._total = None
+        self._done = 0
+        self._chunk_size = 0
+        self._start_time = time.monotonic()
+        self._last_report = 0.0
+        self._samples = deque()
+
+    def start(self, total=None, done=0):
+        """
+        开始统计，done为断点续传时已经下载的字节数，不计入速度
+        """
+        with self._lock:
+            self._total = total
+            self._done = done
+            self._start_time = time.monotonic()
+            self._samples.clear()
+            self._samples.append((self._start_time, done))
+        self._report(force=True)
+
+    def update(self, size, chunk_size=None):
+        """
+        增加已下载的字节数
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._done += size
+            if chunk_size:
+                self._chunk_size = chunk_size
+            self._samples.append((now, self._done))
+            while len(self._samples) > 2 and now - self._samples[0][0] > self.window:
+                self._samples.popleft()
+        self._report()
+
+    def finish(self):
+        self._report(force=True)
+
+    def snapshot(self):
+        """
+        Return:
+            字典，包含done, total, speed(字节/秒), eta(秒), chunk_size, elapsed
+        """
+        now = time.monotonic()
+        with self._lock:
+            done, total = self._done, self._total
+            first_time, first_done = self._samples[0] if self._samples else (now, done)
+            chunk_size = self._chunk_size
+            elapsed = now - self._start_time
+
+        duration = now - first_time
+        speed = (done - first_done) / duration if duration > 0 else 0.0
+        eta = (total - done) / speed if total and speed > 0 else None
+        return {'done': done, 'total': total, 'speed': speed, 'eta': eta,
+                'chunk_size': chunk_size, 'elapsed': elapsed}
+
+    def _report(self, force=False):
+        if not self.callback:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_report < self.interval:
+                return
+            self._last_report = now
+        self.callback(self.snapshot())
+
+
+class AdaptiveChunkSize(object):
+    """
+    按测得的带宽调整每次读取的大小
+    目标是每次读取大约target_time秒的数据：快的网络用大块，减少系统调用和python循环的次数；
+    慢的网络用小块，进度和取消能及时响应。大小取2的幂，限制在minimum和maximum之间。
+    一次下载的所有连接共用一个对象，后开始的分段直接使用已经测得的大小。
+    """
+
+    def __init__(self, initial=const.DOWNLOAD_CHUNK_SIZE, minimum=const.DOWNLOAD_MIN_CHUNK_SIZE,
+                 maximum=const.DOWNLOAD_MAX_CHUNK_SIZE, target_time=const.DOWNLOAD_CHUNK_TARGET_TIME,
+                 adaptive=True):
+        self.size = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_time = target_time
+        self.adaptive = adaptive
+        self._lock = threading.Lock()
+
+    def record(self, size, seconds):
+        """
+        记录一次读取，调整下一次读取的大小
+        """
+        if not self.adaptive or size < self.size:
+            # 最后一块不完整，不能代表带宽
+            return
+        if seconds <= 0:
+            ideal = self.maximum
+        else:
+            ideal = size / seconds * self.target_time
+
+        # 每次最多翻倍或减半，避免单次抖动造成大幅变化
+        with self._lock:
+            if ideal > self.size * 2:
+                self.size = min(self.size * 2, self.maximum)
+            elif ideal < self.size / 2:
+                self.size = max(self.size // 2, self.minimum)
+
+
+class AdaptiveWriteBuffer(object):
+    """
+    跟随读取大小的写入缓冲
+    缓冲满chunk_size.size * multiple字节时写入一次：快的网络读取大块时写入也更大，减少写入的系统调用；
+    慢的网络缓冲小，内存占用少。退出with时写入剩下的数据（包括出错、取消时已经收到的部分）。
+    Args:
+        file_obj: 以buffering=0打开的文件
+        chunk_size(AdaptiveChunkSize): 读取大小
+        multiple(int): 缓冲是读取大小的几倍
+    """
+
+    def __init__(self, file_obj, chunk_size, multiple=const.DOWNLOAD_WRITE_BUFFER_CHUNKS):
+        self.file_obj = file_obj
+        self.chunk_size = chunk_size
+        self.multiple = multiple
+        self._buffer = bytearray()
+
+    def write(self, data):
+        self._buffer += data
+        if len(self._buffer) >= self.chunk_size.size * self.multiple:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self.file_obj.write(self._buffer)
+            self._buffer = bytearray()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.flush()
+
+
+def iter_chunks(response, chunk_size):
+    """
+    按chunk_size.size读取requests的流式响应，并把每次读取的耗时反馈给chunk_size
+    Args:
+        response(requests.Response): stream=True的响应
+        chunk_size(AdaptiveChunkSize): 读取大小
+    """
+    while True:
+        start = time.perf_counter()
+        chunk = response.raw.read(chunk_size.size, decode_content=True)
+        if not chunk:
+            break
+        chunk_size.record(len(chunk), time.perf_counter() - start)
+        yield chunk
+
+
+def format_size(size):
+    if size < 1024:
+        return f'{size:.0f} B'
+    for unit in ('KB', 'MB', 'GB'):
+        size /= 1024
+        if size < 1024 or unit == 'GB':
+            return f'{size:.1f} {unit}'
+
+
+def format_progress(snapshot):
+    """
+    生成一行进度文字，比如 12.0 MB / 40.0 MB  30%  5.2 MB/s  ETA 0:05  chunk 256.0 KB
+    """
+    parts = [format_size(snapshot['done'])]
+    if snapshot['total']:
+        parts[0] += f' / {format_size(snapshot["total"])}  {snapshot["done"] * 100 // snapshot["total"]:>3}%'
+    parts.append(f'{format_size(snapshot["speed"])}/s')
+    if snapshot['eta'] is not None:
+        minutes, seconds = divmod(int(snapshot['eta']), 60)
+        parts.append(f'ETA {minutes}:{seconds:02d}')
+    if snapshot['chunk_size']:
+        parts.append(f'chunk {format_size(snapshot["chunk_size"])}')
+    return '  '.join(parts)
+
+
+def print_progress(snapshot):
+    """
+    在命令行的同一行刷新进度
+    """
+    sys.stderr.write(f'\r{format_progress(snapshot):<80}')
+    sys.stderr.flush()
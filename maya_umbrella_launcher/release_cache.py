@@ -0,0 +1,171 @@
+import os
+import json
+import time
+import atexit
+import threading
+
+import maya_umbrella_launcher.constant as const
+from maya_umbrella_launcher.log import logger
+from maya_umbrella_launcher.filesystem import FileLock
+
+
+class ReleaseCache(object):
+    """
+    release信息缓存
+    把GitHub API返回的json连同ETag/Last-Modified保存到磁盘:
+        - 在TTL内直接使用缓存，不发请求
+        - 过期后带上If-None-Match/If-Modified-Since重新验证，304不计入GitHub的请求限制
+        - 请求失败（离线、被限流、返回的不是json）时返回过期的缓存
+        - 只有条目变化时才在文件锁内读取、修改、写回，多个启动器进程同时刷新不会互相覆盖
+        - 命中统计在进程退出时合并到缓存文件，只命中缓存的进程也会计入累计统计
+    """
+
+    cache_file_name = 'release_cache.json'
+    stat_keys = ('hit', 'miss', 'revalidated', 'stale', 'error')
+
+    def __init__(self, cache_folder=const.CACHE_FOLDER):
+        self.cache_file = os.path.join(cache_folder, self.cache_file_name)
+        self.stats = dict.fromkeys(self.stat_keys, 0)
+        self._unsaved_stats = dict.fromkeys(self.stat_keys, 0)
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def get(self, url, ttl=const.RELEASE_CACHE_TTL, proxies=None):
+        """
+        获取url对应的json数据
+        Args:
+            url(str): api地址
+            ttl(int): 缓存有效期，单位为秒
+            proxies(dict): 代理设置
+        Return:
+            json数据，获取失败且没有缓存时返回False
+        """
+        import requests
+        from maya_umbrella_launcher.http_client import http_client
+
+        with self._lock:
+            entry = self._load()['entries'].get(url)
+
+            # 命中时只读取，不写回磁盘
+            if entry and time.time() - entry['fetched_at'] < ttl:
+                self._count('hit')
+                return entry['data']
+
+            headers = {}
+            if entry and entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry and entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+            try:
+                response = http_client.get(url, headers=headers, proxies=proxies)
+                data = response.json() if response.status_code == 200 else None
+            except requests.RequestException as e:
+                logger.debug(f'Release request failed: {e}')
+                response = data = None
+            except ValueError as e:
+                # 代理或镜像返回的不是json（登录页、错误页）
+                logger.debug(f'Invalid release response from {url}: {e}')
+                data = None
+
+            if response is not None and response.status_code == 304 and entry:
+                entry['fetched_at'] = time.time()
+                self._count('revalidated')
+            elif data:
+                entry = {'data': data,
+                         'etag': response.headers.get('ETag', ''),
+                         'last_modified': response.headers.get('Last-Modified', ''),
+                         'fetched_at': time.time()}
+                self._count('miss')
+            elif entry:
+                self._count('stale')
+                return entry['data']
+            else:
+                self._count('error')
+                return False
+
+            self._update(url, entry)
+            return entry['data']
+
+    def get_stats(self):
+        """
+        获取缓存命中统计
+        Return:
+            {'process': 本进程的统计, 'total': 所有进程累计的统计，包括本进程还没有写入磁盘的部分}
+        """
+        with self._lock:
+            total = self._load()['stats']
+            for key, count in self._unsaved_stats.items():
+                total[key] = total.get(key, 0) + count
+            return {'process': dict(self.stats), 'total': total}
+
+    def flush(self):
+        """
+        把本进程还没有写入磁盘的统计合并到缓存文件，不修改缓存条目
+        """
+        with self._lock:
+            if any(self._unsaved_stats.values()):
+                self._update()
+
+    def clear(self):
+        with self._lock:
+            if os.path.isfile(self.cache_file):
+                os.remove(self.cache_file)
+
+    def _count(self, key):
+        """
+        统计在缓存条目变化或者flush时写入
+        """
+        self.stats[key] += 1
+        self._unsaved_stats[key] += 1
+
+    def _update(self, url=None, entry=None):
+        """
+        在文件锁内读取最新的缓存，写入url的条目和未保存的统计
+        Args:
+            url(str): 为None时只写入统计
+        """
+        try:
+            with FileLock(f'{self.cache_file}.lock'):
+                cache = self._load()
+                if url is not None:
+                    cache['entries'][url] = entry
+                for key, count in self._unsaved_stats.items():
+                    cache['stats'][key] = cache['stats'].get(key, 0) + count
+                if self._save(cache):
+                    self._unsaved_stats = dict.fromkeys(self.stat_keys, 0)
+        except OSError as e:
+            logger.debug(f'Failed to lock release cache: {e}')
+
+    def _load(self):
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+        cache.setdefault('entries', {})
+        cache.setdefault('stats', dict.fromkeys(self.stat_keys, 0))
+        return cache
+
+    def _save(self, cache):
+        """
+        先写临时文件再替换，避免其他启动器进程读到写了一半的缓存
+        Return:
+            是否保存成功
+        """
+        folder = os.path.dirname(self.cache_file)
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+
+        tmp_path = f'{self.cache_file}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(cache, f)
+            os.replace(tmp_path, self.cache_file)
+            return True
+        except OSError as e:
+            logger.debug(f'Failed to save release cache: {e}')
+            return False
+
+
+release_cache = ReleaseCache()
@@ -0,0 +1,220 @@
+import os
+import json
+import time
+import atexit
+import threading
+
+import maya_umbrella_launcher.constant as const
+from maya_umbrella_launcher.log import logger
+from maya_umbrella_launcher.profiling import span
+
+FALSE_VALUES = ('', '0', 'false', 'no', 'off')
+
+
+class JsonSettingBackend(object):
+    """
+    json文件存储的设置，不依赖Qt
+    """
+
+    def __init__(self, file_path=const.SETTING_FILE):
+        self.file_path = file_path
+
+    def exists(self):
+        return os.path.isfile(self.file_path)
+
+    def get_stamp(self):
+        """
+        获取文件的修改标记，用于发现其他进程的修改
+        """
+        try:
+            stat = os.stat(self.file_path)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def load(self):
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                values = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return values if isinstance(values, dict) else {}
+
+    def save(self, changes):
+        """
+        重新读取文件，合并本进程的修改后写回，避免覆盖其他进程写入的其他键
+        """
+        values = self.load()
+        values.update(changes)
+
+        folder = os.path.dirname(self.file_path)
+        if not os.path.isdir(folder):
+            os.makedirs(folder, exist_ok=True)
+
+        tmp_path = f'{self.file_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(values, f, ensure_ascii=False, indent=4)
+        os.replace(tmp_path, self.file_path)
+        return values
+
+
+class QtSettingBackend(object):
+    """
+    QSettings适配器，数据和旧版本的启动器共用
+    """
+
+    def __init__(self, flag=const.SETTING_FLAG):
+        self.flag = flag
+
+    def exists(self):
+        return bool(self._settings().allKeys())
+
+    def get_stamp(self):
+        return None
+
+    def load(self):
+        setting = self._settings()
+        return {key: setting.value(key) for key in setting.allKeys()}
+
+    def save(self, changes):
+        setting = self._settings()
+        for key, value in changes.items():
+            setting.setValue(key, value)
+        setting.sync()
+        return self.load()
+
+    def _settings(self):
+        from PySide2 import QtCore
+        return QtCore.QSettings(self.flag)
+
+
+class SettingCache(object):
+    """
+    进程内的设置缓存
+        - 读取只访问内存，每隔check_interval秒最多stat一次文件，发现其他进程修改后重新加载
+        - 写入先记在内存里，空闲flush_delay秒后或进程退出时批量写回，写入失败时只在本进程内生效
+        - 传入backend_factory时，存储在第一次读写时才创建，只导入模块不会导入Qt，也不会写文件
+    """
+
+    def __init__(self, backend=None, flush_delay=const.SETTING_FLUSH_DELAY,
+                 check_interval=const.SETTING_CHECK_INTERVAL, backend_factory=None):
+        self._backend = backend
+        self.backend_factory = backend_factory
+        self.flush_delay = flush_delay
+        self.check_interval = check_interval
+
+        self._lock = threading.RLock()
+        self._values = None
+        self._pending = {}
+        self._stamp = None
+        self._checked_at = 0.0
+        self._timer = None
+        atexit.register(self.flush)
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    self._backend = self.backend_factory()
+        return self._backend
+
+    @backend.setter
+    def backend(self, backend):
+        self._backend = backend
+
+    def get(self, key, default=None):
+        with self._lock:
+            self._refresh()
+            return self._values.get(key, default)
+
+    def get_bool(self, key, default=False):
+        """
+        读取开关设置，字符串的空值、0、false、no、off（不区分大小写）为False，其他为True
+        """
+        value = self.get(key)
+        if value is None:
+            return bool(default)
+        if isinstance(value, str):
+            return value.strip().lower() not in FALSE_VALUES
+        return bool(value)
+
+    def set(self, key, value):
+        with self._lock:
+            self._refresh()
+            self._values[key] = value
+            self._pending[key] = value
+            self._schedule_flush()
+
+    def flush(self):
+        """
+        把未保存的修改写回存储
+        """
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return
+
+            with span('settings.save'):
+                try:
+                    self._values = self.backend.save(self._pending)
+                except OSError as e:
+                    # 修改保留在内存里，下次写入时重试
+                    logger.warning(f'Failed to save settings: {e}')
+                    return
+            self._pending = {}
+            self._stamp = self.backend.get_stamp()
+            self._checked_at = time.monotonic()
+
+    def reload(self):
+        with self._lock:
+            self._values = None
+            self._refresh()
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._values is not None and now - self._checked_at < self.check_interval:
+            return
+
+        self._checked_at = now
+        stamp = self.backend.get_stamp()
+        if self._values is not None and stamp == self._stamp:
+            return
+
+        with span('settings.load'):
+            values = self.backend.load()
+        values.update(self._pending)
+        self._values = values
+        self._stamp = stamp
+
+    def _schedule_flush(self):
+        if self._timer:
+            self._timer.cancel()
+        self._timer = threading.Timer(self.flush_delay, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+
+def create_backend(name=const.SETTING_BACKEND):
+    """
+    创建设置存储，第一次使用json存储时导入旧版本保存在QSettings里的设置
+    """
+    if name == 'qt':
+        return QtSettingBackend()
+
+    backend = JsonSettingBackend()
+    if not backend.exists():
+        try:
+            legacy_values = QtSettingBackend().load()
+        except ImportError:
+            legacy_values = {}
+        try:
+            backend.save(legacy_values)
+        except OSError as e:
+            logger.warning(f'Failed to create settings file {backend.file_path}: {e}')
+    return backend
+
+
+settings = SettingCache(backend_factory=create_backend)
@@ -0,0 +1,320 @@
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import threading
+import subprocess as sp
+
+import maya_umbrella_launcher.constant as const
+from maya_umbrella_launcher.log import logger
+
+
+class ProcessSupervisor(object):
+    """
+    启动的maya进程的监控
+    每个会话记录pid、启动/退出时间、退出码和内存占用的最大值，保存在sessions.json里，命令行和界面都可以查询。
+    进程的输出直接写到会话日志文件里，不经过管道，启动器退出或卡住都不会阻塞maya；
+    启动器运行期间，监控线程按大小轮转日志（复制后清空），并可以在崩溃时自动重启。
+    启动器退出后仍在运行的会话没有监控线程，每次启动新会话时轮转一遍所有会话的日志。
+    """
+
+    registry_file_name = 'sessions.json'
+
+    def __init__(self, session_folder=const.SESSION_FOLDER, poll_interval=const.SESSION_POLL_INTERVAL,
+                 max_log_size=const.SESSION_LOG_MAX_SIZE, log_backup_count=const.SESSION_LOG_BACKUP_COUNT,
+                 keep_sessions=const.SESSION_KEEP_COUNT):
+        self.session_folder = session_folder
+        self.registry_file = os.path.join(session_folder, self.registry_file_name)
+        self.poll_interval = poll_interval
+        self.max_log_size = max_log_size
+        self.log_backup_count = log_backup_count
+        self.keep_sessions = keep_sessions
+
+        self._lock = threading.Lock()
+        self._processes = {}
+        self._done_events = {}
+
+    def launch(self, command, envs=None, cwd=None, name='', restart_on_crash=False,
+               max_restarts=const.SESSION_MAX_RESTARTS, log_file=None):
+        """
+        启动并注册一个进程
+        Args:
+            command(list): 命令
+            envs(dict): 环境变量
+            cwd(str): 工作目录
+            name(str): 会话名，比如maya版本号
+            restart_on_crash(bool): 退出码不为0时是否自动重启
+            max_restarts(int): 最多重启次数
+            log_file(str): 输出日志文件，默认在会话目录下
+        Return:
+            会话字典
+        """
+        session_id = uuid.uuid4().hex[:12]
+        session = {
+            'id': session_id,
+            'name': str(name),
+            'command': [str(arg) for arg in command],
+            'cwd': cwd,
+            'log_file': log_file or os.path.join(self.session_folder, 'logs', f'{session_id}.log'),
+            'pid': None,
+            'status': 'starting',
+            'start_time': None,
+            'exit_time': None,
+            'exit_code': None,
+            'max_rss': 0,
+            'restarts': 0,
+        }
+        if os.path.dirname(session['log_file']):
+            os.makedirs(os.path.dirname(session['log_file']), exist_ok=True)
+        self.rotate_logs(extra=[session['log_file']])
+
+        process = self._start(session, envs)
+        self._done_events[session_id] = threading.Event()
+        self._save_session(session)
+
+        thread = threading.Thread(target=self._monitor,
+                                  args=(session, process, envs, restart_on_crash, max_restarts),
+                                  name=f'supervisor-{session_id}',
+                                  daemon=True)
+        thread.start()
+        return session
+
+    def wait(self, session, timeout=None):
+        """
+        等待会话结束
+        Return:
+            退出码，超时抛出subprocess.TimeoutExpired
+        """
+        event = self._done_events.get(session['id'])
+        if event and not event.wait(timeout):
+            raise sp.TimeoutExpired(session['command'], timeout)
+        return session['exit_code']
+
+    def terminate(self, session):
+        """
+        结束会话的进程，不会触发自动重启
+        """
+        with self._lock:
+            process = self._processes.get(session['id'])
+            session['status'] = 'terminating'
+        if process and process.poll() is None:
+            process.kill()
+
+    def get_sessions(self):
+        """
+        获取所有会话，包括其他启动器进程启动的会话
+        不在本进程监控下的会话，通过pid检查是否还在运行
+        """
+        sessions = self._load_registry()
+        for session in sessions:
+            if session['id'] in self._processes or session['exit_time'] or not session['pid']:
+                continue
+            if not is_pid_alive(session['pid']):
+                session['status'] = 'exited'
+            else:
+                session['max_rss'] = max(session['max_rss'], get_max_rss(session['pid']))
+        return sessions
+
+    def rotate_logs(self, extra=()):
+        """
+        轮转不在本进程监控下的会话的日志，包括启动器退出后还在运行的maya
+        Args:
+            extra(list): 另外需要轮转的日志文件
+        """
+        log_files = {session['log_file'] for session in self._load_registry()
+                     if session['id'] not in self._processes and session.get('log_file')}
+        for log_file in sorted(log_files.union(extra)):
+            if os.path.isfile(log_file):
+                self._rotate_log(log_file)
+
+    def _start(self, session, envs):
+        with open(session['log_file'], 'ab') as log:
+            process = sp.Popen(session['command'], env=envs, cwd=session['cwd'],
+                               stdout=log, stderr=sp.STDOUT, stdin=sp.DEVNULL)
+        with self._lock:
+            self._processes[session['id']] = process
+            session.update(pid=process.pid, status='running', start_time=time.time(),
+                           exit_time=None, exit_code=None)
+        logger.debug(f'Session {session["id"]} started: pid {process.pid}')
+        return process
+
+    def _monitor(self, session, process, envs, restart_on_crash, max_restarts):
+        while True:
+            while True:
+                session['max_rss'] = max(session['max_rss'], get_max_rss(process.pid))
+                self._rotate_log(session['log_file'])
+                try:
+                    process.wait(timeout=self.poll_interval)
+                    break
+                except sp.TimeoutExpired:
+                    pass
+
+            with self._lock:
+                terminating = session['status'] == 'terminating'
+                session.update(exit_code=process.returncode, exit_time=time.time(),
+                               status='exited' if process.returncode == 0 or terminating else 'crashed')
+            logger.debug(f'Session {session["id"]} exited with code {process.returncode}')
+
+            if not restart_on_crash or terminating or process.returncode == 0 \
+                    or session['restarts'] >= max_restarts:
+                break
+
+            session['restarts'] += 1
+            self._save_session(session)
+            try:
+                process = self._start(session, envs)
+            except OSError as e:
+                logger.error(f'Failed to restart session {session["id"]}: {e}')
+                break
+
+        self._save_session(session)
+        with self._lock:
+            self._processes.pop(session['id'], None)
+        self._done_events[session['id']].set()
+
+    def _rotate_log(self, log_file):
+        """
+        日志超过大小时复制一份再清空，maya以追加方式写入，清空后继续写到文件开头
+        """
+        try:
+            if os.path.getsize(log_file) < self.max_log_size:
+                return
+            for index in range(self.log_backup_count - 1, 0, -1):
+                source = f'{log_file}.{index}'
+                if os.path.isfile(source):
+                    os.replace(source, f'{log_file}.{index + 1}')
+            shutil.copyfile(log_file, f'{log_file}.1')
+            with open(log_file, 'r+b') as f:
+                f.truncate(0)
+        except OSError as e:
+            logger.debug(f'Failed to rotate log {log_file}: {e}')
+
+    def _load_registry(self):
+        try:
+            with open(self.registry_file, 'r', encoding='utf-8') as f:
+                sessions = json.load(f)
+        except (OSError, ValueError):
+            return []
+        for session in sessions:
+            # 旧版本记录的字段名
+            session.setdefault('max_rss', session.pop('peak_rss', 0))
+        return sessions
+
+    def _save_session(self, session):
+        """
+        在文件锁内读取、修改、写回sessions.json，图形界面、命令行和批量启动的进程同时保存时不会丢失会话
+        """
+        # filesystem在模块级导入了supervisor
+        from maya_umbrella_launcher.filesystem import FileLock
+
+        with self._lock:
+            try:
+                with FileLock(f'{self.registry_file}.lock'):
+                    sessions = [item for item in self._load_registry() if item['id'] != session['id']]
+                    sessions.append(dict(session))
+                    sessions = sessions[-self.keep_sessions:]
+
+                    tmp_path = f'{self.registry_file}.{os.getpid()}.tmp'
+                    with open(tmp_path, 'w', encoding='utf-8') as f:
+                        json.dump(sessions, f, indent=4)
+                    os.replace(tmp_path, self.registry_file)
+            except OSError as e:
+                logger.debug(f'Failed to save sessions: {e}')
+
+
+def format_sessions(sessions):
+    """
+    生成会话列表文字
+    """
+    lines = [f'{"id":<12} {"name":<12} {"pid":>7} {"status":<10} {"exit":>5} {"started":<19} '
+             f'{"seconds":>9} {"max MB":>9} {"restarts":>8}  log']
+    for session in sessions:
+        start_time = session['start_time'] or 0
+        end_time = session['exit_time'] or time.time()
+        exit_code = '' if session['exit_code'] is None else session['exit_code']
+        lines.append(f'{session["id"]:<12} {session["name"]:<12} {session["pid"] or "":>7} {session["status"]:<10} '
+                     f'{exit_code:>5} {time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(start_time)):<19} '
+                     f'{end_time - start_time:>9.1f} {session["max_rss"] / 1024 / 1024:>9.1f} '
+                     f'{session["restarts"]:>8}  {session["log_file"]}')
+    return '\n'.join(lines)
+
+
+def is_pid_alive(pid):
+    """
+    检查进程是否还在运行
+    """
+    if sys.platform == 'win32':
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        exit_code = ctypes.c_ulong()
+        kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+        kernel32.CloseHandle(handle)
+        return exit_code.value == 259  # STILL_ACTIVE
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def get_max_rss(pid):
+    """
+    获取进程的内存占用，单位为字节，获取失败时返回0
+    Windows（PeakWorkingSetSize）和Linux（VmHWM）返回系统记录的峰值；
+    其他系统（macOS需要psutil）只能返回当前的rss，调用方取多次采样的最大值，
+    比真实的峰值小，所以统称为sampled max rss
+    """
+    try:
+        if sys.platform == 'win32':
+            return _get_windows_peak_rss(pid)
+        if os.path.isfile(f'/proc/{pid}/status'):
+            with open(f'/proc/{pid}/status', 'r') as f:
+                for line in f:
+                    if line.startswith('VmHWM:'):
+                        return int(line.split()[1]) * 1024
+        import psutil
+        return psutil.Process(pid).memory_info().rss
+    except Exception:
+        pass
+    return 0
+
+
+def _get_windows_peak_rss(pid):
+    import ctypes
+    from ctypes import wintypes
+
+    class ProcessMemoryCounters(ctypes.Structure):
+        _fields_ = [('cb', wintypes.DWORD),
+                    ('PageFaultCount', wintypes.DWORD),
+                    ('PeakWorkingSetSize', ctypes.c_size_t),
+                    ('WorkingSetSize', ctypes.c_size_t),
+                    ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                    ('PagefileUsage', ctypes.c_size_t),
+                    ('PeakPagefileUsage', ctypes.c_size_t)]
+
+    kernel32 = ctypes.windll.kernel32
+    handle = kernel32.OpenProcess(0x1000 | 0x0010, False, pid)  # QUERY_LIMITED_INFORMATION | VM_READ
+    if not handle:
+        return 0
+    try:
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+            return 0
+        return counters.PeakWorkingSetSize
+    finally:
+        kernel32.CloseHandle(handle)
+
+
+process_supervisor = ProcessSupervisor()
@@ -0,0 +1,198 @@
+import time
+import threading
+import traceback
+
+from PySide2 import QtCore
+
+import maya_umbrella_launcher.constant as const
+from maya_umbrella_launcher.log import logger
+
+
+class TaskCancelled(Exception):
+    """
+    任务被取消
+    """
+
+
+class TaskSignals(QtCore.QObject):
+    """
+    任务信号，在界面线程创建，工作线程发出的信号会排队到界面线程执行
+    """
+
+    progress = QtCore.Signal(object)
+    finished = QtCore.Signal(object)
+    failed = QtCore.Signal(object)
+    cancelled = QtCore.Signal()
+
+
+class Task(QtCore.QRunnable):
+    """
+    在线程池里运行的任务
+    取消是协作式的：还没开始的任务直接跳过，运行中的任务可以通过cancel_event自己停止，
+    取消后不管函数返回什么都只发出cancelled信号。
+    Args:
+        func(callable): 要运行的函数
+        with_task(bool): 是否把任务本身作为第一个参数传给func，用于报告进度和检查取消
+        cache_key(str): 结果缓存的键，为None时不缓存
+        ttl(float): 结果缓存的有效期，单位为秒，为None时一直有效
+    """
+
+    def __init__(self, func, *args, with_task=False, cache_key=None, ttl=None, **kwargs):
+        super(Task, self).__init__()
+        self.setAutoDelete(False)
+
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.with_task = with_task
+        self.cache_key = cache_key
+        self.ttl = ttl
+
+        self.signals = TaskSignals()
+        self.cancel_event = threading.Event()
+        self.pool = None
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def is_cancelled(self):
+        return self.cancel_event.is_set()
+
+    def check_cancelled(self):
+        """
+        在长时间运行的函数里调用，任务被取消时抛出TaskCancelled
+        """
+        if self.is_cancelled():
+            raise TaskCancelled()
+
+    def report_progress(self, value):
+        """
+        发出进度信号，value可以是数字，也可以是ProgressMeter.snapshot()的字典
+        """
+        if not self.is_cancelled():
+            self.signals.progress.emit(value)
+
+    def run(self):
+        try:
+            self.check_cancelled()
+            args = (self,) + self.args if self.with_task else self.args
+            result = self.func(*args, **self.kwargs)
+            self.check_cancelled()
+        except TaskCancelled:
+            self.signals.cancelled.emit()
+        except Exception as e:
+            logger.debug(f'Task {getattr(self.func, "__name__", self.func)} failed:\n{traceback.format_exc()}')
+            if self.is_cancelled():
+                self.signals.cancelled.emit()
+            else:
+                self.signals.failed.emit(e)
+        else:
+            if self.pool:
+                self.pool.set_cached(self.cache_key, result)
+            self.signals.finished.emit(result)
+
+
+class TaskPool(object):
+    """
+    界面使用的任务线程池
+    所有网络和磁盘操作都通过它在后台运行，界面线程只处理信号，
+    有cache_key的任务在缓存有效期内直接返回上次的结果，不再启动线程。
+    """
+
+    def __init__(self, max_threads=const.TASK_MAX_THREADS):
+        self.pool = QtCore.QThreadPool()
+        self.pool.setMaxThreadCount(max_threads)
+
+        self._lock = threading.Lock()
+        self._tasks = set()
+        self._cache = {}
+
+    def start(self, task):
+        """
+        启动任务，调用前先连接好task.signals
+        缓存命中时在界面线程直接发出finished信号
+        Return:
+            task
+        """
+        cached = self.get_cached(task.cache_key, task.ttl)
+        if cached is not None:
+            task.signals.finished.emit(cached[0])
+            return task
+
+        # 信号排队到界面线程时任务对象还要存在，所以在界面线程处理完所有信号后再释放引用
+        task.pool = self
+        with self._lock:
+            self._tasks.add(task)
+        for signal in (task.signals.finished, task.signals.failed, task.signals.cancelled):
+            signal.connect(lambda *args: self.discard(task))
+        self.pool.start(task)
+        return task
+
+    def run(self, func, *args, on_finished=None, on_failed=None, on_progress=None, **kwargs):
+        """
+        创建并启动任务的简便写法，其余参数传给Task
+        Return:
+            Task
+        """
+        task = Task(func, *args, **kwargs)
+        for signal, slot in ((task.signals.finished, on_finished),
+                             (task.signals.failed, on_failed),
+                             (task.signals.progress, on_progress)):
+            if slot:
+                signal.connect(slot)
+        return self.start(task)
+
+    def get_cached(self, cache_key, ttl=None):
+        """
+        Return:
+            (结果,)，没有缓存或已过期时返回None
+        """
+        if cache_key is None:
+            return None
+        with self._lock:
+            entry = self._cache.get(cache_key)
+        if not entry or (ttl is not None and time.monotonic() - entry[0] > ttl):
+            return None
+        return (entry[1],)
+
+    def set_cached(self, cache_key, result):
+        if cache_key is None:
+            return
+        with self._lock:
+            self._cache[cache_key] = (time.monotonic(), result)
+
+    def invalidate(self, cache_key=None):
+        """
+        清除指定的缓存，cache_key为None时清除全部
+        """
+        with self._lock:
+            if cache_key is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(cache_key, None)
+
+    def discard(self, task):
+        with self._lock:
+            self._tasks.discard(task)
+
+    def running_tasks(self):
+        """
+        还没处理完信号的任务
+        """
+        with self._lock:
+            return list(self._tasks)
+
+    def cancel_all(self):
+        for task in self.running_tasks():
+            task.cancel()
+
+    def wait(self, timeout=-1):
+        """
+        等待所有任务结束
+        Args:
+            timeout(int): 毫秒，-1为一直等待
+        """
+        return self.pool.waitForDone(timeout)
+
+
+task_pool = TaskPool()
@@ -1,108 +1,159 @@
-from PySide2 import QtCore
-import maya_umbrella_launcher.constant as const
+import os
+import json
+
+from maya_umbrella_launcher.settings import settings
+
+
+LANGUAGES = ('cn', 'en')
+LOCALE_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'locale')
+
+# 编译后的消息目录: 每种语言是一个按消息id索引的列表
+_message_names = []
+_catalogs = {}
+_state = {'language': None, 'catalog': None}
+_listeners = []
 
 
 def get_language():
     """
-    获取语言
+    获取语言，只在第一次调用时读取设置
     """
-    setting = QtCore.QSettings(const.SETTING_FLAG)
-    return setting.value('language', 'cn')
+    if _state['language'] is None:
+        _activate(settings.get('language', 'cn'))
+    return _state['language']
 
 
 def set_language(language):
     """
-    设置语言
+    设置语言，语言变化时通知所有监听函数
+    """
+    settings.set('language', language)
+    if language == _state['language']:
+        return
+
+    _activate(language)
+    for callback in list(_listeners):
+        callback()
+
+
+def add_language_listener(callback):
+    """
+    注册语言切换时调用的函数，比如界面的translate_ui
     """
-    setting = QtCore.QSettings(const.SETTING_FLAG)
-    setting.setValue('language', language)
+    if callback not in _listeners:
+        _listeners.append(callback)
+
+
+def remove_language_listener(callback):
+    if callback in _listeners:
+        _listeners.remove(callback)
+
+
+def load_catalog(language):
+    """
+    读取locale目录下的语言文件，按消息id编译成列表
+    """
+    if language not in _catalogs:
+        with open(os.path.join(LOCALE_FOLDER, f'{language}.json'), 'r', encoding='utf-8') as f:
+            messages = json.load(f)
+        _catalogs[language] = [messages.get(name, name) for name in _message_names]
+    return _catalogs[language]
+
+
+def _activate(language):
+    if language not in LANGUAGES:
+        language = LANGUAGES[0]
+    _state['catalog'] = load_catalog(language)
+    _state['language'] = language
 
 
 class TranslatorText:
 
-    def __init__(self, cn, en):
-        self.__dict = {'cn': cn, 'en': en}
+    __slots__ = ('message_id',)
+
+    def __init__(self, name):
+        self.message_id = len(_message_names)
+        _message_names.append(name)
 
     def __str__(self):
-        return self.__dict[get_language()]
+        return self.text
 
     @property
     def text(self):
-        return self.__dict[get_language()]
+        catalog = _state['catalog']
+        if catalog is None:
+            get_language()
+            catalog = _state['catalog']
+        return catalog[self.message_id]
 
 
 # widgets translation
-installer_doc_cn = """
-如果不想每次都通过启动器启动软件，
-可以将maya_umbrella安装到系统环境（通过mod的方式）。
-安装后，直接从桌面打开Maya即可加载插件。
-(第一次使用，请先在设置面板指定插件安装目录)
-"""
-
-installer_doc_en = """
-If you do not want to launch the software through the launcher every time, 
-you can install maya_umbrella into the system environment (via mod). 
-After installation, you can directly open Maya from the desktop to load the plugin. 
-For the first use, please specify the plugin installation directory in the settings panel first.
-"""
-
-launcher_doc_cn = """
-选择从启动器启动Maya，不会破坏本地环境，
-启动后，会自动设置好maya_umbrella防病毒插件。
-
-(第一次使用，请先在设置面板指定插件安装目录)
-"""
-
-launcher_doc_en = """
-If you don't want to damage the local environment, 
-you can choose to launch Maya from the launcher. 
-
-It will create a temporary environment for you ,
-and automatically set up the maya_umbrella antivirus plugin.
-
-For the first use, 
-please specify the plugin installation directory in the settings panel.
-"""
-
-launch_bt = TranslatorText('   启动Maya', '   Launch Maya')
-launch_tab = TranslatorText('启动面板', 'launchpad')
-install_tab = TranslatorText('本地安装', 'Local installation')
-version_label = TranslatorText('版本', 'Version')
-mod_label = TranslatorText('Mod文件', 'Mod File')
-install_bt = TranslatorText('安装到Maya环境', 'Install to Maya')
-remove_bt = TranslatorText('从Maya环境卸载', 'Uninstall from Maya')
-launcher_desc = TranslatorText(launcher_doc_cn, launcher_doc_en)
-install_desc = TranslatorText(installer_doc_cn, installer_doc_en)
-
-download_bt = TranslatorText('下载', 'Download')
-check_update_bt = TranslatorText('检查更新', 'Check for updates')
-setting_title_label = TranslatorText('设置面板', 'Settings')
-plugin_folder_label = TranslatorText('插件目录', 'Plug-in Folder')
-plugin_version_label = TranslatorText('插件版本', 'Plug-in Version')
+launch_bt = TranslatorText('launch_bt')
+launch_tab = TranslatorText('launch_tab')
+install_tab = TranslatorText('install_tab')
+version_label = TranslatorText('version_label')
+mod_label = TranslatorText('mod_label')
+install_bt = TranslatorText('install_bt')
+remove_bt = TranslatorText('remove_bt')
+launcher_desc = TranslatorText('launcher_desc')
+install_desc = TranslatorText('install_desc')
+download_bt = TranslatorText('download_bt')
+check_update_bt = TranslatorText('check_update_bt')
+setting_title_label = TranslatorText('setting_title_label')
+plugin_folder_label = TranslatorText('plugin_folder_label')
+plugin_version_label = TranslatorText('plugin_version_label')
+sessions_title = TranslatorText('sessions_title')
+refresh_bt = TranslatorText('refresh_bt')
+open_log_bt = TranslatorText('open_log_bt')
 
 
 # text translation
-no_plugin_folder = TranslatorText('请先指定插件目录', 'Please specify the plugin folder first')
-path_not_exists = TranslatorText('路径不存在: {0}', 'Path does not exist: {0}')
-path_already_exists = TranslatorText('路径已存在: {0}', 'Path already exists: {0}')
-is_download_new_version = TranslatorText('发现新版本{0},\n是否下载新版本？',
-                                         'New version {0} found,\nDo you want to download the new version?')
-already_latest_version = TranslatorText('已经是最新版本', 'Already the latest version')
-downloading = TranslatorText('正在下载...', 'Downloading...')
-download_failed = TranslatorText('下载失败', 'Download failed')
-download_success = TranslatorText('下载成功', 'Download successful')
-unable_found_script = TranslatorText('找不到脚本路径，请设置插件路径，然后下载插件!',
-                                     'Cannot find the script path, please set the plugin path first!')
-unable_found_maya = TranslatorText('找不到Maya版本: {0}', 'Cannot find Maya version: {0}')
-install_success = TranslatorText('安装成功', 'Installation successful')
-uninstall_success = TranslatorText('卸载成功', 'Uninstall successful')
-install_failed = TranslatorText('安装失败', 'Installation failed')
-
-command_description = TranslatorText('这是一个命令行模式', 'This is a command line mode')
-run_download = TranslatorText('执行下载操作', 'Run download operation')
-specify_version = TranslatorText('指定一个版本, 比如2018, 2023', 'Specify a version, such as 2018, 2023')
-run_install = TranslatorText('执行安装操作', 'Run installation operation')
-run_uninstall = TranslatorText('执行卸载操作', 'Run uninstall operation')
-already_installed_status = TranslatorText('已安装', 'Already installed')
-not_installed_status = TranslatorText('未安装', 'Not installed')
-proxy_label = TranslatorText('开启代理', 'Enable proxy')
+no_plugin_folder = TranslatorText('no_plugin_folder')
+path_not_exists = TranslatorText('path_not_exists')
+path_already_exists = TranslatorText('path_already_exists')
+is_download_new_version = TranslatorText('is_download_new_version')
+already_latest_version = TranslatorText('already_latest_version')
+downloading = TranslatorText('downloading')
+download_failed = TranslatorText('download_failed')
+download_success = TranslatorText('download_success')
+unable_found_script = TranslatorText('unable_found_script')
+unable_found_maya = TranslatorText('unable_found_maya')
+install_success = TranslatorText('install_success')
+uninstall_success = TranslatorText('uninstall_success')
+install_failed = TranslatorText('install_failed')
+command_description = TranslatorText('command_description')
+run_download = TranslatorText('run_download')
+show_cache_stats = TranslatorText('show_cache_stats')
+run_stream_extract = TranslatorText('run_stream_extract')
+specify_version = TranslatorText('specify_version')
+run_install = TranslatorText('run_install')
+run_install_help = TranslatorText('run_install_help')
+document_folders_help = TranslatorText('document_folders_help')
+install_report = TranslatorText('install_report')
+run_uninstall = TranslatorText('run_uninstall')
+already_installed_status = TranslatorText('already_installed_status')
+not_installed_status = TranslatorText('not_installed_status')
+proxy_label = TranslatorText('proxy_label')
+run_batch = TranslatorText('run_batch')
+max_workers_help = TranslatorText('max_workers_help')
+supervise_help = TranslatorText('supervise_help')
+restart_on_crash_help = TranslatorText('restart_on_crash_help')
+show_sessions = TranslatorText('show_sessions')
+show_latency = TranslatorText('show_latency')
+check_update_failed = TranslatorText('check_update_failed')
+serve_mirror_help = TranslatorText('serve_mirror_help')
+mirror_host_help = TranslatorText('mirror_host_help')
+mirror_port_help = TranslatorText('mirror_port_help')
+mirror_url_help = TranslatorText('mirror_url_help')
+upstream_help = TranslatorText('upstream_help')
+sources_help = TranslatorText('sources_help')
+waiting_for_install = TranslatorText('waiting_for_install')
+install_lock_timeout = TranslatorText('install_lock_timeout')
+beta_channel_label = TranslatorText('beta_channel_label')
+channel_help = TranslatorText('channel_help')
+show_versions = TranslatorText('show_versions')
+pin_help = TranslatorText('pin_help')
+unpin_help = TranslatorText('unpin_help')
+profile_help = TranslatorText('profile_help')
+run_full_download = TranslatorText('run_full_download')
+invalid_install_target = TranslatorText('invalid_install_target')
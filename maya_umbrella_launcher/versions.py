@@ -0,0 +1,301 @@
+import os
+import re
+import copy
+import json
+import time
+import hashlib
+import threading
+import functools
+
+import maya_umbrella_launcher.constant as const
+from maya_umbrella_launcher.log import logger
+from maya_umbrella_launcher.settings import settings
+from maya_umbrella_launcher.filesystem import FileLock
+from maya_umbrella_launcher.profiling import traced
+
+VERSION_PATTERN = re.compile(r'^v?(\d+(?:\.\d+)*)(?:-?([0-9A-Za-z.-]+))?(?:\+[0-9A-Za-z.-]+)?$')
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_version(tag):
+    """
+    把tag解析成可以比较大小的元组，按语义化版本排序: v0.9.0 < v0.10.0 < v1.0.0-beta.1 < v1.0.0
+    Args:
+        tag(str): 版本tag，比如v0.10.0, v1.0.0-beta.1
+    Return:
+        (版本号元组, 预发布元组)，不是版本号时返回None
+    """
+    match = VERSION_PATTERN.match(str(tag).strip())
+    if not match:
+        return None
+
+    release = tuple(int(part) for part in match.group(1).split('.'))
+    release += (0,) * (3 - len(release))
+    if not match.group(2):
+        return release, (1,)
+    # 预发布版本排在正式版本前面，数字部分按数字比较
+    prerelease = tuple((0, int(part), '') if part.isdigit() else (1, 0, part)
+                       for part in re.split(r'[.-]', match.group(2)) if part)
+    return release, (0,) + prerelease
+
+
+def version_key(tag):
+    """
+    排序用的键，不是版本号的tag排在最前面
+    """
+    parsed = parse_version(tag) if tag else None
+    return (1, parsed, str(tag)) if parsed else (0, ((), ()), str(tag or ''))
+
+
+def sort_versions(tags):
+    return sorted(tags, key=version_key)
+
+
+def is_newer(tag, other):
+    """
+    tag是否比other新，other为空时返回True
+    """
+    return version_key(tag) > version_key(other)
+
+
+def is_prerelease(tag):
+    parsed = parse_version(tag)
+    return bool(parsed) and parsed[1][0] == 0
+
+
+def get_channel():
+    """
+    获取设置的更新通道，stable只使用正式版本，beta同时使用预发布版本
+    """
+    channel = settings.get('plugin_channel') or const.CHANNEL_STABLE
+    return channel if channel in const.CHANNELS else const.CHANNEL_STABLE
+
+
+def hash_folder(folder):
+    """
+    计算目录的大小和完整性哈希，哈希覆盖每个文件的相对路径和内容
+    Return:
+        (字节数, 'sha256:...')
+    """
+    sha = hashlib.sha256()
+    size = 0
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            file_sha = hashlib.sha256()
+            with open(file_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    file_sha.update(chunk)
+                    size += len(chunk)
+            sha.update(os.path.relpath(file_path, folder).replace(os.sep, '/').encode('utf-8'))
+            sha.update(b'\0')
+            sha.update(file_sha.digest())
+    return size, f'sha256:{sha.hexdigest()}'
+
+
+class VersionManifest(object):
+    """
+    插件目录里的版本清单
+    记录每个已安装版本的安装时间、大小和完整性哈希，以及按maya版本固定的版本。
+    启动时只读这个小文件决定使用哪个版本，不再扫描插件目录，文件没有变化时直接使用进程内的缓存。
+    修改时持有文件锁读-改-写，再用临时文件原子替换，多台机器共用插件目录时也不会互相覆盖。
+    没有清单的旧插件目录第一次读取时扫描一次生成；插件目录比清单新时（其他启动器或手动复制了版本目录），
+    列出一次目录，和清单不一致时重新扫描。
+    """
+
+    _cache = {}
+    _fallback = {}
+    _cache_lock = threading.Lock()
+
+    def __init__(self, plugin_folder):
+        self.plugin_folder = plugin_folder
+        self.path = os.path.join(plugin_folder, const.VERSION_MANIFEST_NAME)
+        self.lock_path = os.path.join(plugin_folder, const.LOCK_FOLDER_NAME, 'versions.lock')
+
+    def load(self):
+        """
+        Return:
+            {'versions': {tag: {'installed_at', 'size', 'hash'}}, 'order': 从旧到新的tag列表, 'pins': {maya版本: tag}}
+        """
+        data = self._read()
+        if data is None or (self._is_folder_changed() and self._scan_tags() != set(data['versions'])):
+            data = self.rebuild()
+        return data
+
+    def get_versions(self, channel=None):
+        """
+        获取已安装的版本，按语义化版本从旧到新排序
+        Args:
+            channel(str): stable时不包括预发布版本，为None时返回全部
+        """
+        data = self.load()
+        versions = data['order'] if data['versions'].keys() == set(data['order']) else sort_versions(data['versions'])
+        if channel == const.CHANNEL_STABLE:
+            versions = [tag for tag in versions if not is_prerelease(tag)]
+        return versions
+
+    def get_pins(self):
+        return dict(self.load()['pins'])
+
+    @traced('versions.resolve')
+    def resolve(self, maya_version=None, channel=None):
+        """
+        获取启动时使用的版本
+        maya版本有固定的版本且已安装时使用固定的版本，否则使用通道里最新的版本，
+        通道里没有版本时使用最新安装的版本
+        Return:
+            版本tag，没有安装任何版本时返回None
+        """
+        data = self.load()
+        pinned = data['pins'].get(str(maya_version)) if maya_version is not None else None
+        if pinned in data['versions']:
+            return pinned
+        if pinned:
+            logger.warning(f'Pinned version {pinned} for maya {maya_version} is not installed')
+
+        versions = self.get_versions(channel or get_channel()) or self.get_versions()
+        return versions[-1] if versions else None
+
+    @traced('versions.add')
+    def add(self, tag):
+        """
+        记录新安装的版本，计算大小和哈希
+        """
+        size, digest = hash_folder(os.path.join(self.plugin_folder, tag))
+        entry = {'installed_at': time.time(), 'size': size, 'hash': digest}
+        self._update(lambda data: data['versions'].__setitem__(tag, entry))
+        return entry
+
+    def remove(self, tag):
+        self._update(lambda data: data['versions'].pop(tag, None))
+
+    def pin(self, maya_version, tag):
+        """
+        把maya版本固定到已安装的插件版本
+        Return:
+            是否成功
+        """
+        if tag not in self.load()['versions']:
+            logger.error(f'Version {tag} is not installed in {self.plugin_folder}')
+            return False
+        self._update(lambda data: data['pins'].__setitem__(str(maya_version), tag))
+        return True
+
+    def unpin(self, maya_version):
+        self._update(lambda data: data['pins'].pop(str(maya_version), None))
+
+    def verify(self, tag):
+        """
+        重新计算哈希，检查版本目录是否被修改或损坏
+        """
+        entry = self.load()['versions'].get(tag)
+        folder = os.path.join(self.plugin_folder, tag)
+        return bool(entry) and os.path.isdir(folder) and hash_folder(folder)[1] == entry['hash']
+
+    @traced('versions.rebuild')
+    def rebuild(self):
+        """
+        扫描插件目录，重新生成清单，已有记录的版本保留原来的信息
+        """
+        def scan(data):
+            versions = {}
+            for tag in self._scan_tags():
+                folder = os.path.join(self.plugin_folder, tag)
+                entry = data['versions'].get(tag)
+                if not entry:
+                    size, digest = hash_folder(folder)
+                    entry = {'installed_at': os.stat(folder).st_mtime, 'size': size, 'hash': digest}
+                versions[tag] = entry
+            data['versions'] = versions
+
+        return self._update(scan)
+
+    def _scan_tags(self):
+        """
+        列出插件目录里完整的版本目录
+        """
+        return {tag for tag in os.listdir(self.plugin_folder)
+                if tag.startswith('v')
+                and os.path.isdir(os.path.join(self.plugin_folder, tag, const.REPO_NAME, 'scripts'))}
+
+    def _is_folder_changed(self):
+        """
+        插件目录在清单之后是否有变化，比如不通过add新增了版本目录
+        """
+        try:
+            return os.stat(self.plugin_folder).st_mtime_ns > os.stat(self.path).st_mtime_ns
+        except OSError:
+            return False
+
+    def _update(self, func):
+        """
+        在文件锁内读取最新的清单，调用func修改后写回
+        """
+        try:
+            with FileLock(self.lock_path):
+                data = copy.deepcopy(self._read()) or {'versions': {}, 'order': [], 'pins': {}}
+                func(data)
+                self._write(data)
+        except OSError as e:
+            # 只读的共享目录，修改后的清单保存在内存里，本进程之后的读取直接使用，
+            # 不会每次都因为没有清单而重新扫描、计算哈希；磁盘上的清单变化后失效
+            logger.warning(f'Failed to update version manifest {self.path}: {e}')
+            data = copy.deepcopy(self._read()) or {'versions': {}, 'order': [], 'pins': {}}
+            func(data)
+            data['order'] = sort_versions(data['versions'])
+            with self._cache_lock:
+                self._fallback[self.path] = (self._get_stamp(), data)
+        return data
+
+    def _get_stamp(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read(self):
+        stamp = self._get_stamp()
+        with self._cache_lock:
+            fallback = self._fallback.get(self.path)
+            cached = self._cache.get(self.path)
+        if fallback and fallback[0] == stamp:
+            return fallback[1]
+        if stamp is None:
+            return None
+
+        if cached and cached[0] == stamp:
+            return cached[1]
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f'Failed to read version manifest {self.path}: {e}')
+            return None
+        data.setdefault('versions', {})
+        data.setdefault('order', [])
+        data.setdefault('pins', {})
+        with self._cache_lock:
+            self._cache[self.path] = (stamp, data)
+        return data
+
+    def _write(self, data):
+        # 排好的顺序也写进清单，读取时不用再解析和排序
+        data['order'] = sort_versions(data['versions'])
+        tmp_path = f'{self.path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=4, sort_keys=True)
+        os.replace(tmp_path, self.path)
+        # 替换清单本身会更新插件目录的修改时间，把清单的修改时间对齐到目录，
+        # 之后只有新增、删除版本目录才会让目录比清单新
+        try:
+            folder_mtime = os.stat(self.plugin_folder).st_mtime_ns
+            if folder_mtime > os.stat(self.path).st_mtime_ns:
+                os.utime(self.path, ns=(folder_mtime, folder_mtime))
+        except OSError as e:
+            logger.debug(f'Failed to align version manifest mtime: {e}')
+        with self._cache_lock:
+            self._cache.pop(self.path, None)
+            self._fallback.pop(self.path, None)
@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+from maya_umbrella_launcher.benchmark import sandbox, serve_fake_github
+
+
+@pytest.fixture
+def proxies():
+    """
+    本地的假服务器不使用系统代理
+    """
+    return {'http': None, 'https': None}
+
+
+@pytest.fixture
+def home(tmp_path):
+    """
+    在临时目录的沙盒里运行，设置、maya安装索引、release缓存和启动配置缓存都不使用用户自己的
+    """
+    from maya_umbrella_launcher.mirror import release_sources
+
+    release_sources._health.clear()
+    with sandbox(str(tmp_path)) as data_folder:
+        yield data_folder
+    release_sources._health.clear()
+
+
+@pytest.fixture
+def plugin_folder(home, tmp_path):
+    from maya_umbrella_launcher.core import UserSetting
+
+    folder = str(tmp_path / 'plugins')
+    os.makedirs(folder)
+    UserSetting.set('plugin_folder', folder)
+    return folder
+
+
+@pytest.fixture
+def fake_github():
+    """
+    启动模拟的GitHub，测试结束后关闭
+    Return:
+        serve_fake_github(zip_data, tag_name, ranges)，返回api地址
+    """
+    servers = []
+
+    def serve(zip_data, tag_name='v1.0.0', ranges=True):
+        server, api_base = serve_fake_github(zip_data, tag_name, ranges=ranges)
+        servers.append(server)
+        return api_base
+
+    yield serve
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def no_retries(monkeypatch):
+    """
+    连接不上的源立即失败，不按指数退避重试
+    """
+    from maya_umbrella_launcher.http_client import http_client, HttpClient
+
+    monkeypatch.setattr(http_client, '_session', HttpClient(retries=0)._create_session())
@@ -0,0 +1,117 @@
+import os
+import zipfile
+
+import pytest
+
+import maya_umbrella_launcher.constant as const
+from maya_umbrella_launcher.archive import (extract_zip, safe_extract_path, StreamZipExtractor,
+                                            StreamExtractUnsupported)
+from maya_umbrella_launcher.benchmark import make_synthetic_zip
+from maya_umbrella_launcher.delta import build_file_manifest
+
+
+def write_zip(zip_path, files, compression=zipfile.ZIP_DEFLATED):
+    with zipfile.ZipFile(zip_path, 'w', compression) as zip_ref:
+        for name, data in files.items():
+            zip_ref.writestr(name, data)
+    return zip_path
+
+
+def read_tree(folder):
+    result = {}
+    for root, _, files in os.walk(folder):
+        for name in files:
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                result[os.path.relpath(path, folder).replace(os.sep, '/')] = f.read()
+    return result
+
+
+@pytest.mark.parametrize('compression', [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED])
+def test_extract_zip_roundtrip(tmp_path, compression):
+    files = {'maya_umbrella/scripts/userSetup.py': b'import maya' * 100,
+             'maya_umbrella/scripts/pkg/__init__.py': b'',
+             'maya_umbrella/data/bin.dat': os.urandom(200 * 1024)}
+    zip_path = write_zip(str(tmp_path / 'maya_umbrella.zip'), files, compression)
+
+    extract_to = extract_zip(zip_path, workers=4)
+    assert extract_to == str(tmp_path / 'maya_umbrella')
+    assert read_tree(extract_to) == files
+    assert not os.path.exists(extract_to + '.staging')
+
+
+def test_extract_zip_replaces_existing_folder(tmp_path):
+    extract_to = str(tmp_path / 'out')
+    os.makedirs(extract_to)
+    open(os.path.join(extract_to, 'stale.py'), 'w').close()
+
+    extract_zip(write_zip(str(tmp_path / 'a.zip'), {'new.py': b'new'}), extract_to)
+    assert read_tree(extract_to) == {'new.py': b'new'}
+
+
+def test_extract_zip_bad_crc(tmp_path):
+    zip_path = write_zip(str(tmp_path / 'bad.zip'), {'a.py': b'a' * 1000, 'b.py': b'payload'},
+                         zipfile.ZIP_STORED)
+    with open(zip_path, 'rb') as f:
+        data = f.read()
+    with open(zip_path, 'wb') as f:
+        f.write(data.replace(b'payload', b'PAYLOAD'))
+
+    extract_to = str(tmp_path / 'out')
+    with pytest.raises(zipfile.BadZipFile):
+        extract_zip(zip_path, extract_to)
+    assert not os.path.exists(extract_to)
+    assert not os.path.exists(extract_to + '.staging')
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 4096, 1 << 20])
+def test_stream_extract_matches_extract_zip(tmp_path, chunk_size):
+    zip_path = make_synthetic_zip(str(tmp_path / 'synthetic.zip'), 40, 3000, zipfile.ZIP_DEFLATED)
+    expected = build_file_manifest(extract_zip(zip_path, str(tmp_path / 'expected')))
+
+    extractor = StreamZipExtractor(str(tmp_path / 'stream'))
+    with open(zip_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            extractor.feed(chunk)
+    extract_to = extractor.close()
+
+    assert build_file_manifest(extract_to) == expected
+
+
+def test_stream_extract_truncated(tmp_path):
+    zip_path = write_zip(str(tmp_path / 'a.zip'), {'a.py': os.urandom(10000)})
+    with open(zip_path, 'rb') as f:
+        data = f.read()
+
+    extractor = StreamZipExtractor(str(tmp_path / 'out'))
+    extractor.feed(data[:len(data) // 2])
+    with pytest.raises(zipfile.BadZipFile):
+        extractor.close()
+
+
+def test_stream_extract_unsupported_compression(tmp_path):
+    zip_path = write_zip(str(tmp_path / 'a.zip'), {'a.py': b'a' * 1000}, zipfile.ZIP_BZIP2)
+    with open(zip_path, 'rb') as f:
+        data = f.read()
+
+    with pytest.raises(StreamExtractUnsupported):
+        StreamZipExtractor(str(tmp_path / 'out')).feed(data)
+
+
+def test_stream_install_falls_back_to_full_zip(plugin_folder, fake_github, tmp_path, proxies):
+    from maya_umbrella_launcher.core import PluginManager, UserSetting
+
+    files = {'scripts/userSetup.py': b'import maya' * 100}
+    with open(write_zip(str(tmp_path / 'release.zip'), files, zipfile.ZIP_BZIP2), 'rb') as f:
+        UserSetting.set('release_sources', [fake_github(f.read(), 'v1.0.0')])
+
+    assert PluginManager.download_plugin(proxies=proxies, stream_extract=True, delta_update=False)
+    assert read_tree(os.path.join(plugin_folder, 'v1.0.0', const.REPO_NAME)) == files
+
+
+@pytest.mark.parametrize('name', ['../../evil.py', '/abs/evil.py', 'a/./../evil.py', 'C:\\evil.py', 'a\\..\\evil.py'])
+def test_safe_extract_path(tmp_path, name):
+    extract_to = str(tmp_path / 'out')
+    path = os.path.normpath(safe_extract_path(extract_to, name))
+    assert path.startswith(extract_to + os.sep)
+    assert path.endswith('evil.py')
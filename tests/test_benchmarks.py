@@ -0,0 +1,110 @@
+"""
+pytest-benchmark性能测试，全部离线运行
+    python -m pytest tests --benchmark-json benchmark.json
+"""
+import os
+import shutil
+import zipfile
+import subprocess
+
+import pytest
+
+import maya_umbrella_launcher.constant as const
+from maya_umbrella_launcher.benchmark import (make_synthetic_zip, make_plugin_folder, make_cli_home, cli_command,
+                                              CLI_COMMANDS)
+
+pytest.importorskip('pytest_benchmark')
+
+
+@pytest.mark.parametrize('file_count, file_size', [(2000, 512), (200, 16 * 1024), (8, 4 * 1024 * 1024)],
+                         ids=['many_small', 'medium', 'few_large'])
+@pytest.mark.parametrize('workers', sorted({1, const.EXTRACT_WORKERS}))
+def test_extract_zip(benchmark, tmp_path, file_count, file_size, workers):
+    from maya_umbrella_launcher.archive import extract_zip
+
+    zip_path = make_synthetic_zip(str(tmp_path / 'release.zip'), file_count, file_size, zipfile.ZIP_DEFLATED)
+    extract_to = benchmark(extract_zip, zip_path, str(tmp_path / 'out'), workers=workers)
+    assert len(os.listdir(os.path.join(extract_to, const.REPO_NAME, 'scripts'))) == min(file_count, 16)
+
+
+@pytest.mark.parametrize('ranges', [True, False], ids=['ranged', 'single_stream'])
+def test_download_release_files(benchmark, tmp_path, home, fake_github, proxies, ranges):
+    from maya_umbrella_launcher.github_utils import download_release_files
+
+    zip_path = make_synthetic_zip(str(tmp_path / 'release.zip'), 500, 16 * 1024)
+    with open(zip_path, 'rb') as f:
+        api_base = fake_github(f.read(), ranges=ranges)
+    save_path = str(tmp_path / 'download' / f'{const.REPO_NAME}.zip')
+
+    def setup():
+        shutil.rmtree(os.path.dirname(save_path), ignore_errors=True)
+        os.makedirs(os.path.dirname(save_path))
+
+    benchmark.pedantic(download_release_files, args=(f'{api_base}/download/v1.0.0/{const.REPO_NAME}.zip', save_path),
+                       kwargs={'proxies': proxies}, setup=setup, rounds=5)
+    assert os.path.getsize(save_path) == os.path.getsize(zip_path)
+
+
+@pytest.mark.parametrize('count', [100, 500])
+def test_get_local_version_list(benchmark, tmp_path, home, count):
+    from maya_umbrella_launcher.core import PluginManager
+
+    plugin_folder = make_plugin_folder(str(tmp_path / 'plugins'), count)
+    versions = benchmark(PluginManager.get_local_version_list, plugin_folder)
+    assert len(versions) == count
+
+
+def test_user_setting_get(benchmark, home, tmp_path):
+    from maya_umbrella_launcher.core import UserSetting
+
+    UserSetting.set('plugin_folder', str(tmp_path))
+    UserSetting.flush()
+
+    def get():
+        for _ in range(1000):
+            UserSetting.get('plugin_folder')
+            UserSetting.get('proxy_on', '')
+
+    benchmark(get)
+
+
+def test_user_setting_set_and_flush(benchmark, home):
+    from maya_umbrella_launcher.core import UserSetting
+
+    def set_and_flush():
+        for i in range(100):
+            UserSetting.set('setting_window_size', (450, i))
+        UserSetting.flush()
+
+    benchmark(set_and_flush)
+    assert UserSetting.get('setting_window_size') == (450, 99)
+
+
+def test_translator_lookup(benchmark, home):
+    import maya_umbrella_launcher.translator as tr
+
+    messages = [getattr(tr, name) for name in ('launch_bt', 'install_desc', 'download_failed', 'proxy_label')]
+
+    def lookup():
+        for _ in range(1000):
+            for message in messages:
+                message.text
+
+    benchmark(lookup)
+
+
+def test_get_python_path_env(benchmark, home, tmp_path):
+    from maya_umbrella_launcher.core import PluginManager, UserSetting
+
+    UserSetting.set('plugin_folder', make_plugin_folder(str(tmp_path / 'plugins'), 200))
+    env = benchmark(PluginManager.get_python_path_env)
+    assert 'v0.199.0' in env['PYTHONPATH']
+
+
+@pytest.mark.parametrize('args', CLI_COMMANDS, ids=[' '.join(args) for args in CLI_COMMANDS])
+def test_cli_cold_start(benchmark, tmp_path, args):
+    command, envs = cli_command(args, home_envs=make_cli_home(str(tmp_path)))
+    result = benchmark.pedantic(subprocess.run, args=(command,),
+                                kwargs={'env': envs, 'stdout': subprocess.DEVNULL, 'stderr': subprocess.DEVNULL},
+                                rounds=3)
+    assert result.returncode == 0
@@ -0,0 +1,95 @@
+import os
+import stat
+
+import pytest
+
+import maya_umbrella_launcher.constant as const
+from maya_umbrella_launcher.benchmark import make_release_zips
+from maya_umbrella_launcher.delta import DeltaInstaller, build_file_manifest
+
+
+@pytest.fixture
+def releases(tmp_path):
+    """
+    两个版本的zip，新版本有3个文件变化、新增1个文件
+    """
+    return make_release_zips(str(tmp_path), 60, 8 * 1024, 3)
+
+
+@pytest.fixture
+def base_version(plugin_folder, fake_github, releases, proxies):
+    """
+    完整安装旧版本v1.0.0
+    """
+    from maya_umbrella_launcher.core import PluginManager, UserSetting
+
+    UserSetting.set('release_sources', [fake_github(releases[0], 'v1.0.0')])
+    assert PluginManager.download_plugin(proxies=proxies, delta_update=False)
+    return os.path.join(plugin_folder, 'v1.0.0')
+
+
+def new_installer(tmp_path, api_base, base_version, proxies, **kwargs):
+    return DeltaInstaller(f'{api_base}/download/v1.1.0/{const.REPO_NAME}.zip', str(tmp_path / 'delta'),
+                          base_version, proxies=proxies, **kwargs)
+
+
+def installed_files(version_folder):
+    return build_file_manifest(os.path.join(version_folder, const.REPO_NAME))
+
+
+def test_delta_downloads_only_changed_files(tmp_path, fake_github, releases, base_version, proxies):
+    installer = new_installer(tmp_path, fake_github(releases[1], 'v1.1.0'), base_version, proxies)
+    extract_to = installer.install()
+
+    assert extract_to == str(tmp_path / 'delta' / const.REPO_NAME)
+    assert installer.stats['changed'] == 4
+    assert installer.stats['reused'] == 57
+    assert installer.stats['fetched'] * 2 < installer.stats['size']
+
+
+def test_delta_result_matches_full_install(tmp_path, plugin_folder, fake_github, releases, base_version, proxies):
+    from maya_umbrella_launcher.core import PluginManager, UserSetting
+
+    api_base = fake_github(releases[1], 'v1.1.0')
+    UserSetting.set('release_sources', [api_base])
+    assert PluginManager.download_plugin(proxies=proxies, delta_update=True)
+
+    installer = new_installer(tmp_path, api_base, base_version, proxies)
+    installer.install()
+    assert installed_files(os.path.join(plugin_folder, 'v1.1.0')) == installed_files(str(tmp_path / 'delta'))
+
+
+def test_delta_falls_back_without_range(tmp_path, fake_github, releases, base_version, proxies):
+    installer = new_installer(tmp_path, fake_github(releases[1], 'v1.1.0', ranges=False), base_version, proxies)
+    assert installer.install() is None
+
+
+def test_delta_falls_back_with_too_many_changes(tmp_path, fake_github, releases, base_version, proxies):
+    installer = new_installer(tmp_path, fake_github(releases[1], 'v1.1.0'), base_version, proxies, max_ratio=0.01)
+    assert installer.install() is None
+
+
+def test_download_plugin_falls_back_to_full_download(plugin_folder, fake_github, releases, base_version, proxies):
+    from maya_umbrella_launcher.core import PluginManager, UserSetting
+
+    UserSetting.set('release_sources', [fake_github(releases[1], 'v1.1.0', ranges=False)])
+    assert PluginManager.download_plugin(proxies=proxies, delta_update=True)
+    assert len(installed_files(os.path.join(plugin_folder, 'v1.1.0'))) == 61
+
+
+def test_delta_refetches_modified_base_file(tmp_path, fake_github, releases, base_version, proxies):
+    # 旧版本里大小不变的修改，清单里的CRC已经对不上实际内容
+    name = sorted(installed_files(base_version))[-1]
+    path = os.path.join(base_version, const.REPO_NAME, *name.split('/'))
+    os.chmod(path, stat.S_IREAD | stat.S_IWRITE)
+    with open(path, 'r+b') as f:
+        data = f.read()
+        f.seek(0)
+        f.write(bytes(255 - byte for byte in data))
+
+    installer = new_installer(tmp_path, fake_github(releases[1], 'v1.1.0'), base_version, proxies)
+    installer.install()
+    assert installer.stats['changed'] == 5
+
+    with open(os.path.join(str(tmp_path / 'delta'), const.REPO_NAME, *name.split('/')), 'rb') as f:
+        assert f.read() == data
@@ -0,0 +1,79 @@
+import os
+import shutil
+
+import pytest
+
+from maya_umbrella_launcher.benchmark import make_maya_root
+from maya_umbrella_launcher.discovery import MayaDiscovery, PathBackend, EnvBackend, MAYA_EXECUTABLE
+
+
+@pytest.fixture
+def maya_root(tmp_path):
+    return make_maya_root(str(tmp_path / 'autodesk'))
+
+
+def test_path_backend_finds_versions(maya_root, tmp_path):
+    os.makedirs(os.path.join(maya_root, 'mayaUSD'))
+    open(os.path.join(maya_root, 'maya2099.txt'), 'w').close()
+
+    installs = PathBackend(roots=[maya_root, str(tmp_path / 'missing')]).discover()
+    assert [install.version for install in installs] == ['2022', '2023', '2024']
+    assert installs[0].app_path == os.path.join(maya_root, 'maya2022', 'bin', MAYA_EXECUTABLE)
+
+
+def test_env_backend_overrides_path_backend(maya_root, tmp_path):
+    location = str(tmp_path / 'custom' / 'maya2024')
+    environ = {'MAYA_LOCATION': str(tmp_path / 'other' / 'Maya2025'), 'MAYA_LOCATION_2024': location,
+               'MAYA_LOCATION_beta': location}
+    discovery = MayaDiscovery(backends=[PathBackend(roots=[maya_root]), EnvBackend(environ=environ)],
+                              cache_folder=None)
+
+    assert discovery.get_versions() == ['2022', '2023', '2024', '2025']
+    assert discovery.get('2024').location == location
+    assert discovery.get(2024).source == 'env'
+    assert discovery.get('2023').source == 'path'
+
+
+def test_index_is_reused_until_stamp_changes(maya_root, tmp_path, monkeypatch):
+    cache_folder = str(tmp_path / 'cache')
+    backends = [PathBackend(roots=[maya_root])]
+    assert MayaDiscovery(backends=backends, cache_folder=cache_folder).get_versions() == ['2022', '2023', '2024']
+    assert os.path.isfile(os.path.join(cache_folder, MayaDiscovery.index_file_name))
+
+    # 安装目录没有变化时直接读取索引，不再扫描
+    def fail():
+        raise AssertionError('index not used')
+
+    monkeypatch.setattr(backends[0], 'discover', fail)
+    assert MayaDiscovery(backends=backends, cache_folder=cache_folder).get_versions() == ['2022', '2023', '2024']
+
+    monkeypatch.undo()
+    stamp = backends[0].get_stamp()
+    make_maya_root(maya_root, versions=('2025',))
+    assert backends[0].get_stamp() != stamp
+    assert MayaDiscovery(backends=backends, cache_folder=cache_folder).get_versions() == \
+        ['2022', '2023', '2024', '2025']
+
+
+def test_corrupt_index_is_ignored(maya_root, tmp_path):
+    cache_folder = str(tmp_path / 'cache')
+    os.makedirs(cache_folder)
+    with open(os.path.join(cache_folder, MayaDiscovery.index_file_name), 'w') as f:
+        f.write('{"stamps": ')
+
+    discovery = MayaDiscovery(backends=[PathBackend(roots=[maya_root])], cache_folder=cache_folder)
+    assert discovery.get_versions() == ['2022', '2023', '2024']
+
+
+def test_missing_app_path_triggers_refresh(home):
+    from maya_umbrella_launcher.discovery import maya_discovery
+    from maya_umbrella_launcher.filesystem import MayaSystem
+
+    assert MayaSystem.get_installed_maya_versions() == ['2022', '2023', '2024']
+    app_path = MayaSystem.get_maya_app_path('2023')
+    assert os.path.isfile(app_path)
+
+    # 卸载后索引里的路径失效，重新查找后不再列出
+    shutil.rmtree(maya_discovery.get('2023').location)
+    assert MayaSystem.get_maya_app_path('2023') is None
+    assert MayaSystem.get_installed_maya_versions() == ['2022', '2024']
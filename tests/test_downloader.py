@@ -0,0 +1,86 @@
+import os
+import threading
+
+import pytest
+
+from maya_umbrella_launcher.benchmark import serve_bytes
+from maya_umbrella_launcher.downloader import RangedDownloader, DownloadCancelled
+from maya_umbrella_launcher.progress import ProgressMeter
+
+
+@pytest.fixture
+def remote_file():
+    servers = []
+
+    def serve(data, ranges=True):
+        server, url = serve_bytes(data, ranges=ranges)
+        servers.append(server)
+        return url
+
+    yield serve
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_ranged_download(tmp_path, remote_file, proxies):
+    data = os.urandom(3 * 1024 * 1024 + 123)
+    save_path = str(tmp_path / 'maya_umbrella.zip')
+
+    RangedDownloader(remote_file(data), save_path, proxies=proxies, segment_size=256 * 1024).download()
+
+    with open(save_path, 'rb') as f:
+        assert f.read() == data
+    assert not RangedDownloader.has_partial(save_path)
+    assert not os.path.exists(save_path + RangedDownloader.part_suffix)
+
+
+def test_resume_after_cancel(tmp_path, remote_file, proxies):
+    data = os.urandom(8 * 1024 * 1024)
+    url = remote_file(data)
+    save_path = str(tmp_path / 'maya_umbrella.zip')
+
+    cancel_event = threading.Event()
+    progress = ProgressMeter(callback=lambda snapshot: snapshot['done'] > 3 * 1024 * 1024 and cancel_event.set(),
+                             interval=0)
+    with pytest.raises(DownloadCancelled):
+        RangedDownloader(url, save_path, proxies=proxies, cancel_event=cancel_event, progress=progress).download()
+    assert RangedDownloader.has_partial(save_path)
+
+    # 续传时已经下载的部分不再计入进度
+    progress = ProgressMeter()
+    RangedDownloader(url, save_path, proxies=proxies, progress=progress).download()
+    snapshot = progress.snapshot()
+    assert snapshot['done'] == len(data)
+
+    with open(save_path, 'rb') as f:
+        assert f.read() == data
+    assert not RangedDownloader.has_partial(save_path)
+
+
+def test_restart_when_remote_file_changed(tmp_path, remote_file, proxies):
+    save_path = str(tmp_path / 'maya_umbrella.zip')
+    cancel_event = threading.Event()
+    progress = ProgressMeter(callback=lambda snapshot: snapshot['done'] and cancel_event.set(), interval=0)
+    with pytest.raises(DownloadCancelled):
+        RangedDownloader(remote_file(os.urandom(4 * 1024 * 1024)), save_path, proxies=proxies,
+                         cancel_event=cancel_event, progress=progress).download()
+
+    # 大小和ETag都不同，不能接着旧的.part文件继续
+    data = os.urandom(2 * 1024 * 1024)
+    RangedDownloader(remote_file(data), save_path, proxies=proxies).download()
+    with open(save_path, 'rb') as f:
+        assert f.read() == data
+
+
+def test_fallback_to_single_stream_without_range(tmp_path, remote_file, proxies):
+    data = os.urandom(1024 * 1024 + 7)
+    save_path = str(tmp_path / 'maya_umbrella.zip')
+    progress = ProgressMeter()
+
+    RangedDownloader(remote_file(data, ranges=False), save_path, proxies=proxies, progress=progress).download()
+
+    with open(save_path, 'rb') as f:
+        assert f.read() == data
+    assert progress.snapshot()['done'] == len(data)
+    assert not RangedDownloader.has_partial(save_path)
@@ -0,0 +1,20 @@
+import os
+import stat
+import warnings
+
+from maya_umbrella_launcher.filesystem import remove_folder, make_read_only
+
+
+def test_remove_folder_with_read_only_files(tmp_path):
+    folder = tmp_path / 'v1.0.0' / 'maya_umbrella' / 'scripts'
+    os.makedirs(str(folder))
+    file_path = str(folder / 'userSetup.py')
+    with open(file_path, 'w') as f:
+        f.write('# plugin')
+    make_read_only(file_path)
+    os.chmod(str(folder), stat.S_IREAD | stat.S_IEXEC)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', DeprecationWarning)
+        remove_folder(str(tmp_path / 'v1.0.0'))
+    assert not os.path.exists(str(tmp_path / 'v1.0.0'))
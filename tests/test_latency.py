@@ -0,0 +1,57 @@
+import os
+import sys
+import json
+import time
+import subprocess
+
+from maya_umbrella_launcher.latency import LaunchLatencyStore, percentile
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TRACK_SCRIPT = '''
+import os
+import sys
+from maya_umbrella_launcher.latency import LaunchLatencyStore
+
+store = LaunchLatencyStore(data_folder=sys.argv[1])
+for i in range(20):
+    pending = {'marker': f'{sys.argv[2]}-{i}.json', 'pid': os.getpid(), 'start_time': 2 ** 40,
+               'maya_version': '2024', 'plugin_version': 'v1.0.0'}
+    store._update(lambda data: data['pending'].append(pending))
+'''
+
+
+def test_percentile():
+    samples = [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0, 10.0]
+    assert percentile(samples, 50) == 5.0
+    assert percentile(samples, 95) == 10.0
+    assert percentile([], 50) is None
+
+
+def test_collect_ready_marker(tmp_path):
+    store = LaunchLatencyStore(data_folder=str(tmp_path), timeout=60)
+    envs = {}
+    marker = store.prepare(envs)
+    assert envs['PYTHONPATH'].endswith(store.hook_folder)
+
+    start_time = time.time()
+    store._update(lambda data: data['pending'].append(
+        {'marker': marker, 'pid': os.getpid(), 'start_time': start_time,
+         'maya_version': '2024', 'plugin_version': 'v1.0.0'}))
+    with open(marker, 'w') as f:
+        json.dump({'time': start_time + 12.5, 'loaded': True}, f)
+
+    rows = store.get_report()
+    assert rows[0]['count'] == 1
+    assert rows[0]['p50'] == 12.5
+    assert not os.path.exists(marker)
+
+
+def test_concurrent_processes_keep_pending(tmp_path):
+    envs = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [PACKAGE_ROOT, os.environ.get('PYTHONPATH')])))
+    processes = [subprocess.Popen([sys.executable, '-c', TRACK_SCRIPT, str(tmp_path), f'worker{i}'], env=envs)
+                 for i in range(4)]
+    assert [process.wait(timeout=60) for process in processes] == [0] * 4
+
+    pending = LaunchLatencyStore(data_folder=str(tmp_path))._load()['pending']
+    assert len({item['marker'] for item in pending}) == 80
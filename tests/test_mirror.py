@@ -0,0 +1,120 @@
+import os
+import json
+import http.client
+
+import pytest
+
+import maya_umbrella_launcher.constant as const
+from maya_umbrella_launcher.mirror import MirrorServer, release_sources
+from maya_umbrella_launcher.github_utils import get_latest_release, download_release_files, get_asset_urls
+
+# 没有服务监听的端口，连接会立即失败
+DEAD_SOURCE = 'http://127.0.0.1:9'
+
+
+@pytest.fixture
+def mirror(tmp_path, fake_github, proxies):
+    upstream = fake_github(b'release data' * 1000, 'v1.2.0')
+    server = MirrorServer(str(tmp_path / 'mirror'), port=0, upstream=upstream, proxies=proxies).start()
+    yield server
+    server.shutdown()
+
+
+def raw_get(url, path, headers=None):
+    """
+    requests会在客户端规范化路径里的`..`，用http.client原样发送
+    """
+    host, port = url.split('://')[1].split(':')
+    connection = http.client.HTTPConnection(host, int(port), timeout=10)
+    try:
+        connection.request('GET', path, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, response.read()
+    finally:
+        connection.close()
+
+
+def test_mirror_serves_release_and_asset(mirror):
+    status, body = raw_get(mirror.url, f'/repos/{const.USER_NAME}/{const.REPO_NAME}/releases/latest')
+    assert status == 200
+    release = json.loads(body)
+    asset = release['assets'][0]
+    assert asset['browser_download_url'].startswith(mirror.url + '/assets/')
+    assert asset['upstream_url'].endswith(f'/download/v1.2.0/{const.REPO_NAME}.zip')
+
+    status, body = raw_get(mirror.url, asset['browser_download_url'][len(mirror.url):])
+    assert status == 200
+    assert body == b'release data' * 1000
+    assert os.path.isfile(os.path.join(mirror.folder, const.USER_NAME, const.REPO_NAME, 'v1.2.0', asset['name']))
+
+
+@pytest.mark.parametrize('path', [
+    f'/assets/{const.USER_NAME}/{const.REPO_NAME}/../../secret.txt',
+    f'/assets/{const.USER_NAME}/{const.REPO_NAME}/v1.2.0/..',
+    '/assets/../././secret.txt',
+    f'/assets/{const.USER_NAME}/{const.REPO_NAME}/v1.2.0/%2e%2e',
+])
+def test_mirror_rejects_path_traversal(mirror, path):
+    with open(os.path.join(os.path.dirname(mirror.folder), 'secret.txt'), 'w') as f:
+        f.write('secret')
+
+    status, body = raw_get(mirror.url, path)
+    assert status == 404
+    assert b'secret' not in body
+
+
+def test_mirror_ignores_host_header(mirror):
+    status, body = raw_get(mirror.url, f'/repos/{const.USER_NAME}/{const.REPO_NAME}/releases/latest',
+                           headers={'Host': 'evil.example:80'})
+    assert status == 200
+    assert b'evil.example' not in body
+    assert json.loads(body)['assets'][0]['browser_download_url'].startswith(mirror.url + '/assets/')
+
+
+def test_mirror_public_url(tmp_path, fake_github, proxies):
+    upstream = fake_github(b'release data', 'v1.2.0')
+    server = MirrorServer(str(tmp_path / 'mirror'), port=0, upstream=upstream, proxies=proxies,
+                          public_url='http://mirror.studio:8765/').start()
+    try:
+        status, body = raw_get(server.url, f'/repos/{const.USER_NAME}/{const.REPO_NAME}/releases/latest')
+        asset = json.loads(body)['assets'][0]
+        assert asset['browser_download_url'] == \
+            f'http://mirror.studio:8765/assets/{const.USER_NAME}/{const.REPO_NAME}/v1.2.0/{asset["name"]}'
+    finally:
+        server.shutdown()
+
+
+def test_mirror_only_serves_configured_repo(mirror):
+    assert raw_get(mirror.url, '/repos/someone/other/releases/latest')[0] == 404
+    assert raw_get(mirror.url, '/repos/someone/other/releases')[0] == 404
+    assert raw_get(mirror.url, '/assets/someone/other/v1.0.0/file.zip')[0] == 404
+    assert mirror.safe_path(const.USER_NAME, '..', 'x') is None
+
+
+def test_release_falls_back_to_next_source(home, fake_github, proxies, no_retries):
+    from maya_umbrella_launcher.core import UserSetting
+
+    api_base = fake_github(b'zip' * 100, 'v1.0.0')
+    UserSetting.set('release_sources', [DEAD_SOURCE, api_base])
+
+    release = get_latest_release(const.USER_NAME, const.REPO_NAME, ttl=0, proxies=proxies)
+    assert release['tag_name'] == 'v1.0.0'
+    assert not release_sources.is_healthy(DEAD_SOURCE)
+    assert release_sources.get_healthy_sources() == [api_base]
+
+
+def test_download_falls_back_to_upstream_url(home, tmp_path, mirror, proxies, no_retries):
+    from maya_umbrella_launcher.core import UserSetting
+
+    dead_mirror = f'{DEAD_SOURCE}/assets/{const.USER_NAME}/{const.REPO_NAME}/v1.2.0/{const.REPO_NAME}.zip'
+    status, body = raw_get(mirror.url, f'/repos/{const.USER_NAME}/{const.REPO_NAME}/releases/latest')
+    asset = dict(json.loads(body)['assets'][0], browser_download_url=dead_mirror)
+    UserSetting.set('release_sources', [DEAD_SOURCE])
+
+    urls = get_asset_urls(asset)
+    save_path = str(tmp_path / f'{const.REPO_NAME}.zip')
+    assert download_release_files(urls[0], save_path, fallback_urls=urls[1:], proxies=proxies)
+    with open(save_path, 'rb') as f:
+        assert f.read() == b'release data' * 1000
+    # 失败的镜像被标记，之后一段时间内跳过
+    assert release_sources._health[DEAD_SOURCE][1] is False
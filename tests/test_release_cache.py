@@ -0,0 +1,64 @@
+import os
+import sys
+import json
+import subprocess
+
+from maya_umbrella_launcher.release_cache import ReleaseCache
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HIT_ONLY_SCRIPT = '''
+import sys
+from maya_umbrella_launcher.release_cache import ReleaseCache
+
+cache = ReleaseCache(cache_folder=sys.argv[1])
+for _ in range(3):
+    assert cache.get(sys.argv[2], ttl=3600) == {'tag_name': 'v1.0.0'}
+'''
+
+
+def test_get_hit_miss_and_error(home, tmp_path, fake_github, proxies, no_retries):
+    cache = ReleaseCache(cache_folder=str(tmp_path / 'cache'))
+    api_base = fake_github(b'zip', 'v1.0.0')
+    url = f'{api_base}/repos/loonghao/maya_umbrella/releases/latest'
+
+    assert cache.get(url, proxies=proxies)['tag_name'] == 'v1.0.0'
+    assert cache.get(url, proxies=proxies)['tag_name'] == 'v1.0.0'
+    # 模拟的GitHub不返回304，过期后重新获取
+    assert cache.get(url, ttl=0, proxies=proxies)['tag_name'] == 'v1.0.0'
+    assert cache.get('http://127.0.0.1:9/latest', ttl=0, proxies=proxies) is False
+    assert cache.stats == {'hit': 1, 'miss': 2, 'revalidated': 0, 'stale': 0, 'error': 1}
+
+
+def test_hit_only_process_saves_stats(tmp_path):
+    cache_folder = str(tmp_path / 'cache')
+    url = 'https://api.github.com/repos/loonghao/maya_umbrella/releases/latest'
+    cache = ReleaseCache(cache_folder=cache_folder)
+    cache._update(url, {'data': {'tag_name': 'v1.0.0'}, 'etag': '', 'last_modified': '',
+                        'fetched_at': 2 ** 40})
+
+    envs = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [PACKAGE_ROOT, os.environ.get('PYTHONPATH')])))
+    for _ in range(2):
+        subprocess.run([sys.executable, '-c', HIT_ONLY_SCRIPT, cache_folder, url], env=envs, check=True)
+
+    with open(cache.cache_file, 'r', encoding='utf-8') as f:
+        saved = json.load(f)
+    assert saved['stats']['hit'] == 6
+    assert saved['entries'][url]['data'] == {'tag_name': 'v1.0.0'}
+
+
+def test_flush_merges_stats_without_touching_entries(tmp_path):
+    cache_folder = str(tmp_path / 'cache')
+    first, second = ReleaseCache(cache_folder=cache_folder), ReleaseCache(cache_folder=cache_folder)
+    first._update('a', {'data': 1, 'fetched_at': 2 ** 40})
+
+    second.get('a')
+    second.get('a')
+    second._update('b', {'data': 2, 'fetched_at': 2 ** 40})
+    first.get('a')
+    first.flush()
+    first.flush()
+
+    stats = ReleaseCache(cache_folder=cache_folder).get_stats()['total']
+    assert stats['hit'] == 3
+    assert sorted(first._load()['entries']) == ['a', 'b']
@@ -0,0 +1,39 @@
+import os
+import sys
+import subprocess
+
+from maya_umbrella_launcher.supervisor import ProcessSupervisor
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAVE_SCRIPT = '''
+import sys
+from maya_umbrella_launcher.supervisor import ProcessSupervisor
+
+supervisor = ProcessSupervisor(session_folder=sys.argv[1])
+for i in range(25):
+    supervisor._save_session({'id': f'{sys.argv[2]}-{i}', 'name': sys.argv[2], 'max_rss': 0})
+'''
+
+
+def test_launch_records_session(tmp_path):
+    supervisor = ProcessSupervisor(session_folder=str(tmp_path), poll_interval=0.05)
+    session = supervisor.launch([sys.executable, '-c', 'print("hello")'], name='python')
+    assert supervisor.wait(session, timeout=30) == 0
+
+    sessions = supervisor.get_sessions()
+    assert [item['id'] for item in sessions] == [session['id']]
+    assert sessions[0]['exit_code'] == 0
+    with open(sessions[0]['log_file'], 'r') as f:
+        assert 'hello' in f.read()
+
+
+def test_concurrent_processes_keep_all_sessions(tmp_path):
+    envs = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [PACKAGE_ROOT, os.environ.get('PYTHONPATH')])))
+    processes = [subprocess.Popen([sys.executable, '-c', SAVE_SCRIPT, str(tmp_path), f'worker{i}'], env=envs)
+                 for i in range(4)]
+    assert [process.wait(timeout=60) for process in processes] == [0] * 4
+
+    sessions = ProcessSupervisor(session_folder=str(tmp_path))._load_registry()
+    assert len(sessions) == 100
+    assert len({session['id'] for session in sessions}) == 100
@@ -0,0 +1,127 @@
+import os
+
+import pytest
+
+import maya_umbrella_launcher.constant as const
+from maya_umbrella_launcher.benchmark import make_plugin_folder
+from maya_umbrella_launcher.versions import VersionManifest, sort_versions, is_newer, is_prerelease, parse_version
+
+
+def make_version(plugin_folder, tag, content=b'# plugin'):
+    script_folder = os.path.join(plugin_folder, tag, const.REPO_NAME, 'scripts')
+    os.makedirs(script_folder, exist_ok=True)
+    with open(os.path.join(script_folder, 'userSetup.py'), 'wb') as f:
+        f.write(content)
+    return os.path.join(plugin_folder, tag)
+
+
+def test_sort_versions_by_semver():
+    tags = ['v1.0.0', 'v0.10.0', 'v0.9.0', 'v1.0.0-beta.10', 'v1.0.0-beta.2', 'v1.0.0-alpha', 'v1.0', 'latest']
+    assert sort_versions(tags) == ['latest', 'v0.9.0', 'v0.10.0', 'v1.0.0-alpha', 'v1.0.0-beta.2',
+                                   'v1.0.0-beta.10', 'v1.0', 'v1.0.0']
+
+
+@pytest.mark.parametrize('tag, other, expected', [
+    ('v0.10.0', 'v0.9.0', True),
+    ('v1.0.0', 'v1.0.0-rc.1', True),
+    ('v1.0.0-rc.1', 'v0.99.0', True),
+    ('v0.9.0', 'v0.9.0', False),
+    ('v0.1.0', None, True),
+])
+def test_is_newer(tag, other, expected):
+    assert is_newer(tag, other) is expected
+
+
+def test_prerelease():
+    assert is_prerelease('v1.0.0-beta.1')
+    assert not is_prerelease('v1.0.0')
+    assert not is_prerelease('latest')
+    assert parse_version('nightly') is None
+
+
+def test_manifest_rebuild_orders_versions(tmp_path):
+    plugin_folder = make_plugin_folder(str(tmp_path), 12)
+    os.makedirs(os.path.join(plugin_folder, 'v9.9.9'))  # 没有scripts目录，不是完整的版本
+    manifest = VersionManifest(plugin_folder)
+
+    versions = manifest.get_versions()
+    assert versions == [f'v0.{i}.0' for i in range(12)]
+    assert os.path.isfile(manifest.path)
+    assert manifest.resolve() == 'v0.11.0'
+
+
+def test_manifest_channels_and_pins(home, tmp_path):
+    from maya_umbrella_launcher.core import UserSetting
+
+    plugin_folder = str(tmp_path / 'plugins')
+    for tag in ('v0.9.0', 'v1.0.0', 'v1.1.0-beta.1'):
+        make_version(plugin_folder, tag)
+    manifest = VersionManifest(plugin_folder)
+
+    assert manifest.get_versions(const.CHANNEL_STABLE) == ['v0.9.0', 'v1.0.0']
+    assert manifest.resolve(channel=const.CHANNEL_STABLE) == 'v1.0.0'
+    assert manifest.resolve(channel=const.CHANNEL_BETA) == 'v1.1.0-beta.1'
+    UserSetting.set('plugin_channel', const.CHANNEL_BETA)
+    assert manifest.resolve() == 'v1.1.0-beta.1'
+
+    assert manifest.pin('2024', 'v0.9.0')
+    assert not manifest.pin('2024', 'v5.0.0')
+    assert manifest.resolve(maya_version=2024) == 'v0.9.0'
+    assert manifest.resolve(maya_version=2025) == 'v1.1.0-beta.1'
+    manifest.unpin('2024')
+    assert manifest.resolve(maya_version=2024) == 'v1.1.0-beta.1'
+
+
+def test_manifest_add_remove_and_verify(tmp_path):
+    plugin_folder = str(tmp_path)
+    make_version(plugin_folder, 'v1.0.0')
+    manifest = VersionManifest(plugin_folder)
+    manifest.rebuild()
+
+    folder = make_version(plugin_folder, 'v1.1.0')
+    entry = manifest.add('v1.1.0')
+    assert entry['hash'].startswith('sha256:')
+    assert manifest.get_versions() == ['v1.0.0', 'v1.1.0']
+    assert manifest.verify('v1.1.0')
+
+    with open(os.path.join(folder, const.REPO_NAME, 'scripts', 'userSetup.py'), 'ab') as f:
+        f.write(b'\n# modified')
+    assert not manifest.verify('v1.1.0')
+
+    manifest.remove('v1.1.0')
+    assert manifest.get_versions() == ['v1.0.0']
+
+
+def test_manifest_shared_between_instances(tmp_path):
+    plugin_folder = str(tmp_path)
+    make_version(plugin_folder, 'v1.0.0')
+    VersionManifest(plugin_folder).rebuild()
+
+    # 另一个启动器修改了清单，这里的读取马上看到变化
+    other = VersionManifest(plugin_folder)
+    make_version(plugin_folder, 'v1.2.0')
+    other.add('v1.2.0')
+    assert VersionManifest(plugin_folder).get_versions() == ['v1.0.0', 'v1.2.0']
+
+
+def test_manifest_picks_up_version_copied_without_add(home, tmp_path):
+    from maya_umbrella_launcher.core import PluginManager
+
+    plugin_folder = str(tmp_path / 'plugins')
+    make_version(plugin_folder, 'v1.0.0')
+    manifest = VersionManifest(plugin_folder)
+    assert manifest.resolve() == 'v1.0.0'
+    # 清单写入后插件目录不比清单新，读取时不会列出目录
+    assert not manifest._is_folder_changed()
+
+    # 其他座位上的旧启动器或手动复制的版本，没有调用VersionManifest.add
+    make_version(plugin_folder, 'v1.1.0')
+    # 文件系统时间精度较粗时，确保目录比清单新
+    stat = os.stat(manifest.path)
+    os.utime(manifest.path, ns=(stat.st_atime_ns, stat.st_mtime_ns - 10 ** 9))
+    assert manifest._is_folder_changed()
+
+    assert manifest.resolve() == 'v1.1.0'
+    assert PluginManager.get_maya_umbrella_script_folder(plugin_folder=plugin_folder) == \
+        os.path.join(plugin_folder, 'v1.1.0', const.REPO_NAME, 'scripts')
+    assert 'v1.1.0' in VersionManifest(plugin_folder).get_versions()